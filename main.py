@@ -1,3 +1,6 @@
+import argparse
+import sys
+
 from gmod_stat_tracker.pipeline import scrape_and_merge_data
 from gmod_stat_tracker.visualizations import generate_all_graphs
 from gmod_stat_tracker.config import (
@@ -12,14 +15,21 @@ def main():
     
     1. Runs the data scraping and processing pipeline.
     2. Generates all visualization graphs.
+    
+    --resume continues the last unfinished run from its checkpointed stages.
     """
+    parser = argparse.ArgumentParser(description="GMod Stat Tracker")
+    parser.add_argument('--resume', action='store_true',
+                        help="continue the last unfinished run instead of starting over")
+    args = parser.parse_args()
+    
     print("="*60)
     print("🚀 STARTING GMOD STAT TRACKER")
     print("="*60)
     
     try:
         # Step 1: Run the data pipeline
-        scrape_and_merge_data()
+        scrape_and_merge_data(resume=args.resume)
         
         print("\nPipeline complete. Proceeding to graph generation...")
 
@@ -0,0 +1,270 @@
+import json
+import os
+import urllib.parse
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import pandas as pd
+import requests
+from lxml import html as lxml_html
+
+# Import from our own package modules (Absolute Imports)
+from gmod_stat_tracker.http_client import create_pooled_session
+from gmod_stat_tracker.battlemetrics_weeks import (
+    WeekScrapeError,
+    generate_leaderboard_url,
+    no_rows_frame,
+    is_confirmed_empty
+)
+
+LOGIN_URL = "https://www.battlemetrics.com/account/login"
+NEXT_PAGE_MARKER = "page%5Brel%5D=next"
+# Header words that identify the leaderboard table (lowercase, matched inside the <th> texts)
+LEADERBOARD_HEADER_WORDS = ('rank', 'time')
+USER_AGENT = (
+    "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 "
+    "(KHTML, like Gecko) Chrome/120.0 Safari/537.36"
+)
+
+
+def _clean_text(element) -> str:
+    """Element text with whitespace collapsed, like WebElement.text."""
+    return " ".join(element.text_content().split())
+
+
+def load_exported_cookies(session: requests.Session, cookies_file: str) -> None:
+    """
+    Loads cookies exported from a browser into the session.
+    Accepts a JSON list of {name, value, domain, path} objects (the format of
+    driver.get_cookies() and most cookie-export extensions) or a flat {name: value} dict.
+    """
+    with open(cookies_file, 'r') as f:
+        cookies = json.load(f)
+
+    if isinstance(cookies, dict):
+        cookies = [{'name': name, 'value': value} for name, value in cookies.items()]
+
+    for cookie in cookies:
+        session.cookies.set(
+            cookie['name'],
+            cookie['value'],
+            domain=cookie.get('domain', '.battlemetrics.com'),
+            path=cookie.get('path', '/')
+        )
+
+
+def create_http_session(username: str = None, password: str = None, cookies_file: str = None,
+                        pool_size: int = 1) -> requests.Session:
+    """
+    Returns a requests.Session authenticated with BattleMetrics, pooled for
+    pool_size concurrent weeks. GET requests that hit a rate limit (429) or a
+    server error (5xx) are retried with backoff (see create_pooled_session).
+    Exported cookies are used when cookies_file exists; otherwise the login form is
+    submitted with the given credentials. Raises ConnectionError if login fails.
+    """
+    session = create_pooled_session(pool_size)
+    session.headers.update({'User-Agent': USER_AGENT})
+
+    if cookies_file and os.path.exists(cookies_file):
+        load_exported_cookies(session, cookies_file)
+        print(f"✅ Loaded BattleMetrics cookies from {cookies_file}")
+        return session
+
+    login_page = session.get(LOGIN_URL, timeout=30)
+    login_page.raise_for_status()
+
+    doc = lxml_html.fromstring(login_page.text)
+    forms = doc.xpath("//form[.//input[@name='username']]")
+    if not forms:
+        raise ConnectionError("Login failed: login form not found.")
+
+    form = forms[0]
+    # Keep hidden fields such as the CSRF token
+    payload = {
+        field.get('name'): field.get('value', '')
+        for field in form.xpath(".//input[@name]")
+    }
+    payload['username'] = username
+    payload['password'] = password
+
+    action = urllib.parse.urljoin(LOGIN_URL, form.get('action') or LOGIN_URL)
+    response = session.post(action, data=payload, timeout=30)
+    response.raise_for_status()
+
+    if not lxml_html.fromstring(response.text).xpath("//a[@href='/account']"):
+        raise ConnectionError("Login failed: Credentials rejected.")
+
+    print("✅ Login successful")
+    return session
+
+
+def parse_leaderboard_html(page_html: str, page_url: str) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """
+    Parses one leaderboard page.
+    Returns the same row dicts as scrape_leaderboard_page and the absolute URL of
+    the next page (None on the last page).
+    """
+    doc = lxml_html.fromstring(page_html)
+    data: List[Dict[str, Any]] = []
+
+    for row in doc.xpath("//table//tbody/tr"):
+        rank_elements = row.xpath("./td[1]")
+        player_elements = row.xpath(".//td[contains(concat(' ', normalize-space(@class), ' '), ' player ')]//a")
+        time_elements = row.xpath(".//time")
+
+        if not rank_elements or not player_elements or not time_elements:
+            continue
+
+        data.append({
+            "Rank": _clean_text(rank_elements[0]),
+            "BattleMetrics_Name": _clean_text(player_elements[0]),
+            "BattleMetrics_Player_URL": urllib.parse.urljoin(page_url, player_elements[0].get("href", "")),
+            "Time_Display": _clean_text(time_elements[0]),
+            "Time_ISO_Duration": time_elements[0].get("datetime")
+        })
+
+    next_links = doc.xpath(f"//a[contains(@href, '{NEXT_PAGE_MARKER}')]/@href")
+    next_url = urllib.parse.urljoin(page_url, next_links[0]) if next_links else None
+
+    return data, next_url
+
+
+def shows_empty_leaderboard(page_html: str) -> bool:
+    """
+    True only when the page positively shows an empty leaderboard: the
+    leaderboard table (its header has LEADERBOARD_HEADER_WORDS) is there and
+    its body has no rows other than a single-cell "no results" message.
+    A login wall, rate-limit or Cloudflare page, or changed markup is False.
+    """
+    doc = lxml_html.fromstring(page_html)
+    for table in doc.xpath("//table"):
+        headers = [_clean_text(th).lower() for th in table.xpath(".//thead//th")]
+        if not all(any(word in header for header in headers) for word in LEADERBOARD_HEADER_WORDS):
+            continue
+        return all(len(row.xpath("./td")) <= 1 for row in table.xpath(".//tbody/tr"))
+    return False
+
+
+def scrape_all_pages_http(session: requests.Session, start_url: str) -> pd.DataFrame:
+    """
+    HTTP equivalent of scrape_all_pages: follows the 'next' links from start_url.
+    A failed request (after the session's retries), or a page without rows
+    that is not an empty leaderboard (see shows_empty_leaderboard), returns an
+    empty DataFrame without columns, dropping any pages already read.
+    """
+    all_data = []
+    page_number = 1
+    url = start_url
+    visited = set()
+    failed = False
+
+    while url and url not in visited:
+        visited.add(url)
+        print(f"   Scraping Page {page_number}...")
+
+        try:
+            response = session.get(url, timeout=30)
+            response.raise_for_status()
+        except requests.exceptions.RequestException as e:
+            print(f"   ❌ Scraping Error on Page {page_number}: {e}")
+            failed = True
+            break
+
+        page_data, next_url = parse_leaderboard_html(response.text, url)
+        if not page_data:
+            if page_number == 1 and shows_empty_leaderboard(response.text):
+                print("   ✅ Finished: the leaderboard has no players for this window.")
+                return no_rows_frame()
+            print(f"   ❌ Scraping Error on Page {page_number}: no leaderboard rows on {url}")
+            failed = True
+            break
+        all_data.extend(page_data)
+        url = next_url
+
+        if not url:
+            print(f"   ✅ Finished: Scraped {page_number} page(s). 'Next' link not found.")
+            break
+        page_number += 1
+
+    if failed:
+        return pd.DataFrame()
+    return pd.DataFrame(all_data)
+
+
+def scrape_week_http(session: requests.Session, base_url: str, start_date: datetime, end_date: datetime) -> pd.DataFrame:
+    """HTTP equivalent of scrape_week."""
+    weekly_df = scrape_all_pages_http(session, generate_leaderboard_url(base_url, start_date, end_date))
+
+    if len(weekly_df.columns):
+        weekly_df['Week_Start_UTC'] = start_date.strftime('%Y-%m-%d %H:%M')
+        weekly_df['Week_End_UTC'] = end_date.strftime('%Y-%m-%d %H:%M')
+    return weekly_df
+
+
+def scrape_weeks_http(session: requests.Session, base_url: str, windows: List[Tuple[datetime, datetime]],
+                      max_workers: int = 1,
+                      on_week: Callable[[pd.DataFrame, datetime, datetime], None] = None) -> pd.DataFrame:
+    """
+    Scrapes the given week windows over HTTP (concurrently when max_workers > 1).
+    With on_week, each week is handed over as on_week(weekly_df, start_date, end_date)
+    as soon as it finishes instead of being kept, and an empty DataFrame is
+    returned. Weeks that loaded without any rows are handed over too.
+    Weeks that failed (the session already retried their requests) are raised
+    as a WeekScrapeError after every other week has been handed over.
+    """
+    if not windows:
+        return pd.DataFrame()
+
+    print(f"\nScraping {len(windows)} week(s) over HTTP...")
+
+    weekly_dfs = {}
+    failed_weeks = []
+    streamed_records = 0
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(windows)))) as executor:
+        futures = {
+            executor.submit(scrape_week_http, session, base_url, start_date, end_date): (week_number, start_date, end_date)
+            for week_number, (start_date, end_date) in enumerate(windows, start=1)
+        }
+        try:
+            for future in as_completed(futures):
+                week_number, start_date, end_date = futures[future]
+                try:
+                    weekly_df = future.result()
+                except Exception as e:
+                    print(f"❌ Scraping Error for Week {week_number}: {e}")
+                    weekly_df = pd.DataFrame()
+                if is_confirmed_empty(weekly_df):
+                    print(f"⚠️ Week {week_number} has no players on the leaderboard.")
+                    if on_week:
+                        on_week(weekly_df, start_date, end_date)
+                    continue
+                if weekly_df.empty:
+                    print(f"❌ Warning: Retrieved no data for Week {week_number}.")
+                    failed_weeks.append((start_date, end_date))
+                    continue
+
+                print(f"✅ Data retrieved successfully for Week {week_number}: {len(weekly_df)} records")
+                if on_week:
+                    streamed_records += len(weekly_df)
+                    on_week(weekly_df, start_date, end_date)
+                else:
+                    weekly_dfs[week_number] = weekly_df
+        except BaseException:
+            # on_week gave up (e.g. the run was cancelled): don't scrape the weeks still queued
+            for future in futures:
+                future.cancel()
+            raise
+
+    final_df = pd.DataFrame()
+    if streamed_records:
+        print(f"\n✅ Total records scraped across all weeks: {streamed_records}")
+    elif weekly_dfs:
+        final_df = pd.concat([weekly_dfs[week] for week in sorted(weekly_dfs)], ignore_index=True)
+        print(f"\n✅ Total records scraped across all weeks: {len(final_df)}")
+    else:
+        print("\n❌ No data scraped from any week.")
+
+    if failed_weeks:
+        raise WeekScrapeError(failed_weeks)
+    return final_df
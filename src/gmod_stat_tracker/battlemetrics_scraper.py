@@ -5,26 +5,32 @@ from webdriver_manager.chrome import ChromeDriverManager
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
-from selenium.common.exceptions import TimeoutException, NoSuchElementException, StaleElementReferenceException
-import time
-from datetime import datetime, timedelta 
+from selenium.common.exceptions import (
+    TimeoutException,
+    NoSuchElementException,
+    StaleElementReferenceException,
+    JavascriptException
+)
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
 import urllib.parse 
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Tuple, Callable
 
 # Import configuration (Absolute Import)
 from gmod_stat_tracker import config
+# Import from our own package modules (Absolute Imports)
+from gmod_stat_tracker.battlemetrics_weeks import (
+    WeekScrapeError,
+    generate_leaderboard_url,
+    no_rows_frame,
+    is_confirmed_empty
+)
+from gmod_stat_tracker.battlemetrics_http import shows_empty_leaderboard
 
-
-def generate_leaderboard_url(base_url: str, start_date: datetime, end_date: datetime) -> str:
-    """Generates the BattleMetrics leaderboard URL for a specific time period."""
-    start_iso = start_date.strftime("%Y-%m-%dT%H:%M:%S.000Z")
-    end_iso = end_date.strftime("%Y-%m-%dT%H:%M:%S.000Z")
-    period_value = f"{start_iso}:{end_iso}"
-    
-    query_params = {"filter[period]": period_value}
-    encoded_params = urllib.parse.urlencode(query_params, safe='[]:')
-    final_url = f"{base_url}?{encoded_params}"
-    return final_url
+BATTLEMETRICS_HOME_URL = "https://www.battlemetrics.com/"
+COOKIE_FIELDS = ('name', 'value', 'domain', 'path', 'secure', 'httpOnly', 'expiry', 'sameSite')
 
 
 def login_to_battlemetrics(driver: webdriver.Chrome, username: str, password: str) -> bool:
@@ -64,109 +70,362 @@ def login_to_battlemetrics(driver: webdriver.Chrome, username: str, password: st
         return False
 
 
+# Reads every leaderboard row in one WebDriver round trip
+EXTRACT_ROWS_SCRIPT = """
+const rows = [];
+for (const row of document.querySelectorAll(arguments[0] + ' tbody tr')) {
+    const rank = row.querySelector('td');
+    const player = row.querySelector('td.player a');
+    const time = row.querySelector('time');
+    if (!rank || !player || !time) continue;
+    rows.push({
+        rank: rank.innerText.trim(),
+        name: player.innerText.trim(),
+        href: player.href,
+        display: time.innerText.trim(),
+        iso: time.getAttribute('datetime')
+    });
+}
+return rows;
+"""
+PAGE_SCRAPE_ATTEMPTS = 3
+
+
 def scrape_leaderboard_page(driver: webdriver.Chrome, page_number: int) -> List[Dict[str, Any]]:
-    """(Unchanged logic)"""
-    data: List[Dict[str, Any]] = []
+    """
+    Extracts every row of the current leaderboard page with a single execute_script call.
+    If the table is re-rendered mid-read, the whole page is read again.
+    """
     TABLE_CSS_SELECTOR = "table" 
     
     try:
         WebDriverWait(driver, 10).until( 
             EC.presence_of_element_located((By.CSS_SELECTOR, TABLE_CSS_SELECTOR)) 
         )
+    except TimeoutException:
+        print("   ❌ Error: Table failed to load or CSS selector is wrong.")
+        return []
+    
+    for attempt in range(1, PAGE_SCRAPE_ATTEMPTS + 1):
+        try:
+            rows = driver.execute_script(EXTRACT_ROWS_SCRIPT, TABLE_CSS_SELECTOR)
+            return [
+                {
+                    "Rank": row["rank"],
+                    "BattleMetrics_Name": row["name"],
+                    "BattleMetrics_Player_URL": row["href"],
+                    "Time_Display": row["display"],
+                    "Time_ISO_Duration": row["iso"]
+                }
+                for row in rows
+            ]
+        except (StaleElementReferenceException, JavascriptException) as e:
+            print(f"   ⚠️ Page {page_number} changed while reading (attempt {attempt}/{PAGE_SCRAPE_ATTEMPTS}): {e}")
+        except Exception as e:
+            print(f"   ❌ Scraping Error on Page {page_number}: {e}")
+            break
         
-        row_elements = driver.find_elements(By.CSS_SELECTOR, f"{TABLE_CSS_SELECTOR} tbody tr")
+    return []
 
-        for row in row_elements:
-            try:
-                rank_element = row.find_element(By.TAG_NAME, "td")
-                player_name_element = row.find_element(By.CSS_SELECTOR, "td.player a")
-                time_element = row.find_element(By.TAG_NAME, "time")
-                
-                rank = rank_element.text.strip()
-                player_name = player_name_element.text.strip()
-                score_display = time_element.text.strip()
-                score_iso = time_element.get_attribute("datetime") 
-
-                data.append({
-                    "Rank": rank,
-                    "BattleMetrics_Name": player_name, 
-                    "Time_Display": score_display,
-                    "Time_ISO_Duration": score_iso
-                })
-            except (NoSuchElementException, StaleElementReferenceException):
-                continue
 
-    except TimeoutException:
-        print("   ❌ Error: Table failed to load or CSS selector is wrong.")
+# Reads the 'next' cursor URL and every page size offered by the pager
+PAGE_INFO_SCRIPT = """
+const next = document.querySelector("a[href*='page%5Brel%5D=next']");
+const sizes = [];
+for (const link of document.querySelectorAll("a[href*='page%5Bsize%5D']")) {
+    const size = parseInt(new URL(link.href).searchParams.get('page[size]'), 10);
+    if (!isNaN(size)) sizes.push(size);
+}
+for (const option of document.querySelectorAll("select[name*='size'] option, select[id*='size'] option")) {
+    const size = parseInt(option.value, 10);
+    if (!isNaN(size)) sizes.push(size);
+}
+return {next: next ? next.href : null, sizes: sizes};
+"""
+
+
+def with_page_size(url: str, page_size: int) -> str:
+    """Returns url with its page[size] query parameter set to page_size."""
+    parts = urllib.parse.urlsplit(url)
+    query = [(key, value) for key, value in urllib.parse.parse_qsl(parts.query) if key != 'page[size]']
+    query.append(('page[size]', str(page_size)))
+    return urllib.parse.urlunsplit(parts._replace(query=urllib.parse.urlencode(query, safe='[]:')))
+
+
+def wait_for_page_ready(driver: webdriver.Chrome, timeout: int = 10) -> None:
+    """
+    Waits until the document has loaded and has either leaderboard rows or no
+    table at all. A page without rows still has to pass shows_empty_leaderboard
+    before it counts as an empty week.
+    """
+    WebDriverWait(driver, timeout).until(
+        lambda d: d.execute_script(
+            "return document.readyState === 'complete' && "
+            "(document.querySelector('table tbody tr') !== null || document.querySelector('table') === null);"
+        )
+    )
+
+
+def _open_prefetch_tab(driver: webdriver.Chrome, url: str):
+    """Starts loading url in a background tab and returns its window handle (None if it failed)."""
+    known_handles = set(driver.window_handles)
+    driver.execute_script("window.open(arguments[0], '_blank');", url)
+    new_handles = [handle for handle in driver.window_handles if handle not in known_handles]
+    return new_handles[0] if new_handles else None
+
+
+def _close_tab(driver: webdriver.Chrome, handle) -> None:
+    """Closes a background tab and returns to the first remaining window."""
+    try:
+        driver.switch_to.window(handle)
+        driver.close()
+        remaining = driver.window_handles
+        if remaining:
+            driver.switch_to.window(remaining[0])
     except Exception as e:
-        print(f"   ❌ Scraping Error on Page {page_number}: {e}")
-        
-    return data
+        print(f"   ⚠️ Could not close prefetch tab: {e}")
 
 
 def scrape_all_pages(driver: webdriver.Chrome, start_url: str) -> pd.DataFrame:
-    """(Unchanged logic)"""
-    driver.get(start_url)
-    time.sleep(2) 
+    """
+    Scrapes every page of a leaderboard by following the 'next' cursor URL.
+    
+    The first page is reloaded at the largest page size the pager offers. While a
+    page is being read, the next page is already loading in a second tab, and
+    readiness checks replace fixed sleeps.
+    
+    If the first page does not load, or loads without rows and without the
+    empty leaderboard (a login wall, rate-limit page or changed markup), an
+    empty DataFrame without columns is returned. An error or a page without
+    rows later on is raised, so a week is never returned with only some of
+    its pages.
+    """
+    try:
+        driver.get(start_url)
+        wait_for_page_ready(driver)
+        
+        page_info = driver.execute_script(PAGE_INFO_SCRIPT)
+        current_size = dict(urllib.parse.parse_qsl(urllib.parse.urlsplit(driver.current_url).query)).get('page[size]')
+        if page_info['sizes'] and str(max(page_info['sizes'])) != current_size:
+            driver.get(with_page_size(start_url, max(page_info['sizes'])))
+            wait_for_page_ready(driver)
+            page_info = driver.execute_script(PAGE_INFO_SCRIPT)
+        
+        if not driver.execute_script("return document.querySelector('table tbody tr') !== null;"):
+            # Only the leaderboard's own empty state makes this an empty week
+            if shows_empty_leaderboard(driver.page_source):
+                print("   ✅ Finished: the leaderboard has no players for this window.")
+                return no_rows_frame()
+            print("   ❌ Pagination Error: Page 1 is not a leaderboard page.")
+            return pd.DataFrame()
+    except TimeoutException:
+        print("   ❌ Pagination Error: Page 1 did not finish loading.")
+        return pd.DataFrame()
+    except Exception as e:
+        print(f"   ❌ Pagination Error: {e}.")
+        return pd.DataFrame()
     
     all_data = []
     page_number = 1
+    visited = {driver.current_url}
     
     while True:
         print(f"   Scraping Page {page_number}...")
         
-        current_page_data = scrape_leaderboard_page(driver, page_number)
-        all_data.extend(current_page_data)
-        
-        next_button_selector = "a[href*='page%5Brel%5D=next']" 
-        
+        next_url = page_info['next'] if page_info['next'] not in visited else None
+        prefetch_handle = None
         try:
-            next_button = WebDriverWait(driver, 5).until(
-                EC.element_to_be_clickable((By.CSS_SELECTOR, next_button_selector))
-            )
+            if next_url:
+                try:
+                    prefetch_handle = _open_prefetch_tab(driver, next_url)
+                except Exception as e:
+                    print(f"   ⚠️ Prefetch failed, falling back to direct navigation: {e}")
+            
+            current_page_data = scrape_leaderboard_page(driver, page_number)
+            if not current_page_data:
+                raise RuntimeError(f"no leaderboard rows on page {page_number}")
+            all_data.extend(current_page_data)
+            
+            if not next_url:
+                print(f"   ✅ Finished: Scraped {page_number} page(s). 'Next' link not found.")
+                break
             
-            next_button.click()
+            if prefetch_handle:
+                driver.close()
+                driver.switch_to.window(prefetch_handle)
+                prefetch_handle = None
+            else:
+                driver.get(next_url)
+            
+            visited.add(next_url)
             page_number += 1
-            time.sleep(1)
+            wait_for_page_ready(driver)
+            page_info = driver.execute_script(PAGE_INFO_SCRIPT)
             
         except TimeoutException:
-            print(f"   ✅ Finished: Scraped {page_number} page(s). 'Next' button not found.")
-            break
+            print(f"   ❌ Pagination Error: Page {page_number} did not finish loading.")
+            raise
         except Exception as e:
-            print(f"   ❌ Pagination Error: {e}. Exiting loop.")
-            break
+            print(f"   ❌ Pagination Error: {e}.")
+            raise
+        finally:
+            # Only set while the prefetch tab was opened but never switched to
+            if prefetch_handle:
+                _close_tab(driver, prefetch_handle)
             
     return pd.DataFrame(all_data)
 
 
-def scrape_multiple_weeks(driver: webdriver.Chrome, base_url: str, weeks_to_scrape: int) -> pd.DataFrame:
-    """(Unchanged logic)"""
-    all_data_frames: List[pd.DataFrame] = []
+def create_chrome_driver(driver_path: str = None) -> webdriver.Chrome:
+    """Starts the headless Chrome instance used for scraping."""
+    chrome_options = webdriver.ChromeOptions()
+    chrome_options.add_argument("--headless")
+    chrome_options.add_argument("--no-sandbox")
+    chrome_options.add_argument("--disable-gpu")
+    chrome_options.add_argument("--window-size=1920,1080")
     
-    current_end = datetime.utcnow().replace(hour = 4, minute=0, second=0, microsecond=0)
-    WEEK = timedelta(days=7) 
+    service = Service(driver_path or ChromeDriverManager().install())
+    return webdriver.Chrome(service=service, options=chrome_options)
+
+
+def clone_authenticated_driver(cookies: List[Dict[str, Any]], driver_path: str = None) -> webdriver.Chrome:
+    """Starts another Chrome instance that reuses an existing BattleMetrics login session."""
+    driver = create_chrome_driver(driver_path)
+    # Cookies can only be set for the domain currently loaded
+    driver.get(BATTLEMETRICS_HOME_URL)
+    for cookie in cookies:
+        driver.add_cookie({key: value for key, value in cookie.items() if key in COOKIE_FIELDS})
+    return driver
+
+
+def scrape_week(driver: webdriver.Chrome, base_url: str, start_date: datetime, end_date: datetime) -> pd.DataFrame:
+    """Scrapes every page of one week window and tags the rows with the window bounds."""
+    current_url = generate_leaderboard_url(base_url, start_date, end_date)
+    weekly_df = scrape_all_pages(driver, current_url)
     
-    for week_offset in range(weeks_to_scrape):
-        end_date = current_end - (WEEK * week_offset)
-        start_date = end_date - WEEK
-        
-        print(f"\n--- WEEK {week_offset + 1} of {weeks_to_scrape}: {start_date.strftime('%Y-%m-%d %H:%M')} to {end_date.strftime('%Y-%m-%d %H:%M')} (UTC) ---")
-        
-        current_url = generate_leaderboard_url(base_url, start_date, end_date)
-        weekly_df = scrape_all_pages(driver, current_url)
-        
-        if not weekly_df.empty:
-            weekly_df['Week_Start_UTC'] = start_date.strftime('%Y-%m-%d %H:%M')
-            weekly_df['Week_End_UTC'] = end_date.strftime('%Y-%m-%d %H:%M')
-            all_data_frames.append(weekly_df)
-            print(f"✅ Data retrieved successfully for Week {week_offset + 1}: {len(weekly_df)} records")
-        else:
-            print(f"❌ Warning: Retrieved no data for Week {week_offset + 1}. Skipping.")
-
-    if all_data_frames:
-        final_df = pd.concat(all_data_frames, ignore_index=True)
+    # Confirmed-empty weeks are tagged too (columns only), so they can be cached
+    if len(weekly_df.columns):
+        weekly_df['Week_Start_UTC'] = start_date.strftime('%Y-%m-%d %H:%M')
+        weekly_df['Week_End_UTC'] = end_date.strftime('%Y-%m-%d %H:%M')
+    return weekly_df
+
+
+def scrape_weeks_parallel(driver: webdriver.Chrome, base_url: str, windows: List[Tuple[datetime, datetime]],
+                          pool_size: int, on_week: Callable[[pd.DataFrame, datetime, datetime], None] = None) -> pd.DataFrame:
+    """
+    Scrapes week windows concurrently with a pool of headless browsers.
+    
+    `driver` must already be logged in; its cookies are copied into extra
+    drivers so every browser shares the same BattleMetrics session. Each
+    browser takes the next unscraped window from a shared queue. The result holds
+    every scraped week's rows, in window order. With on_week, weeks
+    are handed over in the order they finish instead; on_week is called from
+    the browser threads, possibly concurrently, and may block (only that
+    browser waits).
+    
+    A week that fails (an error, or no rows without the page confirming an
+    empty leaderboard) goes back on the queue and is retried in a fresh browser,
+    up to config.SCRAPER_WEEK_ATTEMPTS tries. Weeks that still fail are raised
+    as a WeekScrapeError once every other week has been scraped and handed over.
+    """
+    pool_size = max(1, min(pool_size, len(windows)))
+    print(f"\nScraping {len(windows)} week(s) with {pool_size} browser(s)...")
+    
+    cookies = driver.get_cookies()
+    driver_paths: List[str] = []
+    driver_path_lock = threading.Lock()
+    
+    def fresh_driver() -> webdriver.Chrome:
+        # The driver binary is only looked up once a browser has to be started
+        with driver_path_lock:
+            if not driver_paths:
+                driver_paths.append(ChromeDriverManager().install())
+        return clone_authenticated_driver(cookies, driver_paths[0])
+    
+    pending: "queue.Queue[Tuple[int, datetime, datetime, int]]" = queue.Queue()
+    for week_number, (start_date, end_date) in enumerate(windows, start=1):
+        pending.put((week_number, start_date, end_date, 1))
+    
+    results: Dict[int, Any] = {}
+    failed_weeks: Dict[int, Tuple[datetime, datetime]] = {}
+    results_lock = threading.Lock()
+    
+    def browser_worker(browser_number: int, worker_driver: webdriver.Chrome = None) -> None:
+        # The logged-in driver belongs to the caller; clones are quit here
+        owns_driver = worker_driver is None
+        try:
+            while True:
+                try:
+                    week_number, start_date, end_date, attempt = pending.get_nowait()
+                except queue.Empty:
+                    break
+                
+                print(f"   [Browser {browser_number}] Week {week_number}: {start_date.strftime('%Y-%m-%d %H:%M')} to {end_date.strftime('%Y-%m-%d %H:%M')} (UTC)")
+                try:
+                    if worker_driver is None:
+                        worker_driver, owns_driver = fresh_driver(), True
+                    weekly_df = scrape_week(worker_driver, base_url, start_date, end_date)
+                    if weekly_df.empty and not is_confirmed_empty(weekly_df):
+                        raise RuntimeError("no rows, and the leaderboard did not load as empty")
+                except Exception as e:
+                    if attempt < config.SCRAPER_WEEK_ATTEMPTS:
+                        print(f"   ⚠️ [Browser {browser_number}] Week {week_number} failed "
+                              f"(attempt {attempt}/{config.SCRAPER_WEEK_ATTEMPTS}), retrying in a fresh browser: {e}")
+                        pending.put((week_number, start_date, end_date, attempt + 1))
+                    else:
+                        print(f"   ❌ [Browser {browser_number}] Week {week_number} failed "
+                              f"after {config.SCRAPER_WEEK_ATTEMPTS} attempts: {e}")
+                        with results_lock:
+                            failed_weeks[week_number] = (start_date, end_date)
+                    # Whatever broke the week may have left the browser unusable
+                    if owns_driver and worker_driver:
+                        try:
+                            worker_driver.quit()
+                        except Exception:
+                            pass
+                    worker_driver = None
+                    continue
+                
+                if is_confirmed_empty(weekly_df):
+                    print(f"   ⚠️ [Browser {browser_number}] Week {week_number} has no players on the leaderboard.")
+                    if on_week:
+                        on_week(weekly_df, start_date, end_date)
+                    continue
+                
+                print(f"   ✅ [Browser {browser_number}] Week {week_number}: {len(weekly_df)} records")
+                with results_lock:
+                    results[week_number] = len(weekly_df) if on_week else weekly_df
+                if on_week:
+                    on_week(weekly_df, start_date, end_date)
+        except Exception as e:
+            print(f"   ❌ [Browser {browser_number}] Error: {e}")
+        finally:
+            if owns_driver and worker_driver:
+                worker_driver.quit()
+    
+    with ThreadPoolExecutor(max_workers=pool_size) as executor:
+        # The already logged-in driver is browser 1; the others are clones
+        executor.submit(browser_worker, 1, driver)
+        for browser_number in range(2, pool_size + 1):
+            executor.submit(browser_worker, browser_number)
+    
+    # Weeks still queued were left behind by browsers that stopped early
+    while True:
+        try:
+            week_number, start_date, end_date, _ = pending.get_nowait()
+        except queue.Empty:
+            break
+        failed_weeks[week_number] = (start_date, end_date)
+    
+    final_df = pd.DataFrame()
+    if results and on_week:
+        print(f"\n✅ Total records scraped across all weeks: {sum(results.values())}")
+    elif results:
+        final_df = pd.concat([results[week] for week in sorted(results)], ignore_index=True)
         print(f"\n✅ Total records scraped across all weeks: {len(final_df)}")
-        return final_df
     else:
         print("\n❌ No data scraped from any week.")
-        return pd.DataFrame()
\ No newline at end of file
+    
+    if failed_weeks:
+        raise WeekScrapeError(list(failed_weeks.values()))
+    return final_df
\ No newline at end of file
@@ -0,0 +1,99 @@
+import urllib.parse
+from datetime import datetime, timedelta
+from typing import List, Tuple
+
+import pandas as pd
+
+# Import configuration (Absolute Import)
+from gmod_stat_tracker import config
+
+# Columns of a scraped leaderboard row (both backends)
+LEADERBOARD_ROW_COLUMNS = ['Rank', 'BattleMetrics_Name', 'BattleMetrics_Player_URL', 'Time_Display', 'Time_ISO_Duration']
+WEEK_TIME_FORMAT = '%Y-%m-%d %H:%M'
+# Appended to the open week's column name: its hours are only a partial week so far
+PARTIAL_WEEK_SUFFIX = ' (partial)'
+
+
+class WeekScrapeError(RuntimeError):
+    """Some week windows could not be scraped; `windows` lists their (start, end) pairs, newest first."""
+
+    def __init__(self, windows: List[Tuple[datetime, datetime]]):
+        self.windows = sorted(windows, reverse=True)
+        super().__init__(
+            f"{len(self.windows)} week(s) could not be scraped: "
+            + ", ".join(f"{start.strftime(WEEK_TIME_FORMAT)} - {end.strftime(WEEK_TIME_FORMAT)}" for start, end in self.windows)
+        )
+
+
+def generate_leaderboard_url(base_url: str, start_date: datetime, end_date: datetime) -> str:
+    """Generates the BattleMetrics leaderboard URL for a specific time period."""
+    start_iso = start_date.strftime("%Y-%m-%dT%H:%M:%S.000Z")
+    end_iso = end_date.strftime("%Y-%m-%dT%H:%M:%S.000Z")
+    period_value = f"{start_iso}:{end_iso}"
+
+    query_params = {"filter[period]": period_value}
+    encoded_params = urllib.parse.urlencode(query_params, safe='[]:')
+    final_url = f"{base_url}?{encoded_params}"
+    return final_url
+
+
+def get_week_windows(weeks_to_scrape: int, now: datetime = None) -> List[Tuple[datetime, datetime]]:
+    """
+    Returns (start, end) UTC week windows, newest first.
+    Windows are anchored to config.WEEK_ANCHOR_WEEKDAY at config.WEEK_ANCHOR_HOUR so
+    they stay the same all week: the first one is the open week (it ends in the future),
+    every other one is closed and its leaderboard can no longer change.
+    """
+    now = now or datetime.utcnow()
+    anchor = now.replace(hour=config.WEEK_ANCHOR_HOUR, minute=0, second=0, microsecond=0)
+    anchor -= timedelta(days=(anchor.weekday() - config.WEEK_ANCHOR_WEEKDAY) % 7)
+    if anchor > now:
+        anchor -= timedelta(days=7)
+
+    WEEK = timedelta(days=7)
+    current_end = anchor + WEEK
+
+    windows = []
+    for week_offset in range(weeks_to_scrape):
+        end_date = current_end - (WEEK * week_offset)
+        windows.append((end_date - WEEK, end_date))
+    return windows
+
+
+def no_rows_frame() -> pd.DataFrame:
+    """What a scraper returns for a leaderboard that loaded fine but has no rows."""
+    return pd.DataFrame(columns=LEADERBOARD_ROW_COLUMNS)
+
+
+def is_confirmed_empty(weekly_df: pd.DataFrame) -> bool:
+    """
+    True for a week whose leaderboard loaded but had no players. A failed scrape
+    returns a frame without columns, which is not cached and is scraped again.
+    """
+    return weekly_df.empty and len(weekly_df.columns) > 0
+
+
+def week_range_label(week_start: str, week_end: str, now: datetime = None) -> str:
+    """Pivot column name for a week window; the open week gets PARTIAL_WEEK_SUFFIX."""
+    label = f"{week_start} - {week_end}"
+    if datetime.strptime(week_end, WEEK_TIME_FORMAT) > (now or datetime.utcnow()):
+        label += PARTIAL_WEEK_SUFFIX
+    return label
+
+
+def format_date_range_short(date_range_str: str) -> str:
+    """
+    '2025-01-06 04:00 - 2025-01-13 04:00' -> '01/06 - 01/13' for sheet headers and
+    graph labels, keeping a trailing PARTIAL_WEEK_SUFFIX (anything else is returned as is).
+    """
+    try:
+        # The open week keeps its " (partial)" marker
+        suffix = PARTIAL_WEEK_SUFFIX if date_range_str.endswith(PARTIAL_WEEK_SUFFIX) else ''
+        parts = date_range_str[:len(date_range_str) - len(suffix)].split(' - ')
+        if len(parts) == 2:
+            start_date = datetime.strptime(parts[0], WEEK_TIME_FORMAT)
+            end_date = datetime.strptime(parts[1], WEEK_TIME_FORMAT)
+            return f"{start_date.strftime('%m/%d')} - {end_date.strftime('%m/%d')}{suffix}"
+    except (AttributeError, ValueError):
+        pass
+    return date_range_str
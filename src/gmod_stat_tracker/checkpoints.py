@@ -0,0 +1,124 @@
+import json
+import os
+import shutil
+from datetime import datetime
+from pathlib import Path
+
+import pandas as pd
+
+# Import configuration (Absolute Import)
+from gmod_stat_tracker import config
+from gmod_stat_tracker.columnar_cache import write_frame, read_frame
+
+# Left by older versions in completed runs, which are now deleted instead
+COMPLETE_MARKER = 'COMPLETE'
+MISSING = object()
+# DataFrames are saved as Parquet, anything else as JSON (no pickles: a checkpoint is never code)
+CHECKPOINT_SUFFIXES = ('.parquet', '.json')
+
+
+def _run_dirs():
+    """Existing run directories, oldest first (run ids sort chronologically)."""
+    if not os.path.exists(config.CHECKPOINT_DIR):
+        return []
+    return sorted(path for path in Path(config.CHECKPOINT_DIR).iterdir() if path.is_dir())
+
+
+def _unfinished_runs():
+    return [run_dir for run_dir in _run_dirs() if not (run_dir / COMPLETE_MARKER).exists()]
+
+
+def _prune_old_runs():
+    unfinished = _unfinished_runs()
+    stale = [run_dir for run_dir in _run_dirs() if run_dir not in unfinished]
+    stale += unfinished[:-config.CHECKPOINT_KEEP_RUNS] if config.CHECKPOINT_KEEP_RUNS else unfinished
+    for run_dir in stale:
+        shutil.rmtree(run_dir, ignore_errors=True)
+
+
+def start_run(resume=False):
+    """
+    Returns the run to checkpoint into: {'run_dir', 'resumed'}.
+    With resume, the latest run that did not complete is continued (its saved
+    stages are reused); otherwise, or when there is none, a new run starts.
+    A new run's directory is only created by its first checkpoint.
+    """
+    if resume:
+        unfinished = _unfinished_runs()
+        if unfinished:
+            run_dir = unfinished[-1]
+            saved = sorted(path.stem for path in run_dir.iterdir() if path.suffix in CHECKPOINT_SUFFIXES)
+            print(f"✅ Resuming run {run_dir.name} (checkpoints: {', '.join(saved) or 'none'})")
+            return {'run_dir': run_dir, 'resumed': True}
+        print("⚠️ No unfinished run to resume. Starting a new run.")
+
+    _prune_old_runs()
+    run_dir = Path(config.CHECKPOINT_DIR) / datetime.utcnow().strftime('%Y%m%dT%H%M%S')
+    return {'run_dir': run_dir, 'resumed': False}
+
+
+def finish_run(run):
+    """Deletes a completed run's checkpoints; they are only needed to resume it."""
+    shutil.rmtree(run['run_dir'], ignore_errors=True)
+
+
+def _checkpoint_path(run, name):
+    """The existing checkpoint file of stage `name`, or None."""
+    for suffix in CHECKPOINT_SUFFIXES:
+        path = run['run_dir'] / f"{name}{suffix}"
+        if path.exists():
+            return path
+    return None
+
+
+def has_checkpoint(run, name):
+    """True when stage `name` has a saved output in this run."""
+    return _checkpoint_path(run, name) is not None
+
+
+def load_checkpoint(run, name):
+    """The saved output of stage `name` in this run, or MISSING."""
+    path = _checkpoint_path(run, name)
+    if path is None:
+        return MISSING
+    if path.suffix == '.parquet':
+        return read_frame(path)
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def save_checkpoint(run, name, value):
+    """
+    Saves a stage's output (written atomically, so a crash never leaves half a
+    checkpoint). Values other than DataFrames must be JSON-serializable.
+    """
+    os.makedirs(run['run_dir'], exist_ok=True)
+    if isinstance(value, pd.DataFrame):
+        write_frame(value, run['run_dir'] / f"{name}.parquet")
+        return
+
+    path = run['run_dir'] / f"{name}.json"
+    tmp_path = path.with_suffix('.tmp')
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(value, f)
+    os.replace(tmp_path, path)
+
+
+def checkpointed(run, name, func, keep=lambda result: True):
+    """
+    Wraps a stage function: returns the saved output when this run already
+    has one, otherwise runs func and saves its result if keep(result) is true
+    (failed or empty results are not saved, so a resume retries them).
+    """
+    def run_stage(*args):
+        saved = load_checkpoint(run, name)
+        if saved is not MISSING:
+            print(f"✅ {name}: loaded from checkpoint")
+            return saved
+
+        result = func(*args)
+        if keep(result):
+            save_checkpoint(run, name, result)
+        return result
+
+    return run_stage
@@ -0,0 +1,50 @@
+import os
+from typing import List, Optional
+
+import pandas as pd
+
+# Import configuration (Absolute Import)
+from gmod_stat_tracker import config
+
+# All the weekly pivot reads from a cached week
+PIVOT_WEEK_COLUMNS = ['BattleMetrics_Name', 'Time_Display', 'Week_Start_UTC', 'Week_End_UTC']
+
+
+def type_week_frame(week_df: pd.DataFrame) -> pd.DataFrame:
+    """Scraped week rows with Rank as a nullable integer ('#12', '12' -> 12)."""
+    week_df = week_df.reset_index(drop=True)
+    if 'Rank' in week_df.columns and not pd.api.types.is_integer_dtype(week_df['Rank']):
+        digits = week_df['Rank'].astype('string').str.replace(r'\D', '', regex=True)
+        week_df['Rank'] = pd.to_numeric(digits, errors='coerce').astype('Int32')
+    return week_df
+
+
+def write_frame(df: pd.DataFrame, path) -> None:
+    """Writes df as a compressed Parquet file (atomically, so readers never see half a file)."""
+    tmp_path = f"{path}.tmp"
+    df.to_parquet(tmp_path, engine='pyarrow', compression=config.PARQUET_COMPRESSION, index=False)
+    os.replace(tmp_path, path)
+
+
+def read_frame(path, columns: Optional[List[str]] = None) -> pd.DataFrame:
+    """Reads a Parquet file memory-mapped, only decoding `columns` when given."""
+    return pd.read_parquet(path, engine='pyarrow', columns=columns, memory_map=True)
+
+
+def migrate_pickle_week(pickle_path, parquet_path) -> bool:
+    """
+    Rewrites a legacy pickled week cache as Parquet, keeping its modification
+    time (cache validity is based on it), and removes the pickle.
+    Returns False if the pickle can no longer be read.
+    """
+    try:
+        df = pd.read_pickle(pickle_path)
+    except Exception as e:
+        print(f"⚠️ Could not read legacy cache {os.path.basename(pickle_path)}: {e}")
+        return False
+
+    saved_at = os.path.getmtime(pickle_path)
+    write_frame(type_week_frame(df), parquet_path)
+    os.utime(parquet_path, (saved_at, saved_at))
+    os.remove(pickle_path)
+    return True
@@ -18,10 +18,23 @@ CACHE_DIR = BASE_DIR / 'cache'
 BATTLEMETRICS_USERNAME = os.getenv("BATTLEMETRICS_USERNAME")
 BATTLEMETRICS_PASSWORD = os.getenv("BATTLEMETRICS_PASSWORD")
 STEAM_API_KEY = os.getenv("STEAM_API_KEY")
+# Optional JSON export of a logged-in BattleMetrics session (skips the login form)
+BATTLEMETRICS_COOKIES_FILE = os.getenv("BATTLEMETRICS_COOKIES_FILE")
 
 # --- FILE PATHS ---
 CREDS_FILE_PATH = BASE_DIR / 'google_sheets_service_account.json'
-CACHE_FILENAME = CACHE_DIR / 'historical_data_cache.pkl'
+WEEK_CACHE_DIR = CACHE_DIR / 'weeks'
+STEAM_NAME_CACHE_PATH = CACHE_DIR / 'steam_profiles.sqlite'
+# Last uploaded contents of each Google Sheets tab (uploads only send the rows that changed)
+SHEETS_SNAPSHOT_DIR = CACHE_DIR / 'sheets'
+# Stage outputs of unfinished runs for --resume (a run's are deleted once it completes);
+# only the newest CHECKPOINT_KEEP_RUNS unfinished runs are kept
+CHECKPOINT_DIR = CACHE_DIR / 'runs'
+CHECKPOINT_KEEP_RUNS = 2
+# Append-only weekly playtime per BattleMetrics player, kept beyond WEEKS_TO_PULL
+PLAYTIME_WAREHOUSE_PATH = CACHE_DIR / 'playtime_history.sqlite'
+# Icefuse stats over time: a row per player only when their stats changed since the last fetch
+LEADERBOARD_SNAPSHOT_PATH = CACHE_DIR / 'leaderboard_snapshots.sqlite'
 
 # Output CSV files
 FINAL_OUTPUT_FILENAME = OUTPUTS_DIR / 'consolidated_playtime_report.csv'
@@ -29,16 +42,54 @@ BRANCH_PIVOT_OUTPUT_PATH = OUTPUTS_DIR / 'branch_pivots.csv'
 SUBBRANCH_PIVOT_OUTPUT_PATH = OUTPUTS_DIR / 'subbranch_pivots.csv'
 US_PIVOT_OUTPUT_PATH = OUTPUTS_DIR / 'us_pivots.csv'
 LEADERBOARD_OUTPUT_FILENAME = OUTPUTS_DIR / 'icefuse_leaderboard.csv'
+HISTORY_OUTPUT_FILENAME = OUTPUTS_DIR / 'playtime_history_report.csv'
 
 # --- BATTLEMETRICS ---
 BASE_LEADERBOARD_URL = "https://www.battlemetrics.com/servers/gmod/28685000/leaderboard"
 WEEKS_TO_PULL = 8
+# Weeks in the long-range history report (read from the playtime warehouse, not scraped)
+HISTORY_WEEKS_TO_REPORT = 52
+# The history report changes little from hour to hour; it is rebuilt at most this often
+HISTORY_REPORT_INTERVAL_HOURS = 24
+# Week windows run from this weekday/hour (UTC) to the same point a week later (0 = Monday)
+WEEK_ANCHOR_WEEKDAY = 0
+WEEK_ANCHOR_HOUR = 4
+# Only the open (current) week expires; closed weeks are cached permanently
 CACHE_EXPIRY_HOURS = 1
+# Compression codec for the Parquet week cache and stage checkpoints
+PARQUET_COMPRESSION = 'zstd'
+# Number of headless browsers scraping week windows in parallel (1 = sequential)
+SCRAPER_POOL_SIZE = int(os.getenv("SCRAPER_POOL_SIZE", "3"))
+# Tries per week window in the browser pool; every retry runs in a fresh browser
+SCRAPER_WEEK_ATTEMPTS = 3
+# Weeks waiting between the scrape and the weekly pivot; the scrape pauses when the queue is full
+WEEK_STREAM_MAX_PENDING = 4
+# "selenium" (headless Chrome) or "http" (requests + lxml, no browser)
+SCRAPER_BACKEND = os.getenv("SCRAPER_BACKEND", "selenium")
+
+# --- HTTP APIs (Steam, Icefuse) ---
+HTTP_MAX_RETRIES = 4
+HTTP_BACKOFF_FACTOR = 1.0
+STEAM_API_MAX_WORKERS = 8
+# Persona names are re-checked after this long; at most STEAM_NAME_REFRESH_BUDGET stale IDs per run
+STEAM_NAME_CACHE_TTL_HOURS = 24
+STEAM_NAME_REFRESH_BUDGET = 300
 
 # --- GMOD API ---
 GMOD_API_URL = "https://icefuse.net/api/gmod_leaderboards"
 SERVER_ID = 23
-MAX_RESULTS = 5000
+# Rows per request (the server may return fewer); pages are fetched concurrently until recordsTotal is covered
+GMOD_API_PAGE_SIZE = 1000
+GMOD_API_MAX_WORKERS = 4
+# Tries per request, covering rate limits, server errors and malformed bodies (the session itself does not retry)
+GMOD_API_PAGE_ATTEMPTS = 5
+GMOD_API_TIMEOUT = 30
+GMOD_API_STREAM_CHUNK_BYTES = 64 * 1024  # Response bodies are parsed incrementally in chunks of this size
+# Roster-only lookups via search[value]: "auto" switches on when the roster is at most
+# GMOD_API_TARGETED_MAX_FRACTION of the leaderboard; "always" / "never" force a mode
+GMOD_API_TARGETED_MODE = os.getenv("GMOD_API_TARGETED_MODE", "auto")
+GMOD_API_TARGETED_MAX_FRACTION = 0.1
+GMOD_API_SEARCH_LENGTH = 10
 
 # --- GOOGLE SHEETS ---
 SHEET_ID = '1xNcKf3IkfoEc4XgMdWoZ6-WJhNFG18y7yl9svitHy_0'
@@ -51,6 +102,11 @@ SUBBRANCH_PIVOT_SHEET_TAB_NAME = 'SubBranchPivots'
 US_PIVOT_SHEET_TAB_NAME = 'USPivots'
 LEADERBOARD_SHEET_TAB_NAME = 'IceFuse_Leaderboard'
 
+# Changed rows are sent in batch_update chunks of this many rows, a few chunks at a time
+SHEETS_UPLOAD_CHUNK_ROWS = 1000
+SHEETS_UPLOAD_MAX_WORKERS = 2
+SHEETS_API_ATTEMPTS = 5
+
 # --- ROSTER MAPPINGS ---
 STEAM_ID_COLUMN_INDEXES = [1, 2, 3, 4, 5, 6, 7, 8, 9, 10, 11]
 
@@ -0,0 +1,61 @@
+import pandas as pd
+from typing import Dict, List, Optional, Tuple
+
+# Each rule: (rule name, stat column, comparison, threshold, message template)
+OUTLIER_RULES: List[Tuple[str, str, str, float, str]] = [
+    ('HS_Over_100', 'HS_Percent', 'gt', 100, "Headshot % = {value:.2f}% (over 100%)"),
+    ('KD_Over_10', 'KD_Ratio', 'gt', 10, "K/D Ratio = {value:.2f} (over 10)"),
+    ('Negative_Kills', 'Kills', 'lt', 0, "{column} = {value} (negative)"),
+    ('Negative_Deaths', 'Deaths', 'lt', 0, "{column} = {value} (negative)"),
+    ('Negative_Money', 'Money', 'lt', 0, "{column} = {value} (negative)"),
+    ('Negative_Level', 'Level', 'lt', 0, "{column} = {value} (negative)"),
+]
+
+
+def find_outliers(df: pd.DataFrame, column_prefix: str = '', rules=None) -> pd.DataFrame:
+    """
+    Runs every outlier rule as a column mask over the whole frame.
+    Returns a boolean violation table (one column per rule) aligned to df.index.
+    Rules whose column is missing from df are skipped.
+    """
+    rules = OUTLIER_RULES if rules is None else rules
+    violations = {}
+
+    for rule_name, column, comparison, threshold, _ in rules:
+        col_name = f"{column_prefix}{column}"
+        if col_name not in df.columns:
+            continue
+
+        # Blank strings and unparseable values become NaN and never match
+        values = pd.to_numeric(df[col_name], errors='coerce')
+        if comparison == 'gt':
+            violations[rule_name] = (values > threshold).fillna(False)
+        else:
+            violations[rule_name] = (values < threshold).fillna(False)
+
+    return pd.DataFrame(violations, index=df.index, dtype=bool)
+
+
+def describe_outliers(df: pd.DataFrame, violations: pd.DataFrame, column_prefix: str = '',
+                      rules=None) -> Dict[object, List[str]]:
+    """Builds the human-readable issue list for each flagged row only."""
+    rules = OUTLIER_RULES if rules is None else rules
+    flagged = violations.any(axis=1) if not violations.empty else pd.Series(False, index=df.index)
+    issues: Dict[object, List[str]] = {}
+
+    for idx in flagged[flagged].index:
+        row_issues = []
+        for rule_name, column, _, _, template in rules:
+            if rule_name in violations.columns and violations.at[idx, rule_name]:
+                col_name = f"{column_prefix}{column}"
+                value = float(df.at[idx, col_name])
+                row_issues.append(template.format(column=col_name, value=value))
+        issues[idx] = row_issues
+
+    return issues
+
+
+def rules_for_columns(columns: List[str], rules: Optional[list] = None) -> list:
+    """Returns the subset of rules that check the given stat columns."""
+    rules = OUTLIER_RULES if rules is None else rules
+    return [rule for rule in rules if rule[1] in columns]
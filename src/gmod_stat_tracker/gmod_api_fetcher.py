@@ -1,80 +1,383 @@
+import json
 import requests
 import pandas as pd
 from typing import Dict, List
-import re
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
 # Import configuration (Absolute Import)
 from gmod_stat_tracker import config
+from gmod_stat_tracker.http_client import create_pooled_session, RETRY_STATUS_CODES
 
-def clean_html(text):
-    """(Unchanged logic)"""
-    if text is None or text == '':
-        return ''
-    text = str(text)
-    text = re.sub(r'<[^>]*>', '', text)
-    return text.strip()
+HTML_TAG_PATTERN = r'<[^>]*>'
 
+# Icefuse API field -> DataFrame column
+LEADERBOARD_FIELDS = {
+    'steamid': 'SteamID64',
+    'pos': 'Rank',
+    'rpname': 'RP_Name',
+    'name': 'Player_Name',
+    'money': 'Money',
+    'level': 'Level',
+    'playtime': 'Total_Playtime',
+    'kills': 'Kills',
+    'deaths': 'Deaths',
+    'kd_ratio': 'KD_Ratio',
+    'headshots': 'Headshots',
+    'damage': 'Damage',
+    'headshot_percent': 'HS_Percent'
+}
 
-def fetch_gmod_leaderboard():
+INTEGER_COLUMNS = ['Rank', 'Kills', 'Deaths', 'Level', 'Headshots', 'Damage']
+FLOAT_COLUMNS = ['Money', 'KD_Ratio', 'HS_Percent']
+CATEGORY_COLUMNS = ['RP_Name', 'Player_Name']
+
+JSON_DECODER = json.JSONDecoder()
+JSON_WHITESPACE = ' \t\n\r'
+JSON_VALUE_TERMINATORS = JSON_WHITESPACE + ',:]}'
+# Consumed text is dropped from the parse buffer once it grows past this many characters
+STREAM_COMPACT_CHARS = 1 << 16
+
+
+def clean_html_column(values: pd.Series) -> pd.Series:
+    """Strips HTML tags and surrounding whitespace from a whole column at once."""
+    return values.fillna('').astype(str).str.replace(HTML_TAG_PATTERN, '', regex=True).str.strip()
+
+
+def new_column_buffers() -> Dict[str, List]:
+    """Empty columnar buffers, one list per API field we keep."""
+    return {field: [] for field in LEADERBOARD_FIELDS}
+
+
+def extend_column_buffers(target: Dict[str, List], columns: Dict[str, List]) -> None:
+    """Appends one page's buffers to target in place."""
+    for field in target:
+        target[field].extend(columns[field])
+
+
+def iter_json_array(chunks, array_key, meta):
     """
-    Fetches the entire GMod leaderboard from Icefuse API.
-    Returns a DataFrame with player statistics.
-    (Uses config variables)
+    Incrementally parses a top-level JSON object read from text chunks and yields
+    the elements of its array_key array one by one, so the whole body is never
+    held in memory. Every other top-level key is stored in meta; array_key
+    itself is recorded there as an empty list once its array has been read.
+    A value is only accepted once the character after it (a delimiter or
+    whitespace) is buffered or the stream has ended, so numbers split across
+    chunks ("500" + ".25") are not cut short.
     """
-    print("\n[FETCHING GMOD LEADERBOARD DATA]")
+    chunks = iter(chunks)
+    buf = ''
+    pos = 0
+    ended = False
+    
+    def fill():
+        nonlocal buf, pos, ended
+        chunk = next(chunks, None)
+        if chunk is None:
+            ended = True
+            return False
+        if pos > STREAM_COMPACT_CHARS:
+            buf, pos = buf[pos:], 0
+        buf += chunk
+        return True
+    
+    def peek():
+        nonlocal pos
+        while True:
+            while pos < len(buf) and buf[pos] in JSON_WHITESPACE:
+                pos += 1
+            if pos < len(buf):
+                return buf[pos]
+            if not fill():
+                raise ValueError("Unexpected end of JSON stream")
+    
+    def expect(char):
+        nonlocal pos
+        if peek() != char:
+            raise ValueError(f"Expected '{char}' at offset {pos} of JSON stream")
+        pos += 1
     
+    def read_value():
+        nonlocal pos
+        peek()
+        while True:
+            try:
+                value, end = JSON_DECODER.raw_decode(buf, pos)
+                if ended or (end < len(buf) and buf[end] in JSON_VALUE_TERMINATORS):
+                    pos = end
+                    return value
+            except json.JSONDecodeError:
+                if ended:
+                    raise
+            fill()
+    
+    expect('{')
+    while peek() != '}':
+        key = read_value()
+        expect(':')
+        if key == array_key:
+            expect('[')
+            while peek() != ']':
+                yield read_value()
+                if peek() == ',':
+                    pos += 1
+            pos += 1
+            meta[array_key] = []
+        else:
+            meta[key] = read_value()
+        if peek() == ',':
+            pos += 1
+
+
+def build_leaderboard_frame(records) -> pd.DataFrame:
+    """
+    Builds the typed leaderboard DataFrame straight from the API's JSON records
+    (a list of row dicts or columnar buffers keyed by API field).
+    HTML is stripped column by column and every column is typed once:
+    nullable Int64 counts, float Money/KD/HS%, categorical names and string
+    SteamID64/Total_Playtime. Rows without a SteamID are dropped.
+    """
+    if isinstance(records, dict):
+        raw = pd.DataFrame(records, columns=list(LEADERBOARD_FIELDS))
+    else:
+        raw = pd.DataFrame.from_records(records, columns=list(LEADERBOARD_FIELDS))
+    raw = raw.rename(columns=LEADERBOARD_FIELDS)
+    
+    df = pd.DataFrame({column: clean_html_column(raw[column]) for column in raw.columns})
+    df = df[df['SteamID64'] != ''].reset_index(drop=True)
+    
+    for column in INTEGER_COLUMNS + FLOAT_COLUMNS:
+        # Drop thousands separators and unit symbols ("1,234", "$50", "12.5%")
+        numeric = pd.to_numeric(df[column].str.replace(r'[,$%\s]', '', regex=True), errors='coerce')
+        df[column] = numeric.round().astype('Int64') if column in INTEGER_COLUMNS else numeric.astype('float64')
+    
+    for column in CATEGORY_COLUMNS:
+        df[column] = df[column].astype('category')
+    
+    return df
+
+
+def _retry_delay(error, attempt):
+    """
+    Seconds to wait before retrying a failed request, or None if it should not
+    be retried (a 4xx other than 429). Honours Retry-After on rate limits.
+    """
+    response = getattr(error, 'response', None)
+    if isinstance(error, requests.exceptions.HTTPError) and response is not None:
+        if response.status_code not in RETRY_STATUS_CODES:
+            return None
+        retry_after = response.headers.get('Retry-After', '')
+        if retry_after.isdigit():
+            return float(retry_after)
+    return config.HTTP_BACKOFF_FACTOR * (2 ** (attempt - 1))
+
+
+def _request_page(session, start, length, draw, search=''):
+    """
+    Requests one DataTables-style page (rows start..start+length) from the Icefuse API,
+    optionally filtered with search[value].
+    The body is streamed and its 'data' rows are appended straight into columnar
+    buffers; returns the top-level fields with 'data' replaced by those buffers.
+    This is the only retry layer: 429/5xx, connection errors and malformed
+    bodies are retried here, up to GMOD_API_PAGE_ATTEMPTS tries.
+    """
     params = {
         'server_id': config.SERVER_ID,
-        'draw': 1,
-        'start': 0,
-        'length': config.MAX_RESULTS,
-        'search[value]': '',
+        'draw': draw,
+        'start': start,
+        'length': length,
+        'search[value]': search,
         'order[0][dir]': 'desc',
         'orderBy': 'money',
         'category': 'all'
     }
     
+    for attempt in range(1, config.GMOD_API_PAGE_ATTEMPTS + 1):
+        try:
+            with session.get(config.GMOD_API_URL, params=params, timeout=config.GMOD_API_TIMEOUT, stream=True) as response:
+                response.raise_for_status()
+                response.encoding = response.encoding or 'utf-8'
+                
+                page = {}
+                columns = new_column_buffers()
+                chunks = response.iter_content(chunk_size=config.GMOD_API_STREAM_CHUNK_BYTES, decode_unicode=True)
+                for row in iter_json_array(chunks, 'data', page):
+                    if not isinstance(row, dict):
+                        raise ValueError("API 'data' array contains a non-object row")
+                    for field, values in columns.items():
+                        values.append(row.get(field))
+                
+                if 'data' not in page:
+                    raise ValueError("API response missing 'data' array")
+            
+            page['data'] = columns
+            return page
+        
+        except (requests.exceptions.RequestException, ValueError) as e:
+            delay = _retry_delay(e, attempt)
+            if delay is None or attempt == config.GMOD_API_PAGE_ATTEMPTS:
+                raise
+            print(f"⚠️ Page at offset {start} failed (attempt {attempt}): {e}. Retrying...")
+            time.sleep(delay)
+
+
+def _row_count(columns):
+    return len(columns['steamid'])
+
+
+def _fetch_pages(session, page_lengths, first_draw):
+    """Requests {offset: length} pages concurrently. Returns ({offset: columns}, failed_offsets)."""
+    pages = {}
+    failed_offsets = []
+    if not page_lengths:
+        return pages, failed_offsets
+    
+    with ThreadPoolExecutor(max_workers=config.GMOD_API_MAX_WORKERS) as executor:
+        futures = {
+            executor.submit(_request_page, session, offset, length, draw): offset
+            for draw, (offset, length) in enumerate(page_lengths.items(), start=first_draw)
+        }
+        for future in as_completed(futures):
+            offset = futures[future]
+            try:
+                pages[offset] = future.result()['data']
+            except Exception as e:
+                print(f"❌ Page at offset {offset} failed: {e}")
+                failed_offsets.append(offset)
+    
+    return pages, failed_offsets
+
+
+def _fetch_all_pages(session):
+    """
+    Fetches the first page to learn recordsTotal and how many rows the server
+    really returns per request (it may cap GMOD_API_PAGE_SIZE), then the
+    remaining pages concurrently, stepping by that page size. Pages that come
+    back short are topped up once, and any remaining gap to recordsTotal is
+    reported. Returns (columns, failed_offsets).
+    """
+    first_page = _request_page(session, 0, config.GMOD_API_PAGE_SIZE, 1)
+    columns = first_page['data']
+    page_size = _row_count(columns)
+    
+    records_total = int(first_page.get('recordsTotal') or first_page.get('recordsFiltered') or page_size)
+    if page_size == 0:
+        return columns, []
+    
+    page_lengths = {offset: min(page_size, records_total - offset) for offset in range(page_size, records_total, page_size)}
+    print(f"Leaderboard has {records_total} entries: fetching {len(page_lengths) + 1} page(s) of {page_size}")
+    
+    pages, failed_offsets = _fetch_pages(session, page_lengths, first_draw=2)
+    
+    top_ups = {
+        offset + _row_count(pages[offset]): length - _row_count(pages[offset])
+        for offset, length in page_lengths.items()
+        if offset in pages and _row_count(pages[offset]) < length
+    }
+    if top_ups:
+        print(f"⚠️ {len(top_ups)} page(s) came back short, requesting the missing rows")
+        top_up_pages, top_up_failed = _fetch_pages(session, top_ups, first_draw=2 + len(page_lengths))
+        pages.update(top_up_pages)
+        failed_offsets.extend(top_up_failed)
+    
+    for offset in sorted(pages):
+        extend_column_buffers(columns, pages.pop(offset))
+    
+    if _row_count(columns) != records_total:
+        print(f"⚠️ Fetched {_row_count(columns)} rows but the API reported recordsTotal={records_total}")
+    
+    return columns, sorted(failed_offsets)
+
+
+def _fetch_roster_rows(session, steam_ids):
+    """
+    Targeted mode: one search[value] query per SteamID64, sent with bounded
+    concurrency. Returns (columns, failed_ids); the search is a substring match, so
+    callers keep only exact SteamID64 hits.
+    """
+    columns = new_column_buffers()
+    failed_ids = []
+    
+    with ThreadPoolExecutor(max_workers=config.GMOD_API_MAX_WORKERS) as executor:
+        futures = {
+            executor.submit(_request_page, session, 0, config.GMOD_API_SEARCH_LENGTH, draw, steam_id): steam_id
+            for draw, steam_id in enumerate(steam_ids, start=2)
+        }
+        for future in as_completed(futures):
+            steam_id = futures[future]
+            try:
+                extend_column_buffers(columns, future.result()['data'])
+            except Exception as e:
+                print(f"❌ Lookup failed for {steam_id}: {e}")
+                failed_ids.append(steam_id)
+    
+    return columns, failed_ids
+
+
+def _use_targeted_mode(steam_ids, records_total):
+    """Targeted lookups win when the roster is a small fraction of the leaderboard."""
+    if not steam_ids or config.GMOD_API_TARGETED_MODE == 'never':
+        return False
+    if config.GMOD_API_TARGETED_MODE == 'always':
+        return True
+    return len(steam_ids) <= records_total * config.GMOD_API_TARGETED_MAX_FRACTION
+
+
+def fetch_gmod_leaderboard(steam_ids=None):
+    """
+    Fetches the GMod leaderboard from Icefuse API.
+    Returns a DataFrame with player statistics.
+    
+    By default pages of GMOD_API_PAGE_SIZE are requested concurrently over one
+    pooled session until recordsTotal is covered, so no rows are truncated.
+    When steam_ids (the roster) is much smaller than the leaderboard, only
+    those players are looked up (see GMOD_API_TARGETED_MODE); the result has
+    the same schema. In "auto" mode a one-row size probe makes that decision,
+    and if it fails the full leaderboard is paged through instead; "always"
+    skips the probe and goes straight to the lookups.
+    """
+    print("\n[FETCHING GMOD LEADERBOARD DATA]")
+    
     try:
         print(f"Requesting data from Icefuse API...")
-        response = requests.get(config.GMOD_API_URL, params=params, timeout=30)
-        response.raise_for_status()
-        
-        data = response.json()
+        # _request_page does the retrying, so the session must not retry as well
+        session = create_pooled_session(config.GMOD_API_MAX_WORKERS, max_retries=0)
         
-        if 'data' not in data or not isinstance(data['data'], list):
-            print("❌ API response missing 'data' array")
-            return pd.DataFrame()
+        targeted = False
+        records_total = None
+        if steam_ids and config.GMOD_API_TARGETED_MODE == 'always':
+            targeted = True
+        elif steam_ids and config.GMOD_API_TARGETED_MODE != 'never':
+            try:
+                probe = _request_page(session, 0, 1, 1)
+                records_total = int(probe.get('recordsTotal') or probe.get('recordsFiltered') or 0)
+                targeted = _use_targeted_mode(steam_ids, records_total)
+            except (requests.exceptions.RequestException, ValueError) as e:
+                print(f"⚠️ Leaderboard size probe failed ({e}), fetching every page instead")
         
-        leaderboard_data = data['data']
+        if targeted:
+            print(f"Targeted mode: looking up {len(steam_ids)} roster players"
+                  + (f" instead of {records_total} leaderboard entries" if records_total is not None else ""))
+            leaderboard_data, failed_ids = _fetch_roster_rows(session, list(steam_ids))
+            failures = f"{len(failed_ids)} player lookup(s) failed" if failed_ids else None
+        else:
+            leaderboard_data, failed_offsets = _fetch_all_pages(session)
+            failures = f"{len(failed_offsets)} page(s) could not be fetched (offsets: {failed_offsets})" if failed_offsets else None
         
-        if len(leaderboard_data) == 0:
+        if _row_count(leaderboard_data) == 0:
             print("⚠️ API returned empty data array")
             return pd.DataFrame()
         
-        print(f"✅ Fetched {len(leaderboard_data)} leaderboard entries")
-        
-        parsed_data = []
+        print(f"✅ Fetched {_row_count(leaderboard_data)} leaderboard entries")
+        if failures:
+            print(f"⚠️ {failures}")
         
-        for row in leaderboard_data:
-            if 'steamid' in row and row['steamid']:
-                parsed_row = {
-                    'SteamID64': clean_html(row.get('steamid', '')),
-                    'Rank': clean_html(row.get('pos', '')),
-                    'RP_Name': clean_html(row.get('rpname', '')),
-                    'Player_Name': clean_html(row.get('name', '')),
-                    'Money': clean_html(row.get('money', '')),
-                    'Level': clean_html(row.get('level', '')),
-                    'Total_Playtime': clean_html(row.get('playtime', '')),
-                    'Kills': clean_html(row.get('kills', '')),
-                    'Deaths': clean_html(row.get('deaths', '')),
-                    'KD_Ratio': clean_html(row.get('kd_ratio', '')),
-                    'Headshots': clean_html(row.get('headshots', '')),
-                    'Damage': clean_html(row.get('damage', '')),
-                    'HS_Percent': clean_html(row.get('headshot_percent', ''))
-                }
-                parsed_data.append(parsed_row)
+        df = build_leaderboard_frame(leaderboard_data)
+        if targeted:
+            df = df[df['SteamID64'].isin(set(steam_ids))]
         
-        df = pd.DataFrame(parsed_data)
+        # Rankings can shift between concurrently fetched pages
+        df = df.drop_duplicates(subset='SteamID64', keep='first').reset_index(drop=True)
         
         print(f"✅ Parsed {len(df)} player records")
         
@@ -0,0 +1,32 @@
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# Import configuration (Absolute Import)
+from gmod_stat_tracker import config
+
+RETRY_STATUS_CODES = (429, 500, 502, 503, 504)
+
+
+def create_pooled_session(pool_size: int, max_retries: int = None, backoff_factor: float = None) -> requests.Session:
+    """
+    Returns a keep-alive requests.Session whose connection pool fits pool_size
+    concurrent requests. Rate limits (429) and server errors (5xx) are retried
+    with exponential backoff, honouring Retry-After. With max_retries=0 nothing
+    is retried and error responses are returned as they are, for callers that
+    do their own retrying.
+    """
+    max_retries = config.HTTP_MAX_RETRIES if max_retries is None else max_retries
+    retry = Retry(
+        total=max_retries,
+        backoff_factor=config.HTTP_BACKOFF_FACTOR if backoff_factor is None else backoff_factor,
+        status_forcelist=RETRY_STATUS_CODES if max_retries else (),
+        allowed_methods=frozenset(['GET']),
+        respect_retry_after_header=True
+    )
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+
+    session = requests.Session()
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
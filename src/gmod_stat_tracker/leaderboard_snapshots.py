@@ -0,0 +1,175 @@
+import hashlib
+import os
+import sqlite3
+import time
+from datetime import datetime
+from typing import Iterable, Optional
+
+import pandas as pd
+
+# Leaderboard columns kept per snapshot (Rank and the derived ratios are not: they change without the player doing anything)
+SNAPSHOT_COLUMNS = ['Kills', 'Deaths', 'Money', 'Level', 'Headshots', 'Damage', 'Total_Playtime', 'RP_Name', 'Player_Name']
+SNAPSHOT_DB_COLUMNS = ['kills', 'deaths', 'money', 'level', 'headshots', 'damage', 'total_playtime', 'rp_name', 'player_name']
+GROWTH_COLUMNS = ['Kills', 'Deaths', 'Money', 'Level', 'Headshots', 'Damage']
+# How each snapshot column is normalised before it is hashed and stored, so the same stats
+# hash the same whatever dtype they arrived in (12, 12.0, np.int64(12) and Int64 12 alike)
+SNAPSHOT_COLUMN_KINDS = {
+    'Kills': 'int', 'Deaths': 'int', 'Money': 'money', 'Level': 'int', 'Headshots': 'int', 'Damage': 'int',
+    'Total_Playtime': 'text', 'RP_Name': 'text', 'Player_Name': 'text'
+}
+
+
+def _connect(db_path) -> sqlite3.Connection:
+    """Opens the snapshot store, creating the file and tables on first use."""
+    os.makedirs(os.path.dirname(db_path), exist_ok=True)
+    conn = sqlite3.connect(db_path)
+    conn.executescript(
+        """
+        CREATE TABLE IF NOT EXISTS snapshots (
+            taken_at REAL PRIMARY KEY,
+            players_seen INTEGER NOT NULL,
+            players_changed INTEGER NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS player_stats (
+            steam_id TEXT NOT NULL,
+            taken_at REAL NOT NULL,
+            stats_hash TEXT NOT NULL,
+            kills INTEGER,
+            deaths INTEGER,
+            money REAL,
+            level INTEGER,
+            headshots INTEGER,
+            damage INTEGER,
+            total_playtime TEXT,
+            rp_name TEXT,
+            player_name TEXT,
+            PRIMARY KEY (steam_id, taken_at)
+        );
+        CREATE INDEX IF NOT EXISTS idx_player_stats_taken_at ON player_stats (taken_at);
+        CREATE TABLE IF NOT EXISTS latest_stats_hash (
+            steam_id TEXT PRIMARY KEY,
+            stats_hash TEXT NOT NULL
+        );
+        """
+    )
+    return conn
+
+
+def _canonical_value(value, kind):
+    """One stat as a plain int, float (money, to the cent) or stripped str; missing -> None."""
+    if pd.isna(value):
+        return None
+    if kind == 'int':
+        return int(round(float(value)))
+    if kind == 'money':
+        return round(float(value), 2)
+    return str(value).strip()
+
+
+def _stats_hash(stats) -> str:
+    """Short content hash of one player's canonical stat values (see _canonical_value)."""
+    text = '\x1f'.join('\\N' if value is None else f"{value:.2f}" if isinstance(value, float) else str(value)
+                       for value in stats)
+    return hashlib.blake2b(text.encode('utf-8'), digest_size=8).hexdigest()
+
+
+def record_snapshot(db_path, leaderboard_df: pd.DataFrame, taken_at: float = None) -> int:
+    """
+    Records one fetch_gmod_leaderboard result. Only players whose stats
+    (SNAPSHOT_COLUMNS) hash differently from their last stored row are
+    written, so an unchanged player costs nothing. Returns the rows written.
+    Values are normalised per column first (SNAPSHOT_COLUMN_KINDS), so a
+    change of dtype in the fetcher does not count as every player changing.
+    """
+    if leaderboard_df.empty:
+        return 0
+
+    taken_at = time.time() if taken_at is None else taken_at
+    kinds = ['text'] + [SNAPSHOT_COLUMN_KINDS[column] for column in SNAPSHOT_COLUMNS]
+    rows = [
+        tuple(_canonical_value(value, kind) for value, kind in zip(row, kinds))
+        for row in leaderboard_df[['SteamID64'] + SNAPSHOT_COLUMNS].itertuples(index=False)
+    ]
+
+    with _connect(db_path) as conn:
+        latest = dict(conn.execute("SELECT steam_id, stats_hash FROM latest_stats_hash"))
+        changed = []
+        for steam_id, *stats in rows:
+            stats_hash = _stats_hash(stats)
+            if latest.get(steam_id) != stats_hash:
+                changed.append((steam_id, taken_at, stats_hash, *stats))
+
+        conn.executemany(
+            f"""
+            INSERT OR REPLACE INTO player_stats (steam_id, taken_at, stats_hash, {', '.join(SNAPSHOT_DB_COLUMNS)})
+            VALUES ({', '.join('?' * (3 + len(SNAPSHOT_DB_COLUMNS)))})
+            """,
+            changed
+        )
+        conn.executemany(
+            """
+            INSERT INTO latest_stats_hash (steam_id, stats_hash) VALUES (?, ?)
+            ON CONFLICT(steam_id) DO UPDATE SET stats_hash = excluded.stats_hash
+            """,
+            [(row[0], row[2]) for row in changed]
+        )
+        conn.execute(
+            "INSERT OR REPLACE INTO snapshots (taken_at, players_seen, players_changed) VALUES (?, ?, ?)",
+            (taken_at, len(rows), len(changed))
+        )
+    conn.close()
+
+    print(f"✅ Leaderboard snapshot: {len(changed)}/{len(rows)} player(s) changed since the last one")
+    return len(changed)
+
+
+def stats_as_of(db_path, when: Optional[datetime] = None, steam_ids: Optional[Iterable[str]] = None) -> pd.DataFrame:
+    """
+    Every player's stats as of `when` (UTC, default now): their latest stored
+    row at or before it. Columns: SteamID64, Taken_At (unix time) and SNAPSHOT_COLUMNS.
+    """
+    params = [time.time() if when is None else (when - datetime(1970, 1, 1)).total_seconds()]
+    player_filter = ""
+    if steam_ids is not None:
+        steam_ids = list(steam_ids)
+        player_filter = f"AND steam_id IN ({', '.join('?' * len(steam_ids))})"
+        params += steam_ids
+
+    # Latest row per player; the (steam_id, taken_at) primary key serves the partition order
+    query = f"""
+        SELECT steam_id, taken_at, {', '.join(SNAPSHOT_DB_COLUMNS)}
+        FROM (
+            SELECT *, ROW_NUMBER() OVER (PARTITION BY steam_id ORDER BY taken_at DESC) AS recency
+            FROM player_stats
+            WHERE taken_at <= ? {player_filter}
+        )
+        WHERE recency = 1
+    """
+    with _connect(db_path) as conn:
+        stats = pd.read_sql_query(query, conn, params=params)
+    conn.close()
+
+    stats.columns = ['SteamID64', 'Taken_At'] + SNAPSHOT_COLUMNS
+    return stats
+
+
+def stat_growth(db_path, start: datetime, end: Optional[datetime] = None,
+                steam_ids: Optional[Iterable[str]] = None) -> pd.DataFrame:
+    """
+    Per-player change in GROWTH_COLUMNS between `start` and `end` (default now),
+    plus per-day rates (Kills_Per_Day, Level_Per_Day, ...) over the window.
+    Players without a snapshot at or before start are left out.
+    """
+    end = end or datetime.utcnow()
+    before = stats_as_of(db_path, start, steam_ids).set_index('SteamID64')
+    after = stats_as_of(db_path, end, steam_ids).set_index('SteamID64')
+    players = before.index.intersection(after.index)
+    before, after = before.loc[players], after.loc[players]
+
+    days = (end - start).total_seconds() / 86400
+    growth = pd.DataFrame(index=players)
+    for column in GROWTH_COLUMNS:
+        gained = after[column] - before[column]
+        growth[f'{column}_Gained'] = gained
+        growth[f'{column}_Per_Day'] = gained / days if days > 0 else float('nan')
+    return growth.reset_index()
@@ -1,83 +1,67 @@
 import pandas as pd
+import numpy as np
+import queue
+import threading
 import time
 from datetime import datetime, timedelta
 import os
-import pickle
 from typing import Tuple
-import gspread
-from google.oauth2.service_account import Credentials
-import re
 
 # Import from our own package modules (Absolute Imports)
-from gmod_stat_tracker.battlemetrics_scraper import (
-    login_to_battlemetrics,
-    scrape_multiple_weeks
-)
+from gmod_stat_tracker.battlemetrics_weeks import WeekScrapeError, get_week_windows, week_range_label
+from gmod_stat_tracker.battlemetrics_http import create_http_session, scrape_weeks_http
 from gmod_stat_tracker.roster_manager import (
     get_steam_ids_from_google_sheet,
-    resolve_steam_ids_to_names
+    resolve_steam_ids_to_names,
+    MEMBERSHIP_MASK_COLUMN,
+    column_bit,
+    columns_mask
 )
 from gmod_stat_tracker.gmod_api_fetcher import fetch_gmod_leaderboard
+from gmod_stat_tracker.data_quality import find_outliers, describe_outliers
+from gmod_stat_tracker.columnar_cache import (
+    PIVOT_WEEK_COLUMNS,
+    type_week_frame,
+    write_frame,
+    read_frame,
+    migrate_pickle_week
+)
+from gmod_stat_tracker.leaderboard_snapshots import record_snapshot
+from gmod_stat_tracker.playtime_warehouse import record_week, recorded_weeks, query_playtime, latest_player_names
+from gmod_stat_tracker.checkpoints import (
+    MISSING,
+    start_run,
+    finish_run,
+    has_checkpoint,
+    load_checkpoint,
+    save_checkpoint,
+    checkpointed
+)
+from gmod_stat_tracker.task_graph import TaskCancelled, run_task_graph, print_task_report
+from gmod_stat_tracker.sheets_uploader import UploadQueue
 
 # Import all configuration from config.py
 from gmod_stat_tracker import config
 
-from selenium import webdriver
-from selenium.webdriver.chrome.service import Service
-from webdriver_manager.chrome import ChromeDriverManager
-from selenium.common.exceptions import WebDriverException
-
 
 def detect_and_warn_outliers(df):
-    """(Unchanged logic)"""
+    """Flags rows that break any data quality rule (vectorized, see data_quality)."""
     print("\n" + "="*60)
     print("DATA QUALITY CHECK - DETECTING OUTLIERS")
     print("="*60)
     
     df = df.copy()
-    df['Has_Outlier'] = False
-    outlier_count = 0
+    violations = find_outliers(df)
+    df['Has_Outlier'] = violations.any(axis=1) if not violations.empty else False
     
-    for idx, row in df.iterrows():
-        player_name = row.get('SteamName_Current', 'Unknown')
-        issues = []
-        
-        # Check Headshot % (should be 0-100)
-        if 'HS_Percent' in row and pd.notna(row['HS_Percent']) and str(row['HS_Percent']).strip() != '':
-            try:
-                hs_pct = float(row['HS_Percent'])
-                if hs_pct > 100:
-                    issues.append(f"Headshot % = {hs_pct:.2f}% (over 100%)")
-                    df.at[idx, 'Has_Outlier'] = True
-            except (ValueError, TypeError):
-                pass
-        
-        # Check K/D Ratio (reasonable range 0-10)
-        if 'KD_Ratio' in row and pd.notna(row['KD_Ratio']) and str(row['KD_Ratio']).strip() != '':
-            try:
-                kd = float(row['KD_Ratio'])
-                if kd > 10:
-                    issues.append(f"K/D Ratio = {kd:.2f} (over 10)")
-                    df.at[idx, 'Has_Outlier'] = True
-            except (ValueError, TypeError):
-                pass
-        
-        # Check for negative values
-        for col in ['Kills', 'Deaths', 'Money', 'Level']:
-            if col in row and pd.notna(row[col]) and str(row[col]).strip() != '':
-                try:
-                    val = float(row[col])
-                    if val < 0:
-                        issues.append(f"{col} = {val} (negative)")
-                        df.at[idx, 'Has_Outlier'] = True
-                except (ValueError, TypeError):
-                    pass
-        
-        if issues:
-            outlier_count += 1
-            print(f"⚠️ Player: {player_name}")
-            for issue in issues:
-                print(f"   - {issue}")
+    issues_by_row = describe_outliers(df, violations)
+    outlier_count = len(issues_by_row)
+    
+    for idx, issues in issues_by_row.items():
+        player_name = df.at[idx, 'SteamName_Current'] if 'SteamName_Current' in df.columns else 'Unknown'
+        print(f"⚠️ Player: {player_name}")
+        for issue in issues:
+            print(f"   - {issue}")
     
     if outlier_count == 0:
         print("✅ No outliers detected!")
@@ -90,505 +74,488 @@ def detect_and_warn_outliers(df):
     
     return df
 
-def format_date_range_short(date_range_str):
-    """(Unchanged logic)"""
-    try:
-        parts = date_range_str.split(' - ')
-        if len(parts) == 2:
-            start_date = datetime.strptime(parts[0], '%Y-%m-%d %H:%M')
-            end_date = datetime.strptime(parts[1], '%Y-%m-%d %H:%M')
-            return f"{start_date.strftime('%m/%d')} - {end_date.strftime('%m/%d')}"
-    except:
-        pass
-    return date_range_str
-
-def parse_playtime_to_hours(time_str):
-    """(Unchanged logic)"""
-    if pd.isna(time_str) or time_str == '':
-        return 0.0
-    
-    time_str = str(time_str).strip()
-    
-    if 'h' in time_str or 'd' in time_str:
-        total_hours = 0.0
-        
-        days_match = re.search(r'(\d+)d', time_str)
-        if days_match:
-            total_hours += int(days_match.group(1)) * 24
-        
-        hours_match = re.search(r'(\d+)h', time_str)
-        if hours_match:
-            total_hours += int(hours_match.group(1))
-        
-        minutes_match = re.search(r'(\d+)m', time_str)
-        if minutes_match:
-            total_hours += int(minutes_match.group(1)) / 60.0
-        
-        return round(total_hours, 2)
-    
-    if ':' in time_str:
-        parts = time_str.split(':')
-        if len(parts) == 2:
-            try:
-                hours = int(parts[0])
-                minutes = int(parts[1])
-                return round(hours + minutes / 60.0, 2)
-            except ValueError:
-                return 0.0
-    
-    return 0.0
-
-def safe_float(value):
-    """(Unchanged logic)"""
-    try:
-        return float(value) if pd.notna(value) and value != '' else 0.0
-    except (ValueError, TypeError):
-        return 0.0
-
-def calculate_roster_fields(row):
-    """(Unchanged logic)"""
-    branch = "Unknown"
-    sub_branch = "None"
-    
-    for index, branch_name in config.BRANCH_MAPPING.items():
-        col_name = f'Col_{index}_Member'
-        if index <= 4 and row.get(col_name) == True:
-            branch = branch_name
-            break
+# One combined pattern: lookaheads pick up the first "Nd", "Nh" and "Nm" anywhere in the
+# string (the first match of each unit, as re.search finds it), the tail matches an "H:MM" clock value.
+PLAYTIME_PATTERN = (
+    r'^(?=(?:.*?(?P<days>\d+)d)?)'
+    r'(?=(?:.*?(?P<hours>\d+)h)?)'
+    r'(?=(?:.*?(?P<minutes>\d+)m)?)'
+    r'(?:\s*(?P<clock_hours>\d+)\s*:\s*(?P<clock_minutes>\d+)\s*$)?'
+)
 
-    sub_branches = []
-    for index, sub_branch_name in config.SUB_BRANCH_MAPPING.items():
-        col_name = f'Col_{index}_Member'
-        if index >= 5 and row.get(col_name) == True:
-            sub_branches.append(sub_branch_name)
+def parse_playtime_hours(values):
+    """
+    Playtime strings ('1d 2h 30m', '5:30') as hours, for a Series or a whole block of week columns.
+    Unique strings are parsed once with PLAYTIME_PATTERN and mapped back to every cell.
+    Returns float hours with the same shape, index and columns as the input.
+    """
+    is_frame = isinstance(values, pd.DataFrame)
+    raw = values.to_numpy(dtype=object).ravel()
+    codes, uniques = pd.factorize(raw)
+    if len(uniques) == 0:
+        hours = np.zeros(len(raw))
+    else:
+        text = pd.Series(uniques, dtype=object).astype(str).str.strip()
+        parts = text.str.extract(PLAYTIME_PATTERN).apply(pd.to_numeric).fillna(0)
+        has_units = text.str.contains(r'[hd]', regex=True)
+        unit_hours = parts['days'] * 24 + parts['hours'] + parts['minutes'] / 60.0
+        clock_hours = parts['clock_hours'] + parts['clock_minutes'] / 60.0
+        unique_hours = np.where(has_units, unit_hours, clock_hours).round(2)
+        hours = np.where(codes >= 0, unique_hours[codes], 0.0)
+    if is_frame:
+        return pd.DataFrame(hours.reshape(values.shape), index=values.index, columns=values.columns)
+    return pd.Series(hours, index=values.index, name=values.name)
+
+def calculate_roster_fields(membership_masks):
+    """
+    Branch and Sub_Branch for every player from their Membership_Mask.
+    Branch is the first main branch (BRANCH_MAPPING, columns 1-4) whose bit is
+    set; Sub_Branch joins every sub-branch set, in SUB_BRANCH_MAPPING order.
+    Labels are computed once per distinct mask and looked up for every player.
+    """
+    masks = pd.Series(membership_masks).fillna(0).astype('int64')
+    
+    branch_items = [(index, name) for index, name in config.BRANCH_MAPPING.items() if index <= 4]
+    branch = np.select(
+        [(masks.to_numpy() & column_bit(index)) != 0 for index, _ in branch_items],
+        [name for _, name in branch_items],
+        default="Unknown"
+    )
     
-    if sub_branches:
-        sub_branch = ", ".join(sub_branches)
+    sub_branch_labels = {
+        mask: ", ".join(
+            name for index, name in config.SUB_BRANCH_MAPPING.items()
+            if index >= 5 and mask & column_bit(index)
+        ) or "None"
+        for mask in masks.unique()
+    }
     
-    return branch, sub_branch
+    return pd.DataFrame({
+        'Branch': branch,
+        'Sub_Branch': masks.map(sub_branch_labels).to_numpy()
+    }, index=masks.index)
 
 # --- CACHE ---
 
 def _ensure_cache_dir():
-    """Helper to create cache directory."""
-    if not os.path.exists(config.CACHE_DIR):
-        os.makedirs(config.CACHE_DIR)
-
-def load_or_scrape_data(driver):
-    """(Unchanged logic, uses config paths)"""
-    _ensure_cache_dir() # Ensure cache dir exists
-    
-    if os.path.exists(config.CACHE_FILENAME):
-        cache_time = datetime.fromtimestamp(os.path.getmtime(config.CACHE_FILENAME))
-        if datetime.now() - cache_time < timedelta(hours=config.CACHE_EXPIRY_HOURS):
-            print(f"Cache found. Loading from cache...")
-            with open(config.CACHE_FILENAME, 'rb') as f:
-                return pickle.load(f)
-        else:
-            print("Cache expired. Starting new scrape...")
-    else:
-        print("No cache found. Starting scrape...")
-
-    # Use credentials from config
-    if not login_to_battlemetrics(driver, config.BATTLEMETRICS_USERNAME, config.BATTLEMETRICS_PASSWORD):
-        raise ConnectionError("Login failed.")
+    """Helper to create cache directories."""
+    if not os.path.exists(config.WEEK_CACHE_DIR):
+        os.makedirs(config.WEEK_CACHE_DIR)
+
+def _week_cache_path(start_date, end_date, suffix='.parquet'):
+    """One cache file per week window (suffix='.pkl' for the legacy pickle cache)."""
+    return os.path.join(
+        config.WEEK_CACHE_DIR,
+        f"week_{start_date.strftime('%Y%m%dT%H%M')}_{end_date.strftime('%Y%m%dT%H%M')}{suffix}"
+    )
 
-    scraped_df = scrape_multiple_weeks(driver, config.BASE_LEADERBOARD_URL, config.WEEKS_TO_PULL)
+def _is_week_cache_valid(path, end_date, now):
+    """
+    A week saved after its window closed is final and never expires.
+    The open week (or one saved before it closed) expires after CACHE_EXPIRY_HOURS.
+    """
+    if not os.path.exists(path):
+        return False
     
-    if not scraped_df.empty:
-        with open(config.CACHE_FILENAME, 'wb') as f:
-            pickle.dump(scraped_df, f)
-        print(f"Scraped data saved to cache.")
+    saved_at = datetime.utcfromtimestamp(os.path.getmtime(path))
+    if saved_at >= end_date:
+        return True
+    return end_date > now and now - saved_at < timedelta(hours=config.CACHE_EXPIRY_HOURS)
+
+def _load_week_cache(path, columns=PIVOT_WEEK_COLUMNS):
+    """A cached week, projected to the columns the weekly pivot needs by default."""
+    return read_frame(path, columns=columns)
+
+def load_or_scrape_data(on_week, windows=None, accept_cached=False):
+    """
+    Streams every week window to on_week: cached windows first, then the open
+    week and any missing/expired windows as soon as each is scraped (and saved
+    to the per-week cache). on_week is called with a zero-argument function
+    returning the week's rows, so cached weeks are only read from disk when
+    the consumer gets to them. Chrome is started only when at least one window
+    has to be scraped with the selenium backend. Returns the number of weeks
+    delivered.
+    
+    windows defaults to the latest WEEKS_TO_PULL; accept_cached uses any cached
+    week regardless of age (resuming a run with the weeks it already had).
+    Every scraped week, and any cached week it does not have yet, is appended
+    to the playtime warehouse. A closed week whose leaderboard has no players
+    is cached empty, so it is not scraped again on every run.
+    """
+    _ensure_cache_dir()
+    
+    now = datetime.utcnow()
+    if windows is None:
+        windows = get_week_windows(config.WEEKS_TO_PULL, now)
+    
+    delivered = 0
+    windows_to_scrape = []
+    warehouse_weeks = recorded_weeks(config.PLAYTIME_WAREHOUSE_PATH)
+    for start_date, end_date in windows:
+        path = _week_cache_path(start_date, end_date)
+        legacy_path = _week_cache_path(start_date, end_date, suffix='.pkl')
+        if not os.path.exists(path) and os.path.exists(legacy_path):
+            migrate_pickle_week(legacy_path, path)
+        if (accept_cached and os.path.exists(path)) or _is_week_cache_valid(path, end_date, now):
+            if start_date.strftime('%Y-%m-%d %H:%M') not in warehouse_weeks:
+                record_week(config.PLAYTIME_WAREHOUSE_PATH, _load_week_cache(path, columns=None),
+                            recorded_at=os.path.getmtime(path))
+            on_week(lambda path=path: _load_week_cache(path))
+            delivered += 1
+        else:
+            windows_to_scrape.append((start_date, end_date))
+    
+    print(f"Cache: {delivered}/{len(windows)} week(s) loaded, "
+          f"{len(windows_to_scrape)} to scrape.")
+    
+    # The browser pool calls cache_and_forward from several threads
+    forward_lock = threading.Lock()
+    
+    def cache_and_forward(week_df, start_date, end_date):
+        nonlocal delivered
+        week_df = type_week_frame(week_df)
+        with forward_lock:
+            # The open week may still get players; only a closed empty week is final
+            if not week_df.empty or end_date <= datetime.utcnow():
+                write_frame(week_df, _week_cache_path(start_date, end_date))
+            record_week(config.PLAYTIME_WAREHOUSE_PATH, week_df)
+        week_df = week_df[PIVOT_WEEK_COLUMNS]
+        on_week(lambda: week_df)
+        with forward_lock:
+            delivered += 1
+    
+    if windows_to_scrape and config.SCRAPER_BACKEND == 'http':
+        session = create_http_session(
+            config.BATTLEMETRICS_USERNAME,
+            config.BATTLEMETRICS_PASSWORD,
+            config.BATTLEMETRICS_COOKIES_FILE,
+            pool_size=config.SCRAPER_POOL_SIZE
+        )
+        scrape_weeks_http(
+            session, config.BASE_LEADERBOARD_URL, windows_to_scrape, config.SCRAPER_POOL_SIZE,
+            on_week=cache_and_forward
+        )
+    elif windows_to_scrape:
+        # Imported here so the http backend runs without selenium installed
+        from gmod_stat_tracker.battlemetrics_scraper import (
+            login_to_battlemetrics,
+            create_chrome_driver,
+            scrape_weeks_parallel
+        )
+        
+        driver = create_chrome_driver()
+        try:
+            # Use credentials from config
+            if not login_to_battlemetrics(driver, config.BATTLEMETRICS_USERNAME, config.BATTLEMETRICS_PASSWORD):
+                raise ConnectionError("Login failed.")
+            
+            scrape_weeks_parallel(
+                driver, config.BASE_LEADERBOARD_URL, windows_to_scrape, config.SCRAPER_POOL_SIZE,
+                on_week=cache_and_forward
+            )
+        finally:
+            driver.quit()
     
-    return scraped_df
+    return delivered
 
-# --- GOOGLE SHEETS UPLOAD ---
+# --- WEEKLY PIVOT (STREAMED) ---
 
-def upload_to_google_sheets(df, sheet_id, tab_name, creds_file, format_dates=False):
-    """(Unchanged logic)"""
-    print(f"\n[UPLOADING TO GOOGLE SHEETS: {tab_name}]")
-    print(f"DataFrame shape: {df.shape}")
-    
-    df_upload = df.copy()
-    
-    if format_dates:
-        # Note: '2025' is hardcoded in your original logic.
-        date_columns = [col for col in df_upload.columns if ' - ' in str(col) and '2025' in str(col)] 
-        if date_columns:
-            print(f"Formatting {len(date_columns)} date columns...")
-            rename_map = {col: format_date_range_short(col) for col in date_columns}
-            df_upload = df_upload.rename(columns=rename_map)
+def pivot_week(week_df, roster_identity_df, identity_cols):
+    """
+    Joins one week's leaderboard to the roster and reduces it to that week's
+    pivot column: (Week_Range, Series of Time_Display indexed by identity_cols).
+    Same rules as pivot_table(aggfunc='first'): unmatched names and rows with a
+    missing identity value are dropped. The open week's Week_Range is labelled
+    partial (see week_range_label).
+    """
+    merged_df = week_df.merge(
+        roster_identity_df, 
+        left_on='BattleMetrics_Name', 
+        right_on='Current_SteamName_from_API', 
+        how='left'
+    )
+    week_range = week_range_label(week_df['Week_Start_UTC'].iat[0], week_df['Week_End_UTC'].iat[0])
     
-    try:
-        scope = ['https://spreadsheets.google.com/feeds', 'https://www.googleapis.com/auth/drive']
-        creds = Credentials.from_service_account_file(creds_file, scopes=scope)
-        client = gspread.authorize(creds)
-        
-        spreadsheet = client.open_by_key(sheet_id)
-        
-        try:
-            worksheet = spreadsheet.worksheet(tab_name)
-            print(f"Found existing tab. Clearing...")
-            worksheet.clear()
-        except gspread.exceptions.WorksheetNotFound:
-            print(f"Creating new tab...")
-            worksheet = spreadsheet.add_worksheet(title=tab_name, rows=5000, cols=50)
-        
-        headers = df_upload.columns.values.tolist()
-        data_rows = df_upload.values.tolist()
-        
-        data_rows = [['' if pd.isna(cell) else cell for cell in row] for row in data_rows]
-        
-        print(f"Uploading {len(data_rows)} data rows...")
-        
-        worksheet.update(range_name='A1', values=[headers])
-        
-        if len(data_rows) > 0:
-            worksheet.update(range_name='A2', values=data_rows)
-        
-        print(f"✅ Upload complete!")
-        
-        return True
-        
-    except Exception as e:
-        print(f"❌ Upload error: {e}")
-        import traceback
-        traceback.print_exc()
-        return False
+    column = merged_df.groupby(identity_cols, observed=True, dropna=True)['Time_Display'].first()
+    return week_range, column.rename(week_range)
 
-# --- PIVOT CALCULATIONS ---
 
-def calculate_branch_pivots(pivot_df):
-    """(Unchanged logic, uses config.BRANCH_MAPPING)"""
-    print("\n[CALCULATING BRANCH PIVOT STATISTICS]")
-    
-    # Filter out outliers
-    if 'Has_Outlier' in pivot_df.columns:
-        clean_df = pivot_df[pivot_df['Has_Outlier'] == False].copy()
-        outlier_count = len(pivot_df) - len(clean_df)
-        if outlier_count > 0:
-            print(f"   Excluding {outlier_count} player(s) with outliers from pivot")
-    else:
-        clean_df = pivot_df.copy()
-    
-    main_branches = ['Army', 'USAF', 'USMC', 'NAVY']
-    branch_data = clean_df[clean_df['Branch'].isin(main_branches)].copy()
-    
-    if branch_data.empty:
-        print("⚠️ No data found for main branches.")
+def assemble_week_pivot(week_columns, identity_cols):
+    """Outer-joins the per-week columns into the Player_Report layout (weeks sorted like pivot_table)."""
+    columns = [week_columns[week_range] for week_range in sorted(week_columns) if not week_columns[week_range].empty]
+    if not columns:
         return pd.DataFrame()
     
-    week_columns = [col for col in branch_data.columns if ' - ' in str(col)]
-    
-    print(f"Processing {len(branch_data)} player records (outliers excluded)")
-    print(f"Found {len(week_columns)} week columns")
-    
-    all_branch_data = []
-    
-    for branch in main_branches:
-        branch_players = branch_data[branch_data['Branch'] == branch]
-        row_data = {'Branch': branch}
-        
-        stats_columns = {
-            'Avg_KD_Ratio': 'KD_Ratio',
-            'Avg_HS_Percent': 'HS_Percent',
-            'Avg_Kills': 'Kills',
-            'Avg_Deaths': 'Deaths',
-            'Avg_Level': 'Level',
-            'Avg_Money': 'Money',
-            'Avg_Damage': 'Damage',
-            'Avg_Headshots': 'Headshots'
-        }
-        
-        for stat_name, column_name in stats_columns.items():
-            if column_name in branch_players.columns:
-                values = branch_players[column_name].apply(safe_float)
-                values = values[values > 0]
-                
-                if len(values) > 0:
-                    avg_value = values.mean()
-                    row_data[stat_name] = round(avg_value, 2)
-                else:
-                    row_data[stat_name] = 0.0
-            else:
-                row_data[stat_name] = 0.0
-        
-        for week_col in week_columns:
-            playtime_values = branch_players[week_col].dropna()
-            
-            if len(playtime_values) > 0:
-                hours_list = [parse_playtime_to_hours(val) for val in playtime_values]
-                hours_list = [h for h in hours_list if h > 0]
-                
-                if hours_list:
-                    avg_hours = sum(hours_list) / len(hours_list)
-                    row_data[week_col] = round(avg_hours, 2)
-                else:
-                    row_data[week_col] = 0.0
-            else:
-                row_data[week_col] = 0.0
-        
-        all_branch_data.append(row_data)
-    
-    result_df = pd.DataFrame(all_branch_data)
-    
-    stat_cols = ['Branch', 'Avg_KD_Ratio', 'Avg_HS_Percent', 'Avg_Kills', 'Avg_Deaths', 
-                 'Avg_Level', 'Avg_Money', 'Avg_Damage', 'Avg_Headshots']
-    week_cols_sorted = sorted([col for col in result_df.columns if ' - ' in str(col)])
-    
-    final_cols = stat_cols + week_cols_sorted
-    result_df = result_df[[col for col in final_cols if col in result_df.columns]]
-    
-    print(f"✅ Created branch pivots: {len(result_df)} branches")
+    pivot_df = pd.concat(columns, axis=1).sort_index()
+    pivot_df.index.names = identity_cols
+    pivot_df.columns.name = 'Week_Range'
+    return pivot_df.reset_index()
+
+def build_history_pivot(roster_identity_df, identity_cols, weeks, as_of=None):
+    """
+    Player_Report layout over the last `weeks` weeks (before as_of, as known
+    at as_of), built from the playtime warehouse without scraping.
+    
+    Weeks are matched to the roster by player (Player_Key), not by the name
+    recorded that week: every row takes its player's latest BattleMetrics
+    name, which is the one the roster's current Steam names are matched to,
+    so a player who renamed keeps their older weeks.
+    """
+    end = as_of or datetime.utcnow()
+    history = query_playtime(config.PLAYTIME_WAREHOUSE_PATH, start=end - timedelta(weeks=weeks), as_of=as_of)
+    if history.empty:
+        return pd.DataFrame()
     
-    return result_df
+    latest_names = latest_player_names(config.PLAYTIME_WAREHOUSE_PATH, history['Player_Key'])
+    history['BattleMetrics_Name'] = history['Player_Key'].map(latest_names).fillna(history['BattleMetrics_Name'])
+    week_columns = dict(
+        pivot_week(week_df, roster_identity_df, identity_cols)
+        for _, week_df in history.groupby('Week_Start_UTC', sort=True)
+    )
+    return assemble_week_pivot(week_columns, identity_cols)
 
+# --- PIVOT CALCULATIONS ---
 
-def calculate_subbranch_pivots(pivot_df, roster_membership_df):
-    """(Unchanged logic, uses config.SUB_BRANCH_MAPPING)"""
-    print("\n[CALCULATING SUB-BRANCH PIVOT STATISTICS]")
-    
-    # Filter out outliers
-    if 'Has_Outlier' in pivot_df.columns:
-        clean_df = pivot_df[pivot_df['Has_Outlier'] == False].copy()
-        outlier_count = len(pivot_df) - len(clean_df)
-        if outlier_count > 0:
-            print(f"   Excluding {outlier_count} player(s) with outliers from pivot")
-    else:
-        clean_df = pivot_df.copy()
-    
-    week_columns = [col for col in clean_df.columns if ' - ' in str(col)]
-    
-    analysis_df = clean_df.merge(
-        roster_membership_df[[f'Col_{i}_Member' for i in config.SUB_BRANCH_MAPPING.keys()] + ['SteamID64']], 
-        on='SteamID64', 
-        how='left'
-    )
-    
-    all_subbranch_data = []
-    
-    for col_index, subbranch_name in config.SUB_BRANCH_MAPPING.items():
-        col_name = f'Col_{col_index}_Member'
-        
-        subbranch_players = analysis_df[analysis_df[col_name] == True].copy()
-        
-        if len(subbranch_players) == 0:
+MAIN_BRANCHES = ['Army', 'USAF', 'USMC', 'NAVY']
+
+PIVOT_STATS_COLUMNS = {
+    'Avg_KD_Ratio': 'KD_Ratio',
+    'Avg_HS_Percent': 'HS_Percent',
+    'Avg_Kills': 'Kills',
+    'Avg_Deaths': 'Deaths',
+    'Avg_Level': 'Level',
+    'Avg_Money': 'Money',
+    'Avg_Damage': 'Damage',
+    'Avg_Headshots': 'Headshots'
+}
+
+
+def _exclude_outliers(pivot_df):
+    """Drops rows flagged by detect_and_warn_outliers."""
+    if 'Has_Outlier' not in pivot_df.columns:
+        return pivot_df
+    
+    clean_df = pivot_df[pivot_df['Has_Outlier'] == False]
+    outlier_count = len(pivot_df) - len(clean_df)
+    if outlier_count > 0:
+        print(f"   Excluding {outlier_count} player(s) with outliers from pivot")
+    return clean_df
+
+
+def _group_memberships(clean_df, roster_membership_df):
+    """
+    Long (Row, Family, Group) table: one entry per player row per pivot group.
+    A player can appear in several families (and several sub-branches).
+    """
+    in_branch = clean_df['Branch'].isin(MAIN_BRANCHES)
+    branch_rows = clean_df.index[in_branch]
+    
+    memberships = [
+        pd.DataFrame({'Row': branch_rows, 'Family': 'Branch', 'Group': clean_df.loc[in_branch, 'Branch'].to_numpy()}),
+        pd.DataFrame({'Row': branch_rows, 'Family': 'Group', 'Group': 'US Military'}),
+    ]
+    
+    masks = clean_df['SteamID64'].map(
+        roster_membership_df.set_index('SteamID64')[MEMBERSHIP_MASK_COLUMN]
+    ).fillna(0).astype('int64').to_numpy()
+    
+    for index, name in config.SUB_BRANCH_MAPPING.items():
+        in_sub_branch = (masks & column_bit(index)) != 0
+        memberships.append(pd.DataFrame({'Row': clean_df.index[in_sub_branch], 'Family': 'SubBranch', 'Group': name}))
+    
+    # US SOCOM: anyone in at least one sub-branch
+    in_socom = (masks & columns_mask(config.SUB_BRANCH_MAPPING)) != 0
+    memberships.append(pd.DataFrame({'Row': clean_df.index[in_socom], 'Family': 'Group', 'Group': 'US SOCOM'}))
+    
+    return pd.concat(memberships, ignore_index=True)
+
+
+def _build_family_pivot(group_means, group_sizes, family, label_col, groups, week_columns, keep_empty):
+    """Shapes one family's slice of the aggregated means into the classic pivot layout."""
+    rows = []
+    for group in groups:
+        player_count = group_sizes.get((family, group), 0)
+        if player_count == 0 and not keep_empty:
             continue
         
-        row_data = {'SubBranch': subbranch_name}
-        
-        stats_columns = {
-            'Avg_KD_Ratio': 'KD_Ratio',
-            'Avg_HS_Percent': 'HS_Percent',
-            'Avg_Kills': 'Kills',
-            'Avg_Deaths': 'Deaths',
-            'Avg_Level': 'Level',
-            'Avg_Money': 'Money',
-            'Avg_Damage': 'Damage',
-            'Avg_Headshots': 'Headshots'
-        }
-        
-        for stat_name, column_name in stats_columns.items():
-            if column_name in subbranch_players.columns:
-                values = subbranch_players[column_name].apply(safe_float)
-                values = values[values > 0]
-                
-                if len(values) > 0:
-                    avg_value = values.mean()
-                    row_data[stat_name] = round(avg_value, 2)
-                else:
-                    row_data[stat_name] = 0.0
-            else:
-                row_data[stat_name] = 0.0
-        
-        for week_col in week_columns:
-            playtime_values = subbranch_players[week_col].dropna()
-            
-            if len(playtime_values) > 0:
-                hours_list = [parse_playtime_to_hours(val) for val in playtime_values]
-                hours_list = [h for h in hours_list if h > 0]
-                
-                if hours_list:
-                    avg_hours = sum(hours_list) / len(hours_list)
-                    row_data[week_col] = round(avg_hours, 2)
-                else:
-                    row_data[week_col] = 0.0
-            else:
-                row_data[week_col] = 0.0
+        row_data = {label_col: group}
+        if (family, group) in group_means.index:
+            means = group_means.loc[(family, group)]
+        else:
+            means = pd.Series(dtype=float)
         
-        all_subbranch_data.append(row_data)
+        for measure in list(PIVOT_STATS_COLUMNS) + week_columns:
+            value = means.get(measure, np.nan)
+            row_data[measure] = round(float(value), 2) if pd.notna(value) else 0.0
+        rows.append(row_data)
     
-    if not all_subbranch_data:
-        print("⚠️ No sub-branch data found.")
+    if not rows:
         return pd.DataFrame()
     
-    result_df = pd.DataFrame(all_subbranch_data)
-    
-    stat_cols = ['SubBranch', 'Avg_KD_Ratio', 'Avg_HS_Percent', 'Avg_Kills', 'Avg_Deaths', 
-                 'Avg_Level', 'Avg_Money', 'Avg_Damage', 'Avg_Headshots']
-    week_cols_sorted = sorted([col for col in result_df.columns if ' - ' in str(col)])
-    
-    final_cols = stat_cols + week_cols_sorted
-    result_df = result_df[[col for col in final_cols if col in result_df.columns]]
-    
-    print(f"✅ Created sub-branch pivots: {len(result_df)} sub-branches")
-    
-    return result_df
+    result_df = pd.DataFrame(rows)
+    final_cols = [label_col] + list(PIVOT_STATS_COLUMNS) + sorted(week_columns)
+    return result_df[final_cols]
 
 
-def _calculate_group_stats(data_df, group_name, week_columns):
-    """(Unchanged logic)"""
-    if data_df.empty:
-        print(f"   ⚠️ No data for group: {group_name}")
-        return None
+def calculate_group_pivots(pivot_df, roster_membership_df):
+    """
+    Computes the branch, sub-branch and US/SOCOM pivots in a single pass.
     
-    print(f"   Processing {len(data_df)} records for: {group_name}")
-    row_data = {'Group': group_name}
-    
-    stats_columns = {
-        'Avg_KD_Ratio': 'KD_Ratio',
-        'Avg_HS_Percent': 'HS_Percent',
-        'Avg_Kills': 'Kills',
-        'Avg_Deaths': 'Deaths',
-        'Avg_Level': 'Level',
-        'Avg_Money': 'Money',
-        'Avg_Damage': 'Damage',
-        'Avg_Headshots': 'Headshots'
-    }
-    
-    for stat_name, column_name in stats_columns.items():
-        if column_name in data_df.columns:
-            values = data_df[column_name].apply(safe_float)
-            values = values[values > 0]
-            row_data[stat_name] = round(values.mean(), 2) if len(values) > 0 else 0.0
-        else:
-            row_data[stat_name] = 0.0
-    
-    for week_col in week_columns:
-        playtime_values = data_df[week_col].dropna()
-        if len(playtime_values) > 0:
-            hours_list = [parse_playtime_to_hours(val) for val in playtime_values]
-            hours_list = [h for h in hours_list if h > 0]
-            row_data[week_col] = round(sum(hours_list) / len(hours_list), 2) if hours_list else 0.0
-        else:
-            row_data[week_col] = 0.0
-    
-    return row_data
-
-
-def calculate_us_pivots(pivot_df, roster_membership_df):
-    """(Unchanged logic, uses config.SUB_BRANCH_MAPPING)"""
-    print("\n[CALCULATING US & SOCOM PIVOT STATISTICS]")
-    
-    # Filter out outliers
-    if 'Has_Outlier' in pivot_df.columns:
-        clean_df = pivot_df[pivot_df['Has_Outlier'] == False].copy()
-        outlier_count = len(pivot_df) - len(clean_df)
-        if outlier_count > 0:
-            print(f"   Excluding {outlier_count} player(s) with outliers from pivot")
-    else:
-        clean_df = pivot_df.copy()
+    Stats and parsed week hours are melted to long format once, joined to the
+    long membership table and averaged (ignoring zeros) with one groupby.
+    Returns (branch_pivots_df, subbranch_pivots_df, us_pivots_df).
+    """
+    print("\n[CALCULATING GROUP PIVOT STATISTICS]")
     
+    clean_df = _exclude_outliers(pivot_df)
     week_columns = [col for col in clean_df.columns if ' - ' in str(col)]
     
-    # --- Group 1: US Military (All 4 main branches) ---
-    main_branches = ['Army', 'USAF', 'USMC', 'NAVY']
-    us_data = clean_df[clean_df['Branch'].isin(main_branches)].copy()
+    memberships = _group_memberships(clean_df, roster_membership_df)
+    group_sizes = memberships.groupby(['Family', 'Group']).size().to_dict()
     
-    # --- Group 2: US SOCOM (Any player in a sub-branch) ---
-    sub_branch_cols = [f'Col_{i}_Member' for i in config.SUB_BRANCH_MAPPING.keys() if f'Col_{i}_Member' in roster_membership_df.columns]
+    print(f"Processing {len(clean_df)} player records (outliers excluded)")
+    print(f"Found {len(week_columns)} week columns")
     
-    # Find SteamIDs of SOCOM members from the roster
-    socom_mask = roster_membership_df[sub_branch_cols].any(axis=1)
-    socom_steam_ids = roster_membership_df[socom_mask]['SteamID64'].unique()
+    stat_cols = {col: stat for stat, col in PIVOT_STATS_COLUMNS.items() if col in clean_df.columns}
+    measures = pd.concat([
+        clean_df[list(stat_cols)].apply(pd.to_numeric, errors='coerce').astype('float64').rename(columns=stat_cols),
+        parse_playtime_hours(clean_df[week_columns])
+    ], axis=1)
     
-    # Filter the clean data for those SteamIDs
-    socom_data = clean_df[clean_df['SteamID64'].isin(socom_steam_ids)].copy()
-
-    all_rows = []
+    long_values = measures.assign(Row=measures.index).melt(
+        id_vars=['Row'], var_name='Measure', value_name='Value'
+    )
+    long_values = long_values[long_values['Value'] > 0]
     
-    # Calculate US Military Stats
-    us_row = _calculate_group_stats(us_data, "US Military", week_columns)
-    if us_row:
-        all_rows.append(us_row)
-        
-    # Calculate US SOCOM Stats
-    socom_row = _calculate_group_stats(socom_data, "US SOCOM", week_columns)
-    if socom_row:
-        all_rows.append(socom_row)
+    group_means = (
+        memberships.merge(long_values, on='Row', how='inner')
+        .groupby(['Family', 'Group', 'Measure'])['Value'].mean()
+        .unstack('Measure')
+    )
     
-    if not all_rows:
-        print("⚠️ No data found for US or SOCOM groups.")
-        return pd.DataFrame()
-
-    # Create a DataFrame with 2 rows
-    result_df = pd.DataFrame(all_rows)
+    if group_sizes.get(('Group', 'US Military'), 0) == 0:
+        print("⚠️ No data found for main branches.")
+        branch_pivots_df = pd.DataFrame()
+    else:
+        branch_pivots_df = _build_family_pivot(
+            group_means, group_sizes, 'Branch', 'Branch', MAIN_BRANCHES, week_columns, keep_empty=True
+        )
     
-    # Organize columns
-    stat_cols = ['Group', 'Avg_KD_Ratio', 'Avg_HS_Percent', 'Avg_Kills', 'Avg_Deaths', 
-                 'Avg_Level', 'Avg_Money', 'Avg_Damage', 'Avg_Headshots']
-    week_cols_sorted = sorted([col for col in result_df.columns if ' - ' in str(col)])
+    subbranch_pivots_df = _build_family_pivot(
+        group_means, group_sizes, 'SubBranch', 'SubBranch',
+        list(config.SUB_BRANCH_MAPPING.values()), week_columns, keep_empty=False
+    )
+    if subbranch_pivots_df.empty:
+        print("⚠️ No sub-branch data found.")
     
-    final_cols = stat_cols + week_cols_sorted
-    result_df = result_df[[col for col in final_cols if col in result_df.columns]]
+    us_pivots_df = _build_family_pivot(
+        group_means, group_sizes, 'Group', 'Group', ['US Military', 'US SOCOM'], week_columns, keep_empty=False
+    )
+    if us_pivots_df.empty:
+        print("⚠️ No data found for US or SOCOM groups.")
     
-    print(f"✅ Created US pivots: {len(result_df)} rows (US & SOCOM)")
+    print(f"✅ Created branch pivots: {len(branch_pivots_df)} branches")
+    print(f"✅ Created sub-branch pivots: {len(subbranch_pivots_df)} sub-branches")
+    print(f"✅ Created US pivots: {len(us_pivots_df)} rows (US & SOCOM)")
     
-    return result_df
+    return branch_pivots_df, subbranch_pivots_df, us_pivots_df
 
 # --- MAIN ORCHESTRATOR ---
 
-def scrape_and_merge_data():
-    """(Main logic, uses config for paths, credentials, and settings)"""
+def scrape_and_merge_data(resume=False):
+    """
+    (Main logic, uses config for paths, credentials, and settings)
     
-    # Ensure output directory exists
-    if not os.path.exists(config.OUTPUTS_DIR):
-        os.makedirs(config.OUTPUTS_DIR)
-    
-    print("\n[STAGE 1/4: RESOLVING STEAM IDs AND FETCHING GMOD STATS]")
+    Stage outputs are checkpointed per run; with resume=True the latest
+    unfinished run continues from its saved stages.
+    """
+    run = start_run(resume)
     
+    # Sheets uploads run in the background while the next stages compute
+    uploads = UploadQueue(config.SHEET_ID, config.CREDS_FILE_PATH)
+    completed = False
     try:
-        steam_ids_list, roster_membership_df = get_steam_ids_from_google_sheet(
-            config.CREDS_FILE_PATH, 
-            config.SHEET_ID, 
-            config.MASTER_SHEET_TAB_NAME, 
-            max(config.STEAM_ID_COLUMN_INDEXES)
-        )
-    except Exception as e:
-        print(f"Error reading from Google Sheet: {e}")
-        return
+        completed = _run_pipeline(uploads, run)
+    finally:
+        results = uploads.wait()
+    
+    if completed and all(results.values()):
+        finish_run(run)
+    elif completed:
+        print("⚠️ Some uploads failed. Run again with --resume to retry from the saved stages.")
 
-    if not steam_ids_list:
-        print("No Steam IDs found. Aborting.")
-        return
 
-    # Get Steam API Key from config
-    steam_api_key = config.STEAM_API_KEY
-    if not steam_api_key:
-        print("❌ STEAM_API_KEY not found in .env file. Aborting.")
-        return
-    else:
-        print("✅ Steam API Key loaded.")
-    
+class StageAborted(RuntimeError):
+    """Raised by a stage task when the later stages have nothing to work with."""
+
+
+def _read_roster():
+    """Stage 1 task: roster SteamIDs and membership masks from the master sheet."""
+    roster = get_steam_ids_from_google_sheet(
+        config.CREDS_FILE_PATH, 
+        config.SHEET_ID, 
+        config.MASTER_SHEET_TAB_NAME, 
+        max(config.STEAM_ID_COLUMN_INDEXES)
+    )
+    if not roster[0]:
+        raise StageAborted("No Steam IDs found")
+    return roster
+
+
+def _load_or_read_roster(run):
+    """
+    Stage 1 task: the roster, from this run's checkpoint when it has one. The
+    ids are checkpointed as JSON and the membership masks as Parquet.
+    """
+    steam_ids_list = load_checkpoint(run, 'roster_ids')
+    roster_membership_df = load_checkpoint(run, 'roster_membership')
+    if steam_ids_list is not MISSING and roster_membership_df is not MISSING:
+        print("✅ roster: loaded from checkpoint")
+        return steam_ids_list, roster_membership_df
+    
+    steam_ids_list, roster_membership_df = _read_roster()
+    save_checkpoint(run, 'roster_membership', roster_membership_df)
+    save_checkpoint(run, 'roster_ids', steam_ids_list)
+    return steam_ids_list, roster_membership_df
+
+
+def _resolve_roster_names(roster, steam_api_key):
+    """Stage 1 task: current Steam persona names for the roster."""
+    steam_ids_list, _ = roster
     resolved_df = resolve_steam_ids_to_names(steam_ids_list, steam_api_key)
-    
     if resolved_df.empty:
-        print("No profiles resolved. Aborting.")
-        return
-    
-    gmod_stats_df = fetch_gmod_leaderboard()
-    
+        raise StageAborted("No profiles resolved")
+    return resolved_df
+
+
+def _fetch_leaderboard(roster):
+    """Stage 1 task: Icefuse stats for the roster, recorded in the snapshot store."""
+    steam_ids_list, _ = roster
+    gmod_stats_df = fetch_gmod_leaderboard(steam_ids_list)
+    # The snapshot store is history only; losing one snapshot must not stop the run
+    try:
+        record_snapshot(config.LEADERBOARD_SNAPSHOT_PATH, gmod_stats_df)
+    except Exception as e:
+        print(f"⚠️ Leaderboard snapshot not recorded: {e}")
+    return gmod_stats_df
+
+
+def _publish_leaderboard(gmod_stats_df, uploads):
+    """Stage 1 task: saves the Icefuse stats to CSV and queues the upload."""
     if not gmod_stats_df.empty:
         print("\n[SAVING ICEFUSE LEADERBOARD]")
         gmod_stats_df.to_csv(config.LEADERBOARD_OUTPUT_FILENAME, index=False)
         print(f"✅ IceFuse leaderboard saved locally: {config.LEADERBOARD_OUTPUT_FILENAME}")
         
-        upload_to_google_sheets(
-            gmod_stats_df, 
-            config.SHEET_ID, 
-            config.LEADERBOARD_SHEET_TAB_NAME, 
-            config.CREDS_FILE_PATH
-        )
+        uploads.submit(gmod_stats_df, config.LEADERBOARD_SHEET_TAB_NAME)
+
+
+def _build_roster_identity(roster, resolved_df, gmod_stats_df):
+    """
+    Stage 1 task: roster + Steam names + Icefuse stats with Branch/Sub_Branch.
+    Returns (roster_identity_df, identity_cols).
+    """
+    _, roster_membership_df = roster
     
     roster_final_df = resolved_df.merge(roster_membership_df, on='SteamID64', how='left')
     
@@ -598,9 +565,7 @@ def scrape_and_merge_data():
         stats_found = roster_final_df['Money'].notna().sum()
         print(f"✅ Merged GMod stats: {stats_found}/{len(roster_final_df)} players have stats")
     
-    roster_final_df[['Branch', 'Sub_Branch']] = roster_final_df.apply(
-        calculate_roster_fields, axis=1, result_type='expand'
-    )
+    roster_final_df[['Branch', 'Sub_Branch']] = calculate_roster_fields(roster_final_df[MEMBERSHIP_MASK_COLUMN])
     
     identity_cols = ['SteamID64', 'Current_SteamName_from_API', 'ProfileStatus']
     
@@ -615,57 +580,215 @@ def scrape_and_merge_data():
             identity_cols.append(col)
     
     roster_identity_df = roster_final_df[identity_cols].copy()
+    
+    return roster_identity_df, identity_cols
+
+
+def _history_report_due():
+    """True when the history report is missing or older than HISTORY_REPORT_INTERVAL_HOURS."""
+    if not os.path.exists(config.HISTORY_OUTPUT_FILENAME):
+        return True
+    age_hours = (time.time() - os.path.getmtime(config.HISTORY_OUTPUT_FILENAME)) / 3600
+    return age_hours >= config.HISTORY_REPORT_INTERVAL_HOURS
+
 
-    print("\n[STAGE 2/4: SCRAPING BATTLEMETRICS DATA]")
+def _is_webdriver_error(error):
+    """True for selenium WebDriver errors (False when selenium is not installed)."""
+    try:
+        from selenium.common.exceptions import WebDriverException
+    except ImportError:
+        return False
+    return isinstance(error, WebDriverException)
+
+
+WEEK_STREAM_DONE = None
+# How often a task blocked on the week queue checks whether the run was cancelled
+WEEK_STREAM_POLL_SECONDS = 0.5
+
+
+def _put_week(week_queue, item, cancel):
+    """
+    Puts item on the bounded week_queue, waiting while it is full.
+    Returns False instead if cancel is set first.
+    """
+    while not cancel.is_set():
+        try:
+            week_queue.put(item, timeout=WEEK_STREAM_POLL_SECONDS)
+            return True
+        except queue.Full:
+            pass
+    return False
+
+
+def _get_week(week_queue, cancel):
+    """Takes the next item off week_queue; raises TaskCancelled if cancel is set first."""
+    while not cancel.is_set():
+        try:
+            return week_queue.get(timeout=WEEK_STREAM_POLL_SECONDS)
+        except queue.Empty:
+            pass
+    raise TaskCancelled("week stream cancelled")
+
+
+def _stream_battlemetrics_weeks(week_queue, run, cancel, missing_weeks):
+    """
+    Stage 2 task: puts each week on week_queue as it is loaded or scraped.
+    The run's week windows are checkpointed; a resumed run reuses them and
+    every week already in the per-week cache, however old.
+    Weeks that still failed after their retries do not fail the task: their
+    windows are added to missing_weeks (before the stream is closed) and
+    returned, and the reports are built from the other weeks.
+    The queue is bounded, so the scrape waits while the pivot falls behind.
+    Once cancel is set the next delivered week raises TaskCancelled, which
+    stops the scrape after the week(s) in flight.
+    """
+    def deliver(load_week):
+        if not _put_week(week_queue, load_week, cancel):
+            raise TaskCancelled("week stream cancelled")
     
-    driver = None
     try:
-        chrome_options = webdriver.ChromeOptions()
-        chrome_options.add_argument("--headless")
-        chrome_options.add_argument("--no-sandbox")
-        chrome_options.add_argument("--disable-gpu")
-        chrome_options.add_argument("--window-size=1920,1080")
-        
-        service = Service(ChromeDriverManager().install())
-        driver = webdriver.Chrome(service=service, options=chrome_options)
-        
-        historical_df = load_or_scrape_data(driver)
+        saved_windows = load_checkpoint(run, 'week_windows')
+        resumed = saved_windows is not MISSING
+        if resumed:
+            windows = [(datetime.fromisoformat(start), datetime.fromisoformat(end)) for start, end in saved_windows]
+        else:
+            windows = get_week_windows(config.WEEKS_TO_PULL)
+            save_checkpoint(run, 'week_windows', [[start.isoformat(), end.isoformat()] for start, end in windows])
+        load_or_scrape_data(deliver, windows=windows, accept_cached=resumed)
+    except WeekScrapeError as e:
+        print(f"⚠️ {e}. The reports are built from the other weeks.")
+        missing_weeks.extend(e.windows)
+    finally:
+        _put_week(week_queue, WEEK_STREAM_DONE, cancel)
+    return missing_weeks
+
+
+def _pivot_streamed_weeks(roster_identity, week_queue, cancel):
+    """
+    Stage 3 task: merges each week with the roster and reduces it to its pivot
+    column while later weeks are still being scraped; only one week's raw rows
+    are held at a time. Returns the assembled pivot.
+    """
+    roster_identity_df, identity_cols = roster_identity
+    
+    week_columns = {}
+    while True:
+        load_week = _get_week(week_queue, cancel)
+        if load_week is WEEK_STREAM_DONE:
+            break
+        week_df = load_week()
+        if week_df.empty:
+            continue
+        week_range, column = pivot_week(week_df, roster_identity_df, identity_cols)
+        week_columns[week_range] = column
+        print(f"   Week {week_range}: {len(column)} roster player(s) matched")
+    
+    return assemble_week_pivot(week_columns, identity_cols)
 
-    except WebDriverException as e:
-        print(f"WebDriver Error: {e}")
+
+def _run_pipeline(uploads, run):
+    """
+    Stages 1-4; every upload goes through the uploads queue and stage outputs
+    are checkpointed in run. Returns True when the run got to the end with
+    every week; with weeks missing the reports are still published but the
+    run is left unfinished, so --resume scrapes only the missing weeks.
+    """
+    
+    # Ensure output directory exists
+    if not os.path.exists(config.OUTPUTS_DIR):
+        os.makedirs(config.OUTPUTS_DIR)
+    
+    # Get Steam API Key from config
+    steam_api_key = config.STEAM_API_KEY
+    if not steam_api_key:
+        print("❌ STEAM_API_KEY not found in .env file. Aborting.")
         return
-    except Exception as e:
-        print(f"Scraping Error: {e}")
+    else:
+        print("✅ Steam API Key loaded.")
+    
+    # Stages 1 and 2 only meet at the Stage 3 merge: the browser starts, logs in
+    # and scrapes while the roster, Steam and Icefuse calls are in flight, and
+    # each week is merged and pivoted as soon as the roster is ready. The first
+    # failing task (including an empty roster) sets cancel and stops the scrape.
+    print("\n[STAGE 1/4: RESOLVING STEAM IDs AND FETCHING GMOD STATS]")
+    print("[STAGE 2/4: SCRAPING BATTLEMETRICS DATA] (running concurrently)")
+    print("[STAGE 3/4: MERGING AND PIVOTING DATA] (per week, as weeks arrive)")
+    
+    # Weeks flow from the Stage 2 task to the weekly pivot task as they are loaded or scraped;
+    # at most WEEK_STREAM_MAX_PENDING wait for the pivot (e.g. while the roster is still loading)
+    week_queue = queue.Queue(maxsize=config.WEEK_STREAM_MAX_PENDING)
+    cancel = threading.Event()
+    
+    # A checkpointed player pivot already covers every week: nothing to load or scrape
+    missing_weeks = []
+    if has_checkpoint(run, 'player_pivot'):
+        stream_weeks = lambda: missing_weeks
+    else:
+        stream_weeks = lambda: _stream_battlemetrics_weeks(week_queue, run, cancel, missing_weeks)
+    
+    stage_tasks = {
+        'roster': (lambda: _load_or_read_roster(run), []),
+        'steam_names': (
+            checkpointed(run, 'steam_names', lambda roster: _resolve_roster_names(roster, steam_api_key)),
+            ['roster']
+        ),
+        'gmod_leaderboard': (
+            checkpointed(run, 'gmod_leaderboard', _fetch_leaderboard, keep=lambda df: not df.empty),
+            ['roster']
+        ),
+        # Published only once the whole of Stage 1 has succeeded
+        'publish_leaderboard': (
+            lambda gmod_stats_df, _roster_identity: _publish_leaderboard(gmod_stats_df, uploads),
+            ['gmod_leaderboard', 'roster_identity']
+        ),
+        'roster_identity': (_build_roster_identity, ['roster', 'steam_names', 'gmod_leaderboard']),
+        'battlemetrics': (stream_weeks, []),
+        'weekly_pivot': (
+            checkpointed(run, 'player_pivot', lambda roster_identity: _pivot_streamed_weeks(roster_identity, week_queue, cancel),
+                         # A pivot with weeks missing is not saved, so a resume scrapes them
+                         keep=lambda df: df is not None and not df.empty and not missing_weeks),
+            ['roster_identity']
+        ),
+    }
+    results, errors, timings = run_task_graph(stage_tasks, cancel=cancel)
+    
+    # Tasks skipped or abandoned because of the failure carry a TaskCancelled; report the cause
+    failures = {name: e for name, e in errors.items() if not isinstance(e, TaskCancelled)}
+    
+    for e in failures.values():
+        if isinstance(e, StageAborted):
+            print(f"{e}. Aborting.")
+            return
+    
+    if 'roster' in failures:
+        print(f"Error reading from Google Sheet: {failures['roster']}")
         return
-    finally:
-        if driver:
-            driver.quit()
     
-    if historical_df.empty:
-        print("Scrape yielded no data. Aborting.")
+    for name in ('steam_names', 'gmod_leaderboard', 'publish_leaderboard', 'roster_identity'):
+        if name in failures:
+            raise failures[name]
+    
+    if 'battlemetrics' in failures:
+        e = failures['battlemetrics']
+        if _is_webdriver_error(e):
+            print(f"WebDriver Error: {e}")
+        else:
+            print(f"Scraping Error: {e}")
         return
-
-    print("\n[STAGE 3/4: MERGING AND PIVOTING DATA]")
     
-    merged_df = historical_df.merge(
-        roster_identity_df, 
-        left_on='BattleMetrics_Name', 
-        right_on='Current_SteamName_from_API', 
-        how='left'
-    )
-
-    merged_df['Week_Range'] = merged_df['Week_Start_UTC'] + ' - ' + merged_df['Week_End_UTC']
+    if 'weekly_pivot' in failures:
+        raise failures['weekly_pivot']
     
-    pivot_index = identity_cols
+    _, roster_membership_df = results['roster']
+    roster_identity_df, identity_cols = results['roster_identity']
     
-    final_pivot_df = pd.pivot_table(
-        merged_df, 
-        index=pivot_index, 
-        columns='Week_Range', 
-        values='Time_Display', 
-        aggfunc='first'
-    ).reset_index()
+    final_pivot_df = results['weekly_pivot']
+    if final_pivot_df is None or final_pivot_df.empty:
+        print("Scrape yielded no data. Aborting.")
+        return
 
+    reports_started = time.perf_counter()
+    
     final_pivot_df = final_pivot_df.rename(columns={'Current_SteamName_from_API': 'SteamName_Current'})
     
     final_pivot_df = detect_and_warn_outliers(final_pivot_df)
@@ -673,63 +796,60 @@ def scrape_and_merge_data():
     final_pivot_df.to_csv(config.FINAL_OUTPUT_FILENAME, index=False)
     print(f"✅ Main report saved: {config.FINAL_OUTPUT_FILENAME}")
     
-    upload_to_google_sheets(
-        final_pivot_df, 
-        config.SHEET_ID, 
-        config.OUTPUT_SHEET_TAB_NAME, 
-        config.CREDS_FILE_PATH, 
-        format_dates=True
-    )
+    uploads.submit(final_pivot_df, config.OUTPUT_SHEET_TAB_NAME, format_dates=True)
     
     print("\n[STAGE 4/4: CALCULATING PIVOTS]")
     
-    branch_pivots_df = calculate_branch_pivots(final_pivot_df)
+    branch_pivots_df, subbranch_pivots_df, us_pivots_df = calculate_group_pivots(
+        final_pivot_df, roster_membership_df
+    )
     
     if not branch_pivots_df.empty:
         branch_pivots_df.to_csv(config.BRANCH_PIVOT_OUTPUT_PATH, index=False)
         print(f"✅ Branch pivots saved: {config.BRANCH_PIVOT_OUTPUT_PATH}")
         
-        upload_to_google_sheets(
-            branch_pivots_df, 
-            config.SHEET_ID, 
-            config.BRANCH_PIVOT_SHEET_TAB_NAME, 
-            config.CREDS_FILE_PATH, 
-            format_dates=True
-        )
-    
-    subbranch_pivots_df = calculate_subbranch_pivots(final_pivot_df, roster_membership_df)
+        uploads.submit(branch_pivots_df, config.BRANCH_PIVOT_SHEET_TAB_NAME, format_dates=True)
     
     if not subbranch_pivots_df.empty:
         subbranch_pivots_df.to_csv(config.SUBBRANCH_PIVOT_OUTPUT_PATH, index=False)
         print(f"✅ Sub-branch pivots saved: {config.SUBBRANCH_PIVOT_OUTPUT_PATH}")
         
-        upload_to_google_sheets(
-            subbranch_pivots_df, 
-            config.SHEET_ID, 
-            config.SUBBRANCH_PIVOT_SHEET_TAB_NAME, 
-            config.CREDS_FILE_PATH, 
-            format_dates=True
-        )
-    
-    us_pivots_df = calculate_us_pivots(final_pivot_df, roster_membership_df)
+        uploads.submit(subbranch_pivots_df, config.SUBBRANCH_PIVOT_SHEET_TAB_NAME, format_dates=True)
     
     if not us_pivots_df.empty:
         us_pivots_df.to_csv(config.US_PIVOT_OUTPUT_PATH, index=False)
         print(f"✅ US pivots saved: {config.US_PIVOT_OUTPUT_PATH}")
         
-        upload_to_google_sheets(
-            us_pivots_df, 
-            config.SHEET_ID, 
-            config.US_PIVOT_SHEET_TAB_NAME, 
-            config.CREDS_FILE_PATH, 
-            format_dates=True
-        )
+        uploads.submit(us_pivots_df, config.US_PIVOT_SHEET_TAB_NAME, format_dates=True)
+    
+    if _history_report_due():
+        history_df = build_history_pivot(roster_identity_df, identity_cols, config.HISTORY_WEEKS_TO_REPORT)
+        if not history_df.empty:
+            history_df = history_df.rename(columns={'Current_SteamName_from_API': 'SteamName_Current'})
+            history_df.to_csv(config.HISTORY_OUTPUT_FILENAME, index=False)
+            print(f"✅ Playtime history ({history_df.shape[1] - len(identity_cols)} week(s)) saved: {config.HISTORY_OUTPUT_FILENAME}")
 
+    # Outlier checks and Stage 4 wait on every stage task, so they close the critical path.
+    # Weeks reach weekly_pivot through week_queue rather than a graph edge; it is reported
+    # as depending on the scrape too, so a scrape-bound run shows the scrape on the path.
+    timings['reports'] = (reports_started, time.perf_counter())
+    report_tasks = dict(stage_tasks, reports=(None, list(stage_tasks)))
+    report_tasks['weekly_pivot'] = (None, stage_tasks['weekly_pivot'][1] + ['battlemetrics'])
+    print_task_report(report_tasks, timings)
+    
     print("\n" + "="*60)
     print(f"Pipeline Complete!")
     print(f"Total Players Tracked: {len(roster_identity_df)}")
     print(f"Reports Saved to: {config.OUTPUTS_DIR}")
+    if missing_weeks:
+        print(f"⚠️ Missing {len(missing_weeks)} week(s): " + ", ".join(
+            week_range_label(start.strftime('%Y-%m-%d %H:%M'), end.strftime('%Y-%m-%d %H:%M'))
+            for start, end in missing_weeks
+        ))
+        print("   Run again with --resume to scrape only those weeks.")
     print("="*60)
+    
+    return not missing_weeks
 
 
 if __name__ == "__main__":
@@ -0,0 +1,219 @@
+import os
+import sqlite3
+import time
+from datetime import datetime
+from typing import Iterable, Optional, Set
+
+import pandas as pd
+
+# 'PT12H5M30S', 'P1DT2H' -> days/hours/minutes/seconds
+ISO_DURATION_PATTERN = r'^P(?:(?P<days>\d+)D)?(?:T(?:(?P<hours>\d+)H)?(?:(?P<minutes>\d+)M)?(?:(?P<seconds>\d+(?:\.\d+)?)S)?)?$'
+DURATION_UNIT_SECONDS = {'days': 86400, 'hours': 3600, 'minutes': 60, 'seconds': 1}
+# BattleMetrics player pages are /players/<id>; the id survives name changes
+PLAYER_ID_PATTERN = r'/players/(\d+)'
+# Player keys per "IN (...)" lookup, below SQLite's default limit of 999 bound parameters
+LOOKUP_CHUNK_SIZE = 900
+
+PLAYTIME_COLUMNS = [
+    'Player_Key', 'BattleMetrics_Name', 'Week_Start_UTC', 'Week_End_UTC',
+    'Time_Display', 'Playtime_Seconds', 'Recorded_At'
+]
+
+
+# One row per player, week and playtime; NULL (unparseable) playtime counts as a single value,
+# since a plain UNIQUE constraint treats every NULL as distinct
+UNIQUE_RECORDING_INDEX = 'idx_weekly_playtime_recording'
+
+
+def _connect(db_path) -> sqlite3.Connection:
+    """Opens the warehouse, creating the file, table and indexes on first use."""
+    os.makedirs(os.path.dirname(db_path), exist_ok=True)
+    conn = sqlite3.connect(db_path)
+    conn.executescript(
+        """
+        CREATE TABLE IF NOT EXISTS weekly_playtime (
+            player_key TEXT NOT NULL,
+            player_name TEXT NOT NULL,
+            week_start TEXT NOT NULL,
+            week_end TEXT NOT NULL,
+            time_display TEXT,
+            playtime_seconds INTEGER,
+            recorded_at REAL NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS idx_weekly_playtime_week ON weekly_playtime (week_start);
+        """
+    )
+    has_unique_index = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'index' AND name = ?", (UNIQUE_RECORDING_INDEX,)
+    ).fetchone()
+    if not has_unique_index:
+        _add_unique_recording_index(conn)
+    return conn
+
+
+def _add_unique_recording_index(conn: sqlite3.Connection) -> None:
+    """
+    Creates the unique (player, week, playtime) index, which also serves
+    lookups by (player, week). Warehouses created before it existed may hold
+    repeated NULL-playtime rows; all but the first of each are dropped first.
+    """
+    with conn:
+        conn.execute(
+            """
+            DELETE FROM weekly_playtime
+            WHERE playtime_seconds IS NULL AND rowid NOT IN (
+                SELECT MIN(rowid) FROM weekly_playtime
+                WHERE playtime_seconds IS NULL
+                GROUP BY player_key, week_start
+            )
+            """
+        )
+        conn.execute("DROP INDEX IF EXISTS idx_weekly_playtime_player_week")
+        conn.execute(
+            f"""
+            CREATE UNIQUE INDEX {UNIQUE_RECORDING_INDEX}
+            ON weekly_playtime (player_key, week_start, IFNULL(playtime_seconds, -1))
+            """
+        )
+
+
+def iso_duration_seconds(durations: pd.Series) -> pd.Series:
+    """ISO 8601 durations ('PT3H2M') as whole seconds (<NA> where unparseable)."""
+    parts = durations.astype('string').str.extract(ISO_DURATION_PATTERN)
+    total = sum(
+        pd.to_numeric(parts[unit], errors='coerce').fillna(0) * factor
+        for unit, factor in DURATION_UNIT_SECONDS.items()
+    )
+    return total.round().astype('Int64').mask(parts.isna().all(axis=1))
+
+
+def player_keys(week_df: pd.DataFrame) -> pd.Series:
+    """BattleMetrics player id from the profile URL, falling back to 'name:<name>'."""
+    names = 'name:' + week_df['BattleMetrics_Name'].astype('string')
+    if 'BattleMetrics_Player_URL' not in week_df.columns:
+        return names
+    ids = week_df['BattleMetrics_Player_URL'].astype('string').str.extract(PLAYER_ID_PATTERN)[0]
+    return ids.fillna(names)
+
+
+def record_week(db_path, week_df: pd.DataFrame, recorded_at: float = None) -> int:
+    """
+    Appends one scraped week. Playtime only grows within a week, so a player's
+    row is only added when their playtime changed since the last scrape of
+    that week; nothing is ever updated or deleted. Returns the rows added.
+    """
+    if week_df.empty:
+        return 0
+
+    recorded_at = time.time() if recorded_at is None else recorded_at
+    rows = pd.DataFrame({
+        'player_key': player_keys(week_df),
+        'player_name': week_df['BattleMetrics_Name'],
+        'week_start': week_df['Week_Start_UTC'],
+        'week_end': week_df['Week_End_UTC'],
+        'time_display': week_df['Time_Display'],
+        'playtime_seconds': iso_duration_seconds(week_df['Time_ISO_Duration'])
+    }).drop_duplicates(['player_key', 'week_start'])
+
+    with _connect(db_path) as conn:
+        before = conn.total_changes
+        conn.executemany(
+            """
+            INSERT OR IGNORE INTO weekly_playtime
+                (player_key, player_name, week_start, week_end, time_display, playtime_seconds, recorded_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+            """,
+            [
+                (key, name, start, end, display, None if pd.isna(seconds) else int(seconds), recorded_at)
+                for key, name, start, end, display, seconds in rows.itertuples(index=False)
+            ]
+        )
+        added = conn.total_changes - before
+    conn.close()
+    return added
+
+
+def recorded_weeks(db_path) -> Set[str]:
+    """Week_Start_UTC of every week the warehouse has rows for."""
+    with _connect(db_path) as conn:
+        weeks = {row[0] for row in conn.execute("SELECT DISTINCT week_start FROM weekly_playtime")}
+    conn.close()
+    return weeks
+
+
+def latest_player_names(db_path, players: Iterable[str]) -> pd.Series:
+    """
+    The most recently recorded BattleMetrics name of each of players
+    (Player_Keys), indexed by Player_Key. Players without rows are left out.
+    """
+    players = list(dict.fromkeys(players))
+    chunks = []
+    with _connect(db_path) as conn:
+        for start in range(0, len(players), LOOKUP_CHUNK_SIZE):
+            chunk = players[start:start + LOOKUP_CHUNK_SIZE]
+            chunks.append(pd.read_sql_query(
+                f"""
+                SELECT player_key, player_name FROM (
+                    SELECT player_key, player_name, ROW_NUMBER() OVER (
+                        PARTITION BY player_key ORDER BY week_start DESC, recorded_at DESC
+                    ) AS recency
+                    FROM weekly_playtime
+                    WHERE player_key IN ({', '.join('?' * len(chunk))})
+                )
+                WHERE recency = 1
+                """,
+                conn,
+                params=chunk
+            ))
+    conn.close()
+
+    if not chunks:
+        return pd.Series(dtype=object, name='BattleMetrics_Name')
+    names = pd.concat(chunks, ignore_index=True)
+    return names.set_index('player_key')['player_name'].rename('BattleMetrics_Name').rename_axis('Player_Key')
+
+
+def query_playtime(db_path, start: Optional[datetime] = None, end: Optional[datetime] = None,
+                   as_of: Optional[datetime] = None, players: Optional[Iterable[str]] = None) -> pd.DataFrame:
+    """
+    Weekly playtime for weeks starting in [start, end), one row per player and
+    week (PLAYTIME_COLUMNS). Each row is the latest recording, or with as_of,
+    the latest recorded at or before as_of: the history as it was known then.
+    players limits the result to those Player_Keys.
+    """
+    conditions, params = [], []
+    if start is not None:
+        conditions.append("week_start >= ?")
+        params.append(start.strftime('%Y-%m-%d %H:%M'))
+    if end is not None:
+        conditions.append("week_start < ?")
+        params.append(end.strftime('%Y-%m-%d %H:%M'))
+    if as_of is not None:
+        conditions.append("week_start <= ? AND recorded_at <= ?")
+        params += [as_of.strftime('%Y-%m-%d %H:%M'), (as_of - datetime(1970, 1, 1)).total_seconds()]
+    if players is not None:
+        players = list(players)
+        conditions.append(f"player_key IN ({', '.join('?' * len(players))})")
+        params += players
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+
+    # Latest row per (player, week): the max recorded_at within the index-ordered group
+    query = f"""
+        SELECT player_key, player_name, week_start, week_end, time_display, playtime_seconds, recorded_at
+        FROM (
+            SELECT *, ROW_NUMBER() OVER (
+                PARTITION BY player_key, week_start ORDER BY recorded_at DESC, playtime_seconds DESC
+            ) AS recency
+            FROM weekly_playtime
+            {where}
+        )
+        WHERE recency = 1
+        ORDER BY week_start, player_key
+    """
+    with _connect(db_path) as conn:
+        history = pd.read_sql_query(query, conn, params=params)
+    conn.close()
+
+    history.columns = PLAYTIME_COLUMNS
+    history['Playtime_Seconds'] = history['Playtime_Seconds'].astype('Int64')
+    return history
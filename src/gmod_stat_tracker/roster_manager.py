@@ -1,17 +1,86 @@
+import numpy as np
 import pandas as pd
-import requests
 import gspread
+from gspread.utils import rowcol_to_a1
 import sys
 from google.oauth2.service_account import Credentials
 import os
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from typing import List, Dict, Any, Tuple
 
 # Import configuration (Absolute Import)
 from gmod_stat_tracker import config
+from gmod_stat_tracker.http_client import create_pooled_session
+from gmod_stat_tracker.steam_profile_cache import (
+    NOT_FOUND_STATUS,
+    load_cached_profiles,
+    save_profiles,
+    select_ids_to_refresh
+)
+
+# Roster membership: bit (i - 1) of Membership_Mask is set when the SteamID is listed in column i
+MEMBERSHIP_MASK_COLUMN = 'Membership_Mask'
+STEAM_ID64_PATTERN = r'^\d{17}$'
+
+
+def column_bit(column_index):
+    """Mask bit for a 1-based roster column (the keys of BRANCH_MAPPING / SUB_BRANCH_MAPPING)."""
+    return 1 << (column_index - 1)
+
+
+def columns_mask(column_indexes):
+    """Mask with the bits of every column in column_indexes set."""
+    mask = 0
+    for column_index in column_indexes:
+        mask |= column_bit(column_index)
+    return mask
+
+
+def build_membership_masks(data_rows, max_columns):
+    """
+    Turns the roster grid (rows without the header) into one row per SteamID64
+    with an int64 Membership_Mask of the columns (1..max_columns) it appears in.
+    """
+    grid = pd.DataFrame([list(row[:max_columns]) for row in data_rows])
+    if grid.empty:
+        return pd.DataFrame({'SteamID64': pd.Series(dtype=str), MEMBERSHIP_MASK_COLUMN: pd.Series(dtype='int64')})
+    
+    cells = grid.stack().astype(str).str.strip()
+    cells = cells[cells.str.match(STEAM_ID64_PATTERN)]
+    
+    column_positions = cells.index.get_level_values(1).to_numpy(dtype='int64')
+    entries = pd.DataFrame({
+        'SteamID64': cells.to_numpy(),
+        MEMBERSHIP_MASK_COLUMN: np.left_shift(1, column_positions).astype('int64')
+    }).drop_duplicates()
+    
+    # Each (SteamID, column) bit appears once, so summing the bits ORs them
+    return entries.groupby('SteamID64', sort=False)[MEMBERSHIP_MASK_COLUMN].sum().reset_index()
+
+
+def _read_roster_rows(creds_file_path, sheet_id, tab_name, max_columns):
+    """
+    Returns the roster tab's rows (header included), only columns A..max_columns,
+    fetched with a single batch_get.
+    """
+    scope = ['https://spreadsheets.google.com/feeds', 'https://www.googleapis.com/auth/drive']
+    creds = Credentials.from_service_account_file(creds_file_path, scopes=scope)
+    client = gspread.authorize(creds)
+    
+    spreadsheet = client.open_by_key(sheet_id)
+    worksheet = spreadsheet.worksheet(tab_name)
+    print(f"Connected to worksheet: {tab_name}")
+    
+    last_column = rowcol_to_a1(1, max_columns)[:-1]
+    rows = worksheet.batch_get([f"A:{last_column}"])[0]
+    return [list(row) for row in rows]
+
 
 def get_steam_ids_from_google_sheet(creds_file_path, sheet_id, tab_name, max_columns):
-    """(Unchanged logic)"""
-    roster_data = {}
+    """
+    Reads the roster tab and returns (steam_ids, roster_membership_df), the
+    latter with one Membership_Mask per SteamID64 (see build_membership_masks).
+    """
     print("Connecting to Google Sheets...")
     
     if not os.path.exists(creds_file_path):
@@ -19,49 +88,24 @@ def get_steam_ids_from_google_sheet(creds_file_path, sheet_id, tab_name, max_col
         return [], pd.DataFrame()
 
     try:
-        scope = ['https://spreadsheets.google.com/feeds', 'https://www.googleapis.com/auth/drive']
-        creds = Credentials.from_service_account_file(creds_file_path, scopes=scope)
-        client = gspread.authorize(creds)
-        
-        spreadsheet = client.open_by_key(sheet_id)
-        worksheet = spreadsheet.worksheet(tab_name)
-        print(f"Connected to worksheet: {tab_name}")
+        raw_data = _read_roster_rows(creds_file_path, sheet_id, tab_name, max_columns)
         
     except Exception as e:
         print(f"Connection Error: {e}")
         return [], pd.DataFrame()
 
     try:
-        raw_data = worksheet.get_all_values()
-        
         if not raw_data or len(raw_data) < 2:
             print("Worksheet is empty.")
             return [], pd.DataFrame()
         
         data_rows = raw_data[1:]
         print(f"Found {len(data_rows)} rows")
-
-        all_steam_ids = set()
         
-        for row in data_rows:
-            for col_index in range(min(len(row), max_columns)):
-                raw_value = str(row[col_index]).strip()
-                
-                if len(raw_value) == 17 and raw_value.isdigit():
-                    steam_id = raw_value
-                    all_steam_ids.add(steam_id)
-
-                    if steam_id not in roster_data:
-                        roster_data[steam_id] = {'SteamID64': steam_id}
-                        for i in range(1, max_columns + 1):
-                            roster_data[steam_id][f'Col_{i}_Member'] = False
-
-                    roster_data[steam_id][f'Col_{col_index + 1}_Member'] = True
-
-        print(f"Found {len(all_steam_ids)} unique Steam IDs")
+        roster_membership_df = build_membership_masks(data_rows, max_columns)
+        print(f"Found {len(roster_membership_df)} unique Steam IDs")
         
-        roster_membership_df = pd.DataFrame(roster_data.values())
-        return list(all_steam_ids), roster_membership_df
+        return roster_membership_df['SteamID64'].tolist(), roster_membership_df
 
     except Exception as e:
         print(f"Error: {e}")
@@ -70,40 +114,114 @@ def get_steam_ids_from_google_sheet(creds_file_path, sheet_id, tab_name, max_col
         return [], pd.DataFrame()
 
 
+STEAM_SUMMARIES_URL = "https://api.steampowered.com/ISteamUser/GetPlayerSummaries/v0002/"
+MAX_IDS_PER_REQUEST = 100
+
+
+def _fetch_summaries_batch(session, api_key, batch):
+    """One GetPlayerSummaries call (up to 100 IDs). Raises on failure after the session's retries."""
+    response = session.get(
+        STEAM_SUMMARIES_URL,
+        params={'key': api_key, 'steamids': ",".join(batch)},
+        timeout=10
+    )
+    response.raise_for_status()
+    return response.json()['response']['players']
+
+
+def fetch_player_summaries(steam_ids, api_key) -> Tuple[List[Dict[str, Any]], List[str]]:
+    """
+    Fetches Steam player summaries in 100-ID batches, sent concurrently over one
+    pooled keep-alive session (429/5xx are retried with backoff).
+    Returns (players, failed_ids) where failed_ids are the IDs of batches that
+    still failed after all retries.
+    """
+    batches = [steam_ids[i:i + MAX_IDS_PER_REQUEST] for i in range(0, len(steam_ids), MAX_IDS_PER_REQUEST)]
+    max_workers = max(1, min(config.STEAM_API_MAX_WORKERS, len(batches)))
+    session = create_pooled_session(max_workers)
+    
+    players = []
+    failed_ids = []
+    
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {executor.submit(_fetch_summaries_batch, session, api_key, batch): batch for batch in batches}
+        for future in as_completed(futures):
+            try:
+                players.extend(future.result())
+            except Exception as e:
+                batch = futures[future]
+                print(f"API Error ({len(batch)} IDs): {e}")
+                failed_ids.extend(batch)
+    
+    return players, failed_ids
+
+
 def resolve_steam_ids_to_names(steam_ids, api_key):
-    """(Unchanged logic)"""
+    """
+    Resolves SteamID64s to current persona names through the local profile cache.
+    
+    Only new IDs and up to STEAM_NAME_REFRESH_BUDGET stale ones (older than
+    STEAM_NAME_CACHE_TTL_HOURS) are sent to the Steam API; everything else is
+    served from the cache. IDs that failed and have no cached name are kept with
+    ProfileStatus 'Unresolved' instead of being dropped from the roster.
+    """
     if not steam_ids:
         return pd.DataFrame()
 
+    steam_ids = list(steam_ids)
     print(f"Resolving {len(steam_ids)} Steam IDs...")
     
-    MAX_IDS_PER_REQUEST = 100
-    resolved_players = []
-
-    for i in range(0, len(steam_ids), MAX_IDS_PER_REQUEST):
-        batch = steam_ids[i:i + MAX_IDS_PER_REQUEST]
-        steamids_str = ",".join(batch)
+    cached = load_cached_profiles(config.STEAM_NAME_CACHE_PATH, steam_ids)
+    new_ids, stale_ids = select_ids_to_refresh(
+        steam_ids, cached, config.STEAM_NAME_CACHE_TTL_HOURS, config.STEAM_NAME_REFRESH_BUDGET
+    )
+    ids_to_fetch = new_ids + stale_ids
+    print(f"Profile cache: {len(steam_ids) - len(new_ids)} cached, "
+          f"{len(new_ids)} new, {len(stale_ids)} stale to refresh")
+    
+    failed_ids = []
+    if ids_to_fetch:
+        players, failed_ids = fetch_player_summaries(ids_to_fetch, api_key)
         
-        API_URL = f"http://api.steampowered.com/ISteamUser/GetPlayerSummaries/v0002/?key={api_key}&steamids={steamids_str}"
+        profiles = {
+            player.get('steamid'): (
+                player.get('steamid'),
+                player.get('personaname'),
+                "Public" if player.get('communityvisibilitystate') == 3 else "Friends Only/Private"
+            )
+            for player in players
+        }
+        # IDs Steam answered for but did not return are remembered as not found
+        failed_set = set(failed_ids)
+        for steam_id in ids_to_fetch:
+            if steam_id not in profiles and steam_id not in failed_set:
+                profiles[steam_id] = (steam_id, None, NOT_FOUND_STATUS)
         
-        try:
-            response = requests.get(API_URL, timeout=10)
-            response.raise_for_status()
-            data = response.json()
-            
-            if data['response']['players']:
-                for player in data['response']['players']:
-                    resolved_players.append({
-                        "SteamID64": player.get('steamid'),
-                        "Current_SteamName_from_API": player.get('personaname'),
-                        "ProfileStatus": "Public" if player.get('communityvisibilitystate') == 3 else "Friends Only/Private"
-                    })
-
-        except Exception as e:
-            print(f"API Error: {e}")
+        save_profiles(config.STEAM_NAME_CACHE_PATH, list(profiles.values()))
+        print(f"Resolved {len(players)} profiles from the Steam API")
         
-    print(f"Resolved {len(resolved_players)} profiles")
-    return pd.DataFrame(resolved_players)
+        cached = load_cached_profiles(config.STEAM_NAME_CACHE_PATH, steam_ids)
+    
+    resolved_df = cached[cached['ProfileStatus'] != NOT_FOUND_STATUS].drop(columns=['Last_Checked'])
+    
+    resolved_ids = set(resolved_df['SteamID64'])
+    unresolved_ids = [steam_id for steam_id in failed_ids if steam_id not in resolved_ids]
+    if failed_ids:
+        print(f"⚠️ {len(failed_ids)} Steam ID(s) could not be refreshed "
+              f"({len(failed_ids) - len(unresolved_ids)} fall back to cached names)")
+    if unresolved_ids:
+        print(f"⚠️ Unresolved: {', '.join(unresolved_ids[:10])}{' ...' if len(unresolved_ids) > 10 else ''}")
+        resolved_df = pd.concat([
+            resolved_df,
+            pd.DataFrame({
+                "SteamID64": unresolved_ids,
+                "Current_SteamName_from_API": None,
+                "ProfileStatus": "Unresolved"
+            })
+        ], ignore_index=True)
+    
+    print(f"Resolved {len(resolved_df)} profiles")
+    return resolved_df.reset_index(drop=True)
 
 
 if __name__ == "__main__":
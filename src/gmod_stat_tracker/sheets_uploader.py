@@ -0,0 +1,321 @@
+import json
+import os
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Tuple
+
+import gspread
+import pandas as pd
+from gspread.utils import rowcol_to_a1
+from google.oauth2.service_account import Credentials
+
+# Import configuration (Absolute Import)
+from gmod_stat_tracker import config
+from gmod_stat_tracker.http_client import RETRY_STATUS_CODES
+from gmod_stat_tracker.battlemetrics_weeks import format_date_range_short
+
+SHEETS_SCOPE = ['https://spreadsheets.google.com/feeds', 'https://www.googleapis.com/auth/drive']
+
+
+def dataframe_to_sheet_values(df: pd.DataFrame, format_dates: bool = False, log: Callable[[str], None] = print) -> List[List]:
+    """Header row plus data rows, with NaN/NA as '' (what the tab should contain)."""
+    df_upload = df.copy()
+
+    if format_dates:
+        # Note: '2025' is hardcoded in your original logic.
+        date_columns = [col for col in df_upload.columns if ' - ' in str(col) and '2025' in str(col)]
+        if date_columns:
+            log(f"Formatting {len(date_columns)} date columns...")
+            rename_map = {col: format_date_range_short(col) for col in date_columns}
+            df_upload = df_upload.rename(columns=rename_map)
+
+    headers = df_upload.columns.values.tolist()
+    data_rows = df_upload.astype(object).values.tolist()
+    data_rows = [['' if pd.isna(cell) else cell for cell in row] for row in data_rows]
+
+    return [headers] + data_rows
+
+
+# --- SNAPSHOTS OF WHAT EACH TAB HOLDS ---
+
+def _snapshot_path(sheet_id: str, tab_name: str):
+    return config.SHEETS_SNAPSHOT_DIR / f"{sheet_id}_{tab_name}.json"
+
+
+def _as_text(values: List[List]) -> List[List[str]]:
+    """Cells as strings, the form get_all_values() returns, so both sources compare alike."""
+    return [['' if cell is None else str(cell) for cell in row] for row in values]
+
+
+def load_snapshot(sheet_id: str, tab_name: str) -> Optional[List[List[str]]]:
+    """Last uploaded grid for the tab, or None if there is no (readable) snapshot."""
+    path = _snapshot_path(sheet_id, tab_name)
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)['rows']
+    except (OSError, ValueError, KeyError):
+        return None
+
+
+def save_snapshot(sheet_id: str, tab_name: str, rows: List[List[str]]) -> None:
+    """Remembers the grid now in the tab (written atomically)."""
+    os.makedirs(config.SHEETS_SNAPSHOT_DIR, exist_ok=True)
+    path = _snapshot_path(sheet_id, tab_name)
+    tmp_path = path.with_suffix('.tmp')
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump({'saved_at': datetime.now().isoformat(), 'rows': rows}, f)
+    os.replace(tmp_path, path)
+
+
+# --- DIFF ---
+
+def _pad_row(row: List[str], width: int) -> List[str]:
+    return list(row[:width]) + [''] * (width - len(row))
+
+
+def diff_row_runs(old_rows: List[List[str]], new_rows: List[List[str]]) -> Tuple[int, List[Tuple[int, int]]]:
+    """
+    Compares two grids row by row. Returns the grid width and the runs of
+    changed rows as (start, stop) 0-based row indexes. Rows and columns that
+    existed before but not now count as changed (they get blanked).
+    """
+    width = max([len(row) for row in old_rows + new_rows] or [0])
+    if width == 0:
+        return 0, []
+
+    height = max(len(old_rows), len(new_rows))
+    blank = [''] * width
+
+    def padded(rows, i):
+        return _pad_row(rows[i], width) if i < len(rows) else blank
+
+    runs = []
+    run_start = None
+    for i in range(height + 1):
+        changed = i < height and padded(old_rows, i) != padded(new_rows, i)
+        if changed and run_start is None:
+            run_start = i
+        elif not changed and run_start is not None:
+            runs.append((run_start, i))
+            run_start = None
+
+    return width, runs
+
+
+def chunk_row_runs(runs: List[Tuple[int, int]], chunk_rows: int) -> List[List[Tuple[int, int]]]:
+    """Groups runs into chunks of at most chunk_rows rows, splitting long runs."""
+    chunks = []
+    current = []
+    current_rows = 0
+    for start, stop in runs:
+        while start < stop:
+            take = min(stop - start, chunk_rows - current_rows)
+            current.append((start, start + take))
+            current_rows += take
+            start += take
+            if current_rows == chunk_rows:
+                chunks.append(current)
+                current, current_rows = [], 0
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+def _range_entry(values: List[List], start: int, stop: int, width: int) -> Dict:
+    """batch_update entry writing rows start..stop (blank-padded to width)."""
+    return {
+        'range': f"{rowcol_to_a1(start + 1, 1)}:{rowcol_to_a1(stop, width)}",
+        'values': [_pad_row(values[i], width) if i < len(values) else [''] * width for i in range(start, stop)]
+    }
+
+
+# --- UPLOAD ---
+
+def _with_backoff(call, description, log: Callable[[str], None] = print):
+    """Runs a Sheets API call, retrying rate limits (429) and 5xx with exponential backoff."""
+    for attempt in range(1, config.SHEETS_API_ATTEMPTS + 1):
+        try:
+            return call()
+        except gspread.exceptions.APIError as e:
+            status = getattr(getattr(e, 'response', None), 'status_code', None)
+            if status not in RETRY_STATUS_CODES or attempt == config.SHEETS_API_ATTEMPTS:
+                raise
+            delay = config.HTTP_BACKOFF_FACTOR * (2 ** (attempt - 1))
+            log(f"⚠️ {description}: HTTP {status} (attempt {attempt}). Retrying in {delay:.0f}s...")
+            time.sleep(delay)
+
+
+def open_spreadsheet(sheet_id, creds_file):
+    """Authorizes the service account once and opens the spreadsheet."""
+    creds = Credentials.from_service_account_file(creds_file, scopes=SHEETS_SCOPE)
+    client = gspread.authorize(creds)
+    return client.open_by_key(sheet_id)
+
+
+def _fit_grid(worksheet, rows_needed: int, cols_needed: int, log: Callable[[str], None] = print) -> None:
+    """Grows the tab's grid when the data does not fit (writes past the grid are rejected)."""
+    if worksheet.row_count >= rows_needed and worksheet.col_count >= cols_needed:
+        return
+    rows = max(worksheet.row_count, rows_needed)
+    cols = max(worksheet.col_count, cols_needed)
+    log(f"Resizing grid to {rows} x {cols}...")
+    _with_backoff(lambda: worksheet.resize(rows=rows, cols=cols), "Resize", log)
+
+
+def upload_to_google_sheets(df, sheet_id, tab_name, creds_file, format_dates=False, spreadsheet=None,
+                            log: Callable[[str], None] = print):
+    """
+    Brings the tab in line with df, sending only the rows that changed since
+    the last upload (the tab is never cleared). Changed rows go out in
+    batch_update chunks of SHEETS_UPLOAD_CHUNK_ROWS, a few at a time, and the
+    snapshot is updated as each chunk lands, so a failed upload resumes from
+    there on the next run. The previous contents come from the local snapshot,
+    or are read back from the sheet when there is none. Pass an already opened
+    spreadsheet to skip re-authorizing; progress messages go to log.
+    """
+    log(f"\n[UPLOADING TO GOOGLE SHEETS: {tab_name}]")
+    log(f"DataFrame shape: {df.shape}")
+
+    values = dataframe_to_sheet_values(df, format_dates, log)
+    new_rows = _as_text(values)
+
+    try:
+        if spreadsheet is None:
+            spreadsheet = open_spreadsheet(sheet_id, creds_file)
+
+        try:
+            worksheet = spreadsheet.worksheet(tab_name)
+            old_rows = load_snapshot(sheet_id, tab_name)
+            if old_rows is None:
+                log(f"Found existing tab. No snapshot, reading current contents...")
+                old_rows = _with_backoff(worksheet.get_all_values, "Read back", log)
+        except gspread.exceptions.WorksheetNotFound:
+            log(f"Creating new tab...")
+            worksheet = _with_backoff(
+                lambda: spreadsheet.add_worksheet(title=tab_name, rows=len(values), cols=len(values[0]) or 1),
+                "Create tab",
+                log
+            )
+            old_rows = []
+
+        width, runs = diff_row_runs(old_rows, new_rows)
+
+        if not runs:
+            log(f"✅ No changes since last upload")
+            save_snapshot(sheet_id, tab_name, new_rows)
+            return True
+
+        _fit_grid(worksheet, runs[-1][1], width, log)
+
+        chunks = chunk_row_runs(runs, config.SHEETS_UPLOAD_CHUNK_ROWS)
+        changed_rows = sum(stop - start for start, stop in runs)
+        log(f"Uploading {changed_rows} changed row(s) in {len(chunks)} chunk(s)...")
+
+        # What the tab holds so far: the old grid with every committed chunk applied
+        committed = [_pad_row(row, width) for row in old_rows]
+        committed += [[''] * width] * (runs[-1][1] - len(committed))
+        lock = threading.Lock()
+
+        def send_chunk(chunk):
+            entries = [_range_entry(values, start, stop, width) for start, stop in chunk]
+            _with_backoff(lambda: worksheet.batch_update(entries), f"Chunk at row {chunk[0][0] + 1}", log)
+            with lock:
+                for start, stop in chunk:
+                    committed[start:stop] = [_pad_row(new_rows[i], width) if i < len(new_rows) else [''] * width
+                                             for i in range(start, stop)]
+                save_snapshot(sheet_id, tab_name, committed)
+
+        failed = 0
+        with ThreadPoolExecutor(max_workers=max(1, min(config.SHEETS_UPLOAD_MAX_WORKERS, len(chunks)))) as executor:
+            for future in as_completed([executor.submit(send_chunk, chunk) for chunk in chunks]):
+                try:
+                    future.result()
+                except Exception as e:
+                    log(f"❌ Chunk failed: {e}")
+                    failed += 1
+
+        if failed:
+            log(f"❌ {failed}/{len(chunks)} chunk(s) failed; the next run resumes from the committed ones")
+            return False
+
+        save_snapshot(sheet_id, tab_name, new_rows)
+        log(f"✅ Upload complete!")
+
+        return True
+
+    except Exception as e:
+        log(f"❌ Upload error: {e}")
+        import traceback
+        log(traceback.format_exc().rstrip())
+        return False
+
+
+# --- BACKGROUND UPLOAD QUEUE ---
+
+class UploadQueue:
+    """
+    Uploads tabs one after another on a background thread while the pipeline
+    keeps computing. The spreadsheet is opened once, by the worker, on the
+    first upload and reused for the rest of the run. Each upload's messages
+    are collected and printed by wait(), on the calling thread, so they do
+    not interleave with the pipeline's own output.
+    """
+
+    def __init__(self, sheet_id, creds_file):
+        self.sheet_id = sheet_id
+        self.creds_file = creds_file
+        self._spreadsheet = None
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='sheets-upload')
+        self._pending: List[Tuple[str, List[str], Future]] = []
+
+    @property
+    def spreadsheet(self):
+        """The spreadsheet the uploads went to (None if none opened it); read it after wait()."""
+        return self._spreadsheet
+
+    def submit(self, df, tab_name, format_dates=False) -> None:
+        """Queues df for upload to tab_name and returns immediately."""
+        messages: List[str] = []
+        future = self._executor.submit(self._upload, df.copy(), tab_name, format_dates, messages.append)
+        self._pending.append((tab_name, messages, future))
+
+    def _upload(self, df, tab_name, format_dates, log) -> bool:
+        """Worker side: opens the spreadsheet on first use, then uploads."""
+        if self._spreadsheet is None:
+            try:
+                self._spreadsheet = open_spreadsheet(self.sheet_id, self.creds_file)
+            except Exception as e:
+                log(f"❌ Could not open spreadsheet for {tab_name}: {e}")
+                return False
+
+        return upload_to_google_sheets(
+            df, self.sheet_id, tab_name, self.creds_file,
+            format_dates=format_dates, spreadsheet=self._spreadsheet, log=log
+        )
+
+    def wait(self) -> Dict[str, bool]:
+        """
+        Waits for every queued upload, prints their messages and a per-tab
+        summary, and returns {tab_name: succeeded}.
+        """
+        results = {}
+        for tab_name, messages, future in self._pending:
+            try:
+                results[tab_name] = bool(future.result())
+            except Exception as e:
+                messages.append(f"❌ Upload of {tab_name} crashed: {e}")
+                results[tab_name] = False
+            for message in messages:
+                print(message)
+
+        self._executor.shutdown(wait=True)
+        self._pending = []
+
+        if results:
+            print("\n[GOOGLE SHEETS UPLOADS]")
+            for tab_name, succeeded in results.items():
+                print(f"{'✅' if succeeded else '❌'} {tab_name}")
+
+        return results
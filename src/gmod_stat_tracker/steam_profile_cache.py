@@ -0,0 +1,96 @@
+import os
+import sqlite3
+import time
+from typing import Iterable, List, Tuple
+
+import pandas as pd
+
+PROFILE_COLUMNS = ['SteamID64', 'Current_SteamName_from_API', 'ProfileStatus', 'Last_Checked']
+
+# Steam returned nothing for these IDs (deleted/invalid accounts); cached so they are not re-requested
+NOT_FOUND_STATUS = "Not Found"
+
+# IDs per "IN (...)" lookup, below SQLite's default limit of 999 bound parameters
+LOOKUP_CHUNK_SIZE = 900
+
+
+def _connect(db_path) -> sqlite3.Connection:
+    """Opens the cache database, creating the file and table on first use."""
+    os.makedirs(os.path.dirname(db_path), exist_ok=True)
+    conn = sqlite3.connect(db_path)
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS steam_profiles (
+            steam_id TEXT PRIMARY KEY,
+            persona_name TEXT,
+            profile_status TEXT,
+            last_checked REAL NOT NULL
+        )
+        """
+    )
+    return conn
+
+
+def load_cached_profiles(db_path, steam_ids: Iterable[str]) -> pd.DataFrame:
+    """
+    Returns the cached profiles for steam_ids (Last_Checked is a unix timestamp).
+    Only those rows are read, through primary-key lookups in chunks of LOOKUP_CHUNK_SIZE.
+    """
+    steam_ids = list(dict.fromkeys(steam_ids))
+    chunks = []
+    with _connect(db_path) as conn:
+        for start in range(0, len(steam_ids), LOOKUP_CHUNK_SIZE):
+            chunk = steam_ids[start:start + LOOKUP_CHUNK_SIZE]
+            chunks.append(pd.read_sql_query(
+                f"""
+                SELECT steam_id, persona_name, profile_status, last_checked FROM steam_profiles
+                WHERE steam_id IN ({', '.join('?' * len(chunk))})
+                """,
+                conn,
+                params=chunk
+            ))
+    conn.close()
+
+    if not chunks:
+        return pd.DataFrame(columns=PROFILE_COLUMNS).astype({'Last_Checked': 'float64'})
+    cached = pd.concat(chunks, ignore_index=True)
+    cached.columns = PROFILE_COLUMNS
+    return cached
+
+
+def save_profiles(db_path, profiles: List[Tuple[str, str, str]], checked_at: float = None) -> None:
+    """Upserts (steam_id, persona_name, profile_status) rows stamped with checked_at."""
+    if not profiles:
+        return
+
+    checked_at = time.time() if checked_at is None else checked_at
+    with _connect(db_path) as conn:
+        conn.executemany(
+            """
+            INSERT INTO steam_profiles (steam_id, persona_name, profile_status, last_checked)
+            VALUES (?, ?, ?, ?)
+            ON CONFLICT(steam_id) DO UPDATE SET
+                persona_name = excluded.persona_name,
+                profile_status = excluded.profile_status,
+                last_checked = excluded.last_checked
+            """,
+            [(steam_id, name, status, checked_at) for steam_id, name, status in profiles]
+        )
+    conn.close()
+
+
+def select_ids_to_refresh(steam_ids: List[str], cached: pd.DataFrame, ttl_hours: float,
+                          refresh_budget: int, now: float = None) -> Tuple[List[str], List[str]]:
+    """
+    Splits the roster into (new_ids, stale_ids) to send to the Steam API.
+    New IDs are always resolved; stale IDs (older than ttl_hours) are refreshed
+    oldest-first, at most refresh_budget per run.
+    """
+    now = time.time() if now is None else now
+    cached_ids = set(cached['SteamID64'])
+    new_ids = [steam_id for steam_id in steam_ids if steam_id not in cached_ids]
+
+    stale = cached[cached['Last_Checked'] < now - ttl_hours * 3600].sort_values('Last_Checked')
+    stale_ids = stale['SteamID64'].head(max(0, refresh_budget)).tolist()
+
+    return new_ids, stale_ids
@@ -0,0 +1,114 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from typing import Any, Callable, Dict, List, Tuple
+
+# name -> (function, names of the tasks whose results it takes, in order)
+TaskGraph = Dict[str, Tuple[Callable[..., Any], List[str]]]
+
+
+class TaskCancelled(RuntimeError):
+    """A task that was skipped or stopped because another task failed."""
+
+
+def run_task_graph(tasks: TaskGraph, max_workers: int = None, cancel: threading.Event = None):
+    """
+    Runs every task as soon as its dependencies have finished, independent
+    tasks in parallel threads. Each function is called with its dependencies'
+    results as positional arguments.
+    
+    The first failure stops the graph: tasks not started yet are skipped,
+    cancel (if given) is set so long-running tasks can stop early, and the
+    function returns without waiting for the tasks still running.
+    Returns (results, errors, timings): errors maps the failed task to its
+    exception and every skipped or abandoned task to a TaskCancelled, and
+    timings maps each task that finished to its (start, end) perf_counter pair.
+    """
+    for name, (_, dependencies) in tasks.items():
+        unknown = [dep for dep in dependencies if dep not in tasks]
+        if unknown:
+            raise ValueError(f"Task '{name}' depends on unknown task(s): {unknown}")
+
+    results: Dict[str, Any] = {}
+    errors: Dict[str, BaseException] = {}
+    timings: Dict[str, Tuple[float, float]] = {}
+    pending = dict(tasks)
+    running = {}
+
+    def timed(name, func, args):
+        start = time.perf_counter()
+        try:
+            return func(*args)
+        finally:
+            timings[name] = (start, time.perf_counter())
+
+    executor = ThreadPoolExecutor(max_workers=max_workers or len(tasks) or 1)
+    try:
+        while pending or running:
+            if errors:
+                failed = ', '.join(errors)
+                if cancel is not None:
+                    cancel.set()
+                for name in pending:
+                    errors[name] = TaskCancelled(f"skipped, {failed} failed")
+                for future, name in running.items():
+                    future.cancel()
+                    errors[name] = TaskCancelled(f"abandoned, {failed} failed")
+                break
+
+            for name, (func, dependencies) in list(pending.items()):
+                if all(dep in results for dep in dependencies):
+                    args = [results[dep] for dep in dependencies]
+                    running[executor.submit(timed, name, func, args)] = name
+                    del pending[name]
+
+            if not running:
+                raise ValueError(f"Dependency cycle between tasks: {sorted(pending)}")
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                name = running.pop(future)
+                try:
+                    results[name] = future.result()
+                except Exception as e:
+                    errors[name] = e
+    finally:
+        # Abandoned tasks keep their threads until they return; don't block on them
+        executor.shutdown(wait=not errors)
+
+    return results, errors, dict(timings)
+
+
+def critical_path(tasks: TaskGraph, timings: Dict[str, Tuple[float, float]]) -> List[str]:
+    """
+    The chain of tasks that determined the finish time: starting from the task
+    that ended last, repeatedly step to the dependency that finished last.
+    """
+    if not timings:
+        return []
+
+    path = [max(timings, key=lambda name: timings[name][1])]
+    while True:
+        dependencies = [dep for dep in tasks[path[-1]][1] if dep in timings]
+        if not dependencies:
+            break
+        path.append(max(dependencies, key=lambda dep: timings[dep][1]))
+
+    return list(reversed(path))
+
+
+def print_task_report(tasks: TaskGraph, timings: Dict[str, Tuple[float, float]]) -> None:
+    """Prints each task's start/duration relative to the first start, then the critical path."""
+    if not timings:
+        return
+
+    origin = min(start for start, _ in timings.values())
+    finish = max(end for _, end in timings.values())
+
+    print("\n[TASK TIMINGS]")
+    for name, (start, end) in sorted(timings.items(), key=lambda item: item[1][0]):
+        print(f"   {name:<20} start +{start - origin:6.1f}s   took {end - start:6.1f}s")
+
+    path = critical_path(tasks, timings)
+    path_time = sum(timings[name][1] - timings[name][0] for name in path)
+    print(f"Critical path ({path_time:.1f}s of {finish - origin:.1f}s total): {' -> '.join(path)}")
@@ -2,10 +2,16 @@ import pandas as pd
 import plotly.graph_objects as go
 from plotly.subplots import make_subplots
 import os
-from datetime import datetime
 
 # Import configuration (Absolute Import)
 from gmod_stat_tracker import config
+from gmod_stat_tracker.battlemetrics_weeks import format_date_range_short
+from gmod_stat_tracker.data_quality import (
+    OUTLIER_RULES,
+    find_outliers,
+    describe_outliers,
+    rules_for_columns
+)
 
 
 def ensure_graphs_directory():
@@ -14,64 +20,33 @@ def ensure_graphs_directory():
         os.makedirs(config.GRAPHS_DIR)
         print(f"Created directory: {config.GRAPHS_DIR}")
 
-def format_date_range_short(date_range_str):
-    """(Unchanged logic)"""
-    try:
-        parts = date_range_str.split(' - ')
-        if len(parts) == 2:
-            start_date = datetime.strptime(parts[0], '%Y-%m-%d %H:%M')
-            end_date = datetime.strptime(parts[1], '%Y-%m-%d %H:%M')
-            return f"{start_date.strftime('%m/%d')} - {end_date.strftime('%m/%d')}"
-    except:
-        pass
-    return date_range_str
-
-
 def analyze_data_quality(branch_pivots_df, subbranch_pivots_df):
-    """(Unchanged logic)"""
+    """Runs the shared outlier rules (data_quality) over the pivot averages."""
     print("\n" + "="*60)
     print("DATA QUALITY ANALYSIS")
     print("="*60)
     
     issues_found = []
     
-    if not branch_pivots_df.empty:
-        print("\n[BRANCH DATA ANALYSIS]")
-        for _, row in branch_pivots_df.iterrows():
-            branch = row['Branch']
-            
-            if 'Avg_HS_Percent' in row and pd.notna(row['Avg_HS_Percent']):
-                hs_pct = row['Avg_HS_Percent']
-                if hs_pct > 100:
-                    issue = f"⚠️ {branch}: Headshot % is {hs_pct:.2f}% (over 100%!)"
-                    print(issue)
-                    issues_found.append(issue)
-            
-            if 'Avg_KD_Ratio' in row and pd.notna(row['Avg_KD_Ratio']):
-                kd = row['Avg_KD_Ratio']
-                if kd > 10:
-                    issue = f"⚠️ {branch}: K/D Ratio is {kd:.2f} (suspiciously high)"
-                    print(issue)
-                    issues_found.append(issue)
-            
-            for col in ['Avg_Kills', 'Avg_Deaths', 'Avg_Money', 'Avg_Level']:
-                if col in row and pd.notna(row[col]):
-                    if row[col] < 0:
-                        issue = f"⚠️ {branch}: {col} is negative ({row[col]})"
-                        print(issue)
-                        issues_found.append(issue)
-    
-    if not subbranch_pivots_df.empty:
-        print("\n[SUB-BRANCH DATA ANALYSIS]")
-        for _, row in subbranch_pivots_df.iterrows():
-            subbranch = row['SubBranch']
-            
-            if 'Avg_HS_Percent' in row and pd.notna(row['Avg_HS_Percent']):
-                hs_pct = row['Avg_HS_Percent']
-                if hs_pct > 100:
-                    issue = f"⚠️ {subbranch}: Headshot % is {hs_pct:.2f}% (over 100%!)"
-                    print(issue)
-                    issues_found.append(issue)
+    checks = [
+        ("[BRANCH DATA ANALYSIS]", branch_pivots_df, 'Branch', OUTLIER_RULES),
+        ("[SUB-BRANCH DATA ANALYSIS]", subbranch_pivots_df, 'SubBranch', rules_for_columns(['HS_Percent'])),
+    ]
+    
+    for title, pivots_df, label_col, rules in checks:
+        if pivots_df.empty:
+            continue
+        
+        print(f"\n{title}")
+        violations = find_outliers(pivots_df, column_prefix='Avg_', rules=rules)
+        issues_by_row = describe_outliers(pivots_df, violations, column_prefix='Avg_', rules=rules)
+        
+        for idx, row_issues in issues_by_row.items():
+            label = pivots_df.at[idx, label_col]
+            for row_issue in row_issues:
+                issue = f"⚠️ {label}: {row_issue}"
+                print(issue)
+                issues_found.append(issue)
     
     if not issues_found:
         print("\n✅ No data quality issues detected!")
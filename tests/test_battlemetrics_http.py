@@ -0,0 +1,153 @@
+import functools
+import http.server
+import os
+import subprocess
+import sys
+import threading
+from pathlib import Path
+
+import pytest
+import requests
+
+from gmod_stat_tracker import config
+from gmod_stat_tracker.battlemetrics_http import (
+    create_http_session,
+    parse_leaderboard_html,
+    scrape_all_pages_http,
+    scrape_weeks_http
+)
+from gmod_stat_tracker.battlemetrics_weeks import (
+    LEADERBOARD_ROW_COLUMNS,
+    WeekScrapeError,
+    get_week_windows,
+    is_confirmed_empty
+)
+
+FIXTURES_DIR = Path(__file__).parent / 'fixtures' / 'battlemetrics'
+SRC_DIR = Path(__file__).parent.parent / 'src'
+
+
+@pytest.fixture
+def fixture_server():
+    """Serves the saved leaderboard pages on a local port; yields the base URL."""
+    handler = functools.partial(http.server.SimpleHTTPRequestHandler, directory=str(FIXTURES_DIR))
+    server = http.server.ThreadingHTTPServer(('127.0.0.1', 0), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        yield f"http://127.0.0.1:{server.server_address[1]}"
+    finally:
+        server.shutdown()
+
+
+def test_parse_leaderboard_html_rows_and_next_link():
+    page_html = (FIXTURES_DIR / 'page1.html').read_text()
+    rows, next_url = parse_leaderboard_html(page_html, 'https://example.test/leaderboard/page1.html')
+
+    assert [row['BattleMetrics_Name'] for row in rows] == ['Alpha One', 'Bravo']
+    assert rows[0] == {
+        'Rank': '1',
+        'BattleMetrics_Name': 'Alpha One',
+        'BattleMetrics_Player_URL': 'https://example.test/players/1001',
+        'Time_Display': '1d 17h 5m',
+        'Time_ISO_Duration': 'PT41H5M',
+    }
+    assert next_url == 'https://example.test/leaderboard/page2.html?page%5Brel%5D=next'
+
+
+def test_parse_leaderboard_html_last_page_has_no_next_link():
+    _, next_url = parse_leaderboard_html((FIXTURES_DIR / 'page2.html').read_text(), 'https://example.test/page2.html')
+    assert next_url is None
+
+
+def test_scrape_all_pages_http_follows_next_links(fixture_server):
+    df = scrape_all_pages_http(requests.Session(), f"{fixture_server}/page1.html")
+
+    assert df['BattleMetrics_Name'].tolist() == ['Alpha One', 'Bravo', 'Charlie']
+    assert df['Time_ISO_Duration'].tolist() == ['PT41H5M', 'PT30H', 'PT2H30M']
+
+
+def test_scrape_all_pages_http_empty_leaderboard_is_confirmed_empty(fixture_server):
+    df = scrape_all_pages_http(requests.Session(), f"{fixture_server}/empty.html")
+
+    assert is_confirmed_empty(df)
+    assert list(df.columns) == LEADERBOARD_ROW_COLUMNS
+
+
+def test_scrape_all_pages_http_failed_request_is_not_confirmed_empty(fixture_server):
+    df = scrape_all_pages_http(requests.Session(), f"{fixture_server}/missing.html")
+
+    assert df.empty and not is_confirmed_empty(df)
+
+
+def test_scrape_all_pages_http_login_page_is_not_confirmed_empty(fixture_server):
+    # A login wall (or rate-limit page, or changed markup) loads fine but is not the leaderboard
+    df = scrape_all_pages_http(requests.Session(), f"{fixture_server}/login.html")
+
+    assert df.empty and not is_confirmed_empty(df)
+
+
+def test_scrape_weeks_http_reports_failed_weeks_after_the_rest(fixture_server):
+    windows = get_week_windows(2)
+    delivered = []
+
+    # Every window of an empty leaderboard loads fine; a missing page fails every window
+    scrape_weeks_http(requests.Session(), f"{fixture_server}/empty.html", windows,
+                      on_week=lambda df, start, end: delivered.append(start))
+    assert sorted(delivered) == sorted(start for start, _ in windows)
+
+    with pytest.raises(WeekScrapeError) as excinfo:
+        scrape_weeks_http(requests.Session(), f"{fixture_server}/missing.html", windows,
+                          on_week=lambda df, start, end: delivered.append(start))
+    assert excinfo.value.windows == windows
+
+
+def test_http_session_retries_rate_limited_pages(tmp_path, monkeypatch):
+    monkeypatch.setattr(config, 'HTTP_BACKOFF_FACTOR', 0)
+    requests_seen = []
+
+    class Handler(http.server.SimpleHTTPRequestHandler):
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, directory=str(FIXTURES_DIR), **kwargs)
+
+        def do_GET(self):
+            requests_seen.append(self.path)
+            # Every page is rate limited once before it is served
+            if requests_seen.count(self.path) == 1:
+                self.send_response(429)
+                self.send_header('Retry-After', '0')
+                self.end_headers()
+                return
+            super().do_GET()
+
+        def log_message(self, *args):
+            pass
+
+    server = http.server.ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    cookies_file = tmp_path / 'cookies.json'
+    cookies_file.write_text('{"session": "exported"}')
+    try:
+        session = create_http_session(cookies_file=str(cookies_file))
+        df = scrape_all_pages_http(session, f"http://127.0.0.1:{server.server_address[1]}/page1.html")
+    finally:
+        server.shutdown()
+
+    assert df['BattleMetrics_Name'].tolist() == ['Alpha One', 'Bravo', 'Charlie']
+    assert len(requests_seen) == 4
+
+
+def test_http_backend_imports_without_selenium():
+    # A fresh interpreter, so modules other tests imported cannot hide a selenium import
+    code = (
+        "import sys\n"
+        "import gmod_stat_tracker.battlemetrics_http\n"
+        "import gmod_stat_tracker.pipeline\n"
+        "assert 'selenium' not in sys.modules, 'selenium was imported'\n"
+    )
+    result = subprocess.run(
+        [sys.executable, '-c', code],
+        env=dict(os.environ, PYTHONPATH=str(SRC_DIR)),
+        capture_output=True,
+        text=True
+    )
+    assert result.returncode == 0, result.stderr
@@ -0,0 +1,43 @@
+from pathlib import Path
+
+import pytest
+
+pytest.importorskip('selenium')
+
+from gmod_stat_tracker.battlemetrics_scraper import PAGE_INFO_SCRIPT, scrape_all_pages
+from gmod_stat_tracker.battlemetrics_weeks import LEADERBOARD_ROW_COLUMNS, is_confirmed_empty
+
+FIXTURES_DIR = Path(__file__).parent / 'fixtures' / 'battlemetrics'
+
+
+class FakeDriver:
+    """A loaded page without leaderboard rows: answers the scripts scrape_all_pages runs before reading rows."""
+
+    def __init__(self, page_html):
+        self.page_source = page_html
+        self.current_url = None
+
+    def get(self, url):
+        self.current_url = url
+
+    def execute_script(self, script, *args):
+        if script == PAGE_INFO_SCRIPT:
+            return {'next': None, 'sizes': []}
+        if 'readyState' in script:
+            return True
+        if 'table tbody tr' in script:
+            return False
+        raise AssertionError(f"unexpected script: {script}")
+
+
+def test_empty_leaderboard_page_is_confirmed_empty():
+    df = scrape_all_pages(FakeDriver((FIXTURES_DIR / 'empty.html').read_text()), 'https://example.test/leaderboard')
+
+    assert is_confirmed_empty(df)
+    assert list(df.columns) == LEADERBOARD_ROW_COLUMNS
+
+
+def test_login_page_is_not_confirmed_empty():
+    df = scrape_all_pages(FakeDriver((FIXTURES_DIR / 'login.html').read_text()), 'https://example.test/leaderboard')
+
+    assert df.empty and not is_confirmed_empty(df)
@@ -0,0 +1,187 @@
+import http.server
+import json
+import threading
+import urllib.parse
+
+import pandas as pd
+import pytest
+
+from gmod_stat_tracker import config
+from gmod_stat_tracker.gmod_api_fetcher import fetch_gmod_leaderboard, iter_json_array
+
+LEADERBOARD_SIZE = 10
+
+JSON_BODY = json.dumps({
+    'draw': 1,
+    'recordsTotal': 1234,
+    'data': [
+        {'steamid': '76561198000000001', 'money': 500.25, 'name': 'Al\u00e9 "quoted" \\ name', 'kd_ratio': -1.5e-3},
+        {'steamid': '76561198000000002', 'money': 12, 'name': None, 'tags': [1, [2, {}]], 'alive': True}
+    ],
+    'recordsFiltered': 1234
+}, indent=1)
+
+
+def _api_row(position):
+    return {
+        'steamid': f"7656119800000{position:04d}",
+        'pos': str(position),
+        'rpname': f"RP {position}",
+        'name': f"Player {position}",
+        'money': f"${position * 1000:,}",
+        'level': str(position),
+        'playtime': '1h',
+        'kills': str(position * 10),
+        'deaths': '5',
+        'kd_ratio': '2.0',
+        'headshots': '1',
+        'damage': '100',
+        'headshot_percent': '10%'
+    }
+
+
+def _parse_in_chunks(body, chunk_size):
+    meta = {}
+    chunks = (body[i:i + chunk_size] for i in range(0, len(body), chunk_size))
+    return list(iter_json_array(chunks, 'data', meta)), meta
+
+
+@pytest.mark.parametrize('chunk_size', [1, 2, 3, 5, 7, 64, len(JSON_BODY)])
+def test_iter_json_array_matches_json_loads_for_any_chunking(chunk_size):
+    expected = json.loads(JSON_BODY)
+
+    rows, meta = _parse_in_chunks(JSON_BODY, chunk_size)
+
+    assert rows == expected['data']
+    assert meta == {'draw': 1, 'recordsTotal': 1234, 'data': [], 'recordsFiltered': 1234}
+
+
+def test_iter_json_array_does_not_cut_numbers_at_a_chunk_boundary():
+    rows, meta = _parse_in_chunks('{"data":[500.25,-1e3],"recordsTotal":1000}', 1)
+
+    assert rows == [500.25, -1000.0]
+    assert meta['recordsTotal'] == 1000
+
+
+def test_iter_json_array_rejects_a_truncated_body():
+    with pytest.raises(ValueError):
+        _parse_in_chunks(JSON_BODY[:len(JSON_BODY) // 2], 4)
+
+
+@pytest.fixture
+def fake_api(monkeypatch):
+    """
+    A local leaderboard API that returns at most max_length rows per request,
+    answers the first request for each offset in rate_limited with a 429 and
+    for each offset in short_once with a single row, fails the targeted-mode
+    probe (start 0, length 1) when failing_probe is set, filters rows by
+    substring with search[value] like the real API, and records the
+    (start, length) of every request and every non-empty search value.
+    """
+    state = {'max_length': 3, 'rate_limited': set(), 'short_once': set(), 'failing_probe': False,
+             'requests': [], 'searches': []}
+
+    class Handler(http.server.BaseHTTPRequestHandler):
+        def do_GET(self):
+            query = dict(urllib.parse.parse_qsl(urllib.parse.urlsplit(self.path).query))
+            start, length = int(query['start']), int(query['length'])
+            state['requests'].append((start, length))
+            if (start, length) == (0, 1) and state['failing_probe']:
+                self.send_response(500)
+                self.end_headers()
+                return
+            if start in state['rate_limited']:
+                state['rate_limited'].discard(start)
+                self.send_response(429)
+                self.send_header('Retry-After', '0')
+                self.end_headers()
+                return
+            served = min(length, state['max_length'])
+            if start in state['short_once']:
+                state['short_once'].discard(start)
+                served = 1
+            search = query.get('search[value]', '')
+            if search:
+                state['searches'].append(search)
+                matches = [_api_row(position) for position in range(1, LEADERBOARD_SIZE + 1)
+                           if search in _api_row(position)['steamid']]
+                rows = matches[start:start + served]
+            else:
+                rows = [_api_row(position) for position in range(start + 1, min(start + served, LEADERBOARD_SIZE) + 1)]
+            body = json.dumps({'draw': query['draw'], 'recordsTotal': LEADERBOARD_SIZE, 'data': rows}).encode()
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = http.server.ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    monkeypatch.setattr(config, 'GMOD_API_URL', f"http://127.0.0.1:{server.server_address[1]}/api")
+    monkeypatch.setattr(config, 'GMOD_API_TARGETED_MODE', 'never')
+    monkeypatch.setattr(config, 'HTTP_BACKOFF_FACTOR', 0)
+    try:
+        yield state
+    finally:
+        server.shutdown()
+
+
+def test_pages_step_by_the_rows_the_server_returns(fake_api):
+    df = fetch_gmod_leaderboard()
+
+    assert df['Rank'].tolist() == list(range(1, LEADERBOARD_SIZE + 1))
+    # The server capped the first page at 3 rows, so later pages start every 3 rows
+    assert sorted(start for start, _ in fake_api['requests']) == [0, 3, 6, 9]
+
+
+def test_rate_limited_page_is_retried_once_per_attempt(fake_api):
+    fake_api['rate_limited'] = {3}
+
+    df = fetch_gmod_leaderboard()
+
+    assert len(df) == LEADERBOARD_SIZE
+    # One 429 and one successful retry: the session does not retry on top of _request_page
+    assert [start for start, _ in fake_api['requests']].count(3) == 2
+
+
+def test_short_page_is_topped_up(fake_api):
+    fake_api['short_once'] = {3}
+
+    df = fetch_gmod_leaderboard()
+
+    assert df['Rank'].tolist() == list(range(1, LEADERBOARD_SIZE + 1))
+    assert (4, 2) in fake_api['requests']
+
+
+def test_failed_probe_falls_back_to_all_pages(fake_api, monkeypatch):
+    monkeypatch.setattr(config, 'GMOD_API_TARGETED_MODE', 'auto')
+    monkeypatch.setattr(config, 'GMOD_API_TARGETED_MAX_FRACTION', 1.0)
+    monkeypatch.setattr(config, 'GMOD_API_PAGE_ATTEMPTS', 2)
+    fake_api['failing_probe'] = True
+
+    df = fetch_gmod_leaderboard(['76561198000000002'])
+
+    assert len(df) == LEADERBOARD_SIZE
+
+
+def test_targeted_mode_looks_up_only_the_roster(fake_api, monkeypatch):
+    monkeypatch.setattr(config, 'GMOD_API_TARGETED_MODE', 'always')
+    # Forced mode must not depend on the size probe
+    fake_api['failing_probe'] = True
+    # The search is a substring match: "7656119800000001" also hits player 10 ("76561198000000010"),
+    # which is not on the roster and must be filtered out
+    roster = ['76561198000000001', '76561198000000004', '7656119800000001']
+
+    df = fetch_gmod_leaderboard(roster)
+    full_df = fetch_gmod_leaderboard()
+
+    assert (0, 1) not in fake_api['requests']
+    assert sorted(fake_api['searches']) == sorted(roster)
+    assert df['SteamID64'].tolist() == ['76561198000000001', '76561198000000004']
+    assert list(df.columns) == list(full_df.columns)
+    assert df.dtypes.astype(str).to_dict() == full_df.dtypes.astype(str).to_dict()
+    expected = full_df[full_df['SteamID64'].isin(roster)].reset_index(drop=True)
+    pd.testing.assert_frame_equal(df.reset_index(drop=True), expected, check_categorical=False)
@@ -0,0 +1,48 @@
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from gmod_stat_tracker.leaderboard_snapshots import record_snapshot, stats_as_of
+
+
+def _leaderboard(kills, money, name='Alpha'):
+    return pd.DataFrame({
+        'SteamID64': ['76561198000000001', '76561198000000002'],
+        'Kills': kills,
+        'Deaths': [5, 6],
+        'Money': money,
+        'Level': [10, 11],
+        'Headshots': [1, 2],
+        'Damage': [100, 200],
+        'Total_Playtime': ['1h', '2h'],
+        'RP_Name': ['RP Alpha', 'RP Beta'],
+        'Player_Name': [name, 'Beta'],
+    })
+
+
+def test_dtype_changes_do_not_count_as_stat_changes(tmp_path):
+    db_path = tmp_path / 'snapshots.sqlite'
+
+    assert record_snapshot(db_path, _leaderboard([10, 20], [1500.5, 0.0]), taken_at=1) == 2
+    # Same stats, other dtypes: nullable ints, floats, numpy scalars, padded and categorical names
+    drifted = _leaderboard(pd.array([10, 20], dtype='Int64'), np.array([1500.50, 0], dtype='float32'), name=' Alpha ')
+    drifted['Deaths'] = drifted['Deaths'].astype('float64')
+    drifted['Player_Name'] = drifted['Player_Name'].astype('category')
+    assert record_snapshot(db_path, drifted, taken_at=2) == 0
+
+    assert record_snapshot(db_path, _leaderboard([11, 20], [1500.5, 0.0]), taken_at=3) == 1
+
+
+def test_stats_as_of_returns_each_players_latest_row(tmp_path):
+    db_path = tmp_path / 'snapshots.sqlite'
+    epoch = datetime(1970, 1, 1)
+    record_snapshot(db_path, _leaderboard([10, 20], [1.0, 2.0]), taken_at=100)
+    record_snapshot(db_path, _leaderboard([15, 20], [1.0, 2.0]), taken_at=200)
+    record_snapshot(db_path, _leaderboard([30, 40], [1.0, 2.0]), taken_at=300)
+
+    stats = stats_as_of(db_path, datetime.utcfromtimestamp(250)).set_index('SteamID64')
+
+    assert stats.loc['76561198000000001', ['Taken_At', 'Kills']].tolist() == [200, 15]
+    assert stats.loc['76561198000000002', ['Taken_At', 'Kills']].tolist() == [100, 20]
+    assert len(stats_as_of(db_path, epoch)) == 0
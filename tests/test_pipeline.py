@@ -0,0 +1,79 @@
+import random
+import re
+
+import pandas as pd
+
+from gmod_stat_tracker import config
+from gmod_stat_tracker.pipeline import calculate_roster_fields, parse_playtime_hours
+from gmod_stat_tracker.roster_manager import column_bit
+
+
+def reference_roster_fields(members):
+    """The per-row Branch / Sub_Branch logic calculate_roster_fields replaced."""
+    branch = "Unknown"
+    for index, branch_name in config.BRANCH_MAPPING.items():
+        if index <= 4 and members.get(index):
+            branch = branch_name
+            break
+    sub_branches = [name for index, name in config.SUB_BRANCH_MAPPING.items() if index >= 5 and members.get(index)]
+    return branch, ", ".join(sub_branches) if sub_branches else "None"
+
+
+def test_calculate_roster_fields_matches_the_per_row_logic():
+    rng = random.Random(0)
+    columns = list(config.BRANCH_MAPPING)
+    memberships = [{index: rng.random() < 0.2 for index in columns} for _ in range(500)]
+    masks = pd.Series([sum(column_bit(index) for index, member in row.items() if member) for row in memberships])
+
+    fields = calculate_roster_fields(masks)
+
+    expected = [reference_roster_fields(row) for row in memberships]
+    assert list(zip(fields['Branch'], fields['Sub_Branch'])) == expected
+
+
+def reference_playtime_hours(time_str):
+    """The per-cell playtime parser parse_playtime_hours replaced."""
+    if pd.isna(time_str) or time_str == '':
+        return 0.0
+    
+    time_str = str(time_str).strip()
+    
+    if 'h' in time_str or 'd' in time_str:
+        total_hours = 0.0
+        
+        days_match = re.search(r'(\d+)d', time_str)
+        if days_match:
+            total_hours += int(days_match.group(1)) * 24
+        
+        hours_match = re.search(r'(\d+)h', time_str)
+        if hours_match:
+            total_hours += int(hours_match.group(1))
+        
+        minutes_match = re.search(r'(\d+)m', time_str)
+        if minutes_match:
+            total_hours += int(minutes_match.group(1)) / 60.0
+        
+        return round(total_hours, 2)
+    
+    if ':' in time_str:
+        parts = time_str.split(':')
+        if len(parts) == 2:
+            try:
+                hours = int(parts[0])
+                minutes = int(parts[1])
+                return round(hours + minutes / 60.0, 2)
+            except ValueError:
+                return 0.0
+    
+    return 0.0
+
+
+def test_parse_playtime_hours_matches_the_per_cell_parser():
+    values = ['1d 2h 30m', '5h', '45m', ' 3h 5m ', '12:30', '0:05', '2d', 'garbage', '', None, '1:2:3', 'x:y']
+    frame = pd.DataFrame({'Week 1': values, 'Week 2': list(reversed(values))})
+
+    hours = parse_playtime_hours(frame)
+
+    assert hours['Week 1'].tolist() == [reference_playtime_hours(value) for value in values]
+    assert hours['Week 2'].tolist() == [reference_playtime_hours(value) for value in reversed(values)]
+    assert parse_playtime_hours(frame['Week 1']).tolist() == hours['Week 1'].tolist()
@@ -0,0 +1,77 @@
+import sqlite3
+from datetime import datetime
+
+import pandas as pd
+
+from gmod_stat_tracker import config
+from gmod_stat_tracker.pipeline import build_history_pivot
+from gmod_stat_tracker.playtime_warehouse import query_playtime, record_week
+
+
+def _week(start, end, rows):
+    """A scraped week: rows are (name, player id, ISO duration, display)."""
+    return pd.DataFrame({
+        'BattleMetrics_Name': [name for name, _, _, _ in rows],
+        'BattleMetrics_Player_URL': [f"https://www.battlemetrics.com/players/{player_id}" for _, player_id, _, _ in rows],
+        'Time_ISO_Duration': [duration for _, _, duration, _ in rows],
+        'Time_Display': [display for _, _, _, display in rows],
+        'Week_Start_UTC': start,
+        'Week_End_UTC': end,
+    })
+
+
+def test_unparseable_playtime_is_recorded_once(tmp_path):
+    db_path = tmp_path / 'warehouse.sqlite'
+    week_df = _week('2026-06-01 04:00', '2026-06-08 04:00', [('Alpha', 1, 'garbled', '?')])
+
+    assert record_week(db_path, week_df, recorded_at=1) == 1
+    assert record_week(db_path, week_df, recorded_at=2) == 0
+
+    with sqlite3.connect(db_path) as conn:
+        assert conn.execute("SELECT COUNT(*) FROM weekly_playtime").fetchone() == (1,)
+    conn.close()
+
+
+def test_existing_null_duplicates_are_dropped_when_the_index_is_added(tmp_path):
+    db_path = tmp_path / 'warehouse.sqlite'
+    with sqlite3.connect(db_path) as conn:
+        # The original schema, whose UNIQUE constraint let NULL playtimes repeat
+        conn.execute(
+            """
+            CREATE TABLE weekly_playtime (
+                player_key TEXT NOT NULL, player_name TEXT NOT NULL, week_start TEXT NOT NULL,
+                week_end TEXT NOT NULL, time_display TEXT, playtime_seconds INTEGER,
+                recorded_at REAL NOT NULL, UNIQUE (player_key, week_start, playtime_seconds)
+            )
+            """
+        )
+        conn.executemany(
+            "INSERT INTO weekly_playtime VALUES ('1', 'Alpha', '2026-06-01 04:00', '2026-06-08 04:00', '?', NULL, ?)",
+            [(1,), (2,), (3,)]
+        )
+    conn.close()
+
+    history = query_playtime(db_path)
+
+    assert len(history) == 1
+    with sqlite3.connect(db_path) as conn:
+        assert conn.execute("SELECT COUNT(*) FROM weekly_playtime").fetchone() == (1,)
+    conn.close()
+
+
+def test_history_follows_a_player_across_a_rename(tmp_path, monkeypatch):
+    monkeypatch.setattr(config, 'PLAYTIME_WAREHOUSE_PATH', tmp_path / 'warehouse.sqlite')
+    recorded_at = datetime(2026, 6, 15).timestamp()
+    record_week(config.PLAYTIME_WAREHOUSE_PATH,
+                _week('2026-06-01 04:00', '2026-06-08 04:00', [('OldName', 7, 'PT1H', '1h'), ('Other', 8, 'PT2H', '2h')]),
+                recorded_at=recorded_at)
+    record_week(config.PLAYTIME_WAREHOUSE_PATH,
+                _week('2026-06-08 04:00', '2026-06-15 04:00', [('NewName', 7, 'PT3H', '3h')]),
+                recorded_at=recorded_at)
+    identity_cols = ['SteamID64', 'Current_SteamName_from_API']
+    roster_identity_df = pd.DataFrame({'SteamID64': ['765'], 'Current_SteamName_from_API': ['NewName']})
+
+    history_df = build_history_pivot(roster_identity_df, identity_cols, weeks=4, as_of=datetime(2026, 6, 20))
+
+    assert len(history_df) == 1
+    assert history_df.drop(columns=identity_cols).iloc[0].tolist() == ['1h', '3h']
@@ -0,0 +1,54 @@
+import random
+
+import pytest
+
+from gmod_stat_tracker.roster_manager import MEMBERSHIP_MASK_COLUMN, build_membership_masks, column_bit
+
+MAX_COLUMNS = 11
+
+
+def reference_memberships(data_rows, max_columns):
+    """The per-cell loop build_membership_masks replaced: {steam_id: {column: is_member}}."""
+    roster_data = {}
+    for row in data_rows:
+        for col_index in range(min(len(row), max_columns)):
+            raw_value = str(row[col_index]).strip()
+            if len(raw_value) == 17 and raw_value.isdigit():
+                roster_data.setdefault(raw_value, {i: False for i in range(1, max_columns + 1)})
+                roster_data[raw_value][col_index + 1] = True
+    return roster_data
+
+
+def random_roster(seed, rows=300):
+    rng = random.Random(seed)
+    steam_ids = [str(76561198000000000 + rng.randrange(10 ** 6)) for _ in range(120)]
+    noise = ['', 'N/A', 'Sgt. Example', '7656119800000', '765611980000000001', '12345678901234567x']
+    grid = []
+    for _ in range(rows):
+        width = rng.randrange(0, MAX_COLUMNS + 3)
+        row = []
+        for _ in range(width):
+            cell = rng.choice(steam_ids) if rng.random() < 0.6 else rng.choice(noise)
+            row.append(f"  {cell} " if cell and rng.random() < 0.1 else cell)
+        grid.append(row)
+    return grid
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_build_membership_masks_matches_the_per_cell_loop(seed):
+    data_rows = random_roster(seed)
+    expected = reference_memberships(data_rows, MAX_COLUMNS)
+
+    masks = build_membership_masks(data_rows, MAX_COLUMNS).set_index('SteamID64')[MEMBERSHIP_MASK_COLUMN]
+
+    assert sorted(masks.index) == sorted(expected)
+    for steam_id, columns in expected.items():
+        mask = int(masks[steam_id])
+        assert {i: bool(mask & column_bit(i)) for i in columns} == columns
+
+
+def test_build_membership_masks_empty_roster():
+    masks = build_membership_masks([], MAX_COLUMNS)
+
+    assert masks.empty
+    assert list(masks.columns) == ['SteamID64', MEMBERSHIP_MASK_COLUMN]
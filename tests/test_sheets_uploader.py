@@ -0,0 +1,112 @@
+import threading
+
+import pandas as pd
+
+from gmod_stat_tracker import config, sheets_uploader
+from gmod_stat_tracker.sheets_uploader import UploadQueue, chunk_row_runs, diff_row_runs, upload_to_google_sheets
+
+
+def test_upload_queue_reports_from_the_waiting_thread(monkeypatch, capsys):
+    spreadsheet = object()
+    upload_threads = []
+
+    def fake_upload(df, sheet_id, tab_name, creds_file, format_dates=False, spreadsheet=None, log=print):
+        upload_threads.append(threading.current_thread())
+        log(f"uploading {tab_name} ({len(df)} rows)")
+        return tab_name != 'Broken'
+
+    monkeypatch.setattr(sheets_uploader, 'open_spreadsheet', lambda sheet_id, creds_file: spreadsheet)
+    monkeypatch.setattr(sheets_uploader, 'upload_to_google_sheets', fake_upload)
+
+    uploads = UploadQueue('sheet', 'creds.json')
+    uploads.submit(pd.DataFrame({'a': [1, 2]}), 'First')
+    uploads.submit(pd.DataFrame({'a': [3]}), 'Broken')
+    # Nothing is printed by the worker itself
+    assert capsys.readouterr().out == ''
+
+    results = uploads.wait()
+
+    assert results == {'First': True, 'Broken': False}
+    assert uploads.spreadsheet is spreadsheet
+    assert all(thread is not threading.current_thread() for thread in upload_threads)
+    out = capsys.readouterr().out
+    assert out.index('uploading First (2 rows)') < out.index('uploading Broken (1 rows)') < out.index('[GOOGLE SHEETS UPLOADS]')
+
+
+class FakeWorksheet:
+    """Records batch_update calls on an in-memory grid; fails chunks starting at a row in fail_rows."""
+
+    def __init__(self, rows=1000, cols=26):
+        self.row_count, self.col_count = rows, cols
+        self.grid = {}
+        self.updates = []
+        self.fail_rows = set()
+
+    def batch_update(self, entries):
+        start_row = int(''.join(ch for ch in entries[0]['range'].split(':')[0] if ch.isdigit()))
+        if start_row in self.fail_rows:
+            raise RuntimeError(f"chunk at row {start_row} rejected")
+        for entry in entries:
+            self.updates.append(entry['range'])
+            first = int(''.join(ch for ch in entry['range'].split(':')[0] if ch.isdigit()))
+            for offset, row in enumerate(entry['values']):
+                self.grid[first + offset] = [str(cell) for cell in row]
+
+    def resize(self, rows, cols):
+        self.row_count, self.col_count = rows, cols
+
+    def get_all_values(self):
+        return [self.grid[row] for row in sorted(self.grid)]
+
+
+class FakeSpreadsheet:
+    def __init__(self, worksheet):
+        self._worksheet = worksheet
+
+    def worksheet(self, tab_name):
+        return self._worksheet
+
+
+def test_diff_row_runs_finds_changed_added_and_removed_rows():
+    old = [['h1', 'h2'], ['a', '1'], ['b', '2'], ['c', '3'], ['gone', '9']]
+    new = [['h1', 'h2'], ['a', '1'], ['b', 'changed'], ['c', '3']]
+
+    assert diff_row_runs(old, new) == (2, [(2, 3), (4, 5)])
+    assert diff_row_runs(new, new) == (2, [])
+    # A column that disappeared is blanked on every row that had it
+    assert diff_row_runs([['a', 'x']], [['a']]) == (2, [(0, 1)])
+
+
+def test_chunk_row_runs_splits_long_runs_and_keeps_every_row():
+    runs = [(0, 5), (7, 8), (10, 13)]
+
+    chunks = chunk_row_runs(runs, 3)
+
+    assert chunks == [[(0, 3)], [(3, 5), (7, 8)], [(10, 13)]]
+    assert all(sum(stop - start for start, stop in chunk) <= 3 for chunk in chunks)
+
+
+def test_failed_chunk_is_resent_on_the_next_upload(monkeypatch, tmp_path):
+    monkeypatch.setattr(config, 'SHEETS_SNAPSHOT_DIR', tmp_path)
+    monkeypatch.setattr(config, 'SHEETS_UPLOAD_CHUNK_ROWS', 2)
+    monkeypatch.setattr(config, 'SHEETS_UPLOAD_MAX_WORKERS', 1)
+    worksheet = FakeWorksheet()
+    spreadsheet = FakeSpreadsheet(worksheet)
+    df = pd.DataFrame({'Name': list('abcdef'), 'Hours': range(6)})
+
+    # First upload into an empty tab: header + 6 rows in chunks of 2; the chunk at sheet row 3 fails
+    sheets_uploader.save_snapshot('sheet', 'Tab', [])
+    worksheet.fail_rows = {3}
+    assert not upload_to_google_sheets(df, 'sheet', 'Tab', 'creds.json', spreadsheet=spreadsheet)
+
+    # Second upload: only the rows of the failed chunk are sent again
+    worksheet.fail_rows = set()
+    worksheet.updates = []
+    assert upload_to_google_sheets(df, 'sheet', 'Tab', 'creds.json', spreadsheet=spreadsheet)
+    assert worksheet.updates == ['A3:B4']
+    assert worksheet.get_all_values() == [['Name', 'Hours']] + [[name, str(hours)] for name, hours in zip('abcdef', range(6))]
+
+    # Third upload: nothing changed, nothing sent
+    worksheet.updates = []
+    assert upload_to_google_sheets(df, 'sheet', 'Tab', 'creds.json', spreadsheet=spreadsheet)
+    assert worksheet.updates == []
@@ -0,0 +1,124 @@
+import threading
+import time
+
+import pytest
+
+from gmod_stat_tracker.task_graph import TaskCancelled, critical_path, run_task_graph
+
+
+def test_tasks_run_after_their_dependencies_with_their_results():
+    order = []
+
+    def task(name, value):
+        def run(*args):
+            order.append(name)
+            return value + sum(args)
+        return run
+
+    tasks = {
+        'publish': (task('publish', 0), ['stats', 'identity']),
+        'identity': (task('identity', 10), ['roster', 'names']),
+        'names': (task('names', 1), ['roster']),
+        'stats': (task('stats', 2), ['roster']),
+        'roster': (task('roster', 100), []),
+    }
+
+    results, errors, timings = run_task_graph(tasks)
+
+    assert errors == {}
+    assert results == {'roster': 100, 'names': 101, 'stats': 102, 'identity': 211, 'publish': 313}
+    for name, (_, dependencies) in tasks.items():
+        assert all(order.index(dep) < order.index(name) for dep in dependencies)
+        assert all(timings[dep][1] <= timings[name][0] for dep in dependencies)
+    assert critical_path(tasks, timings)[0] == 'roster'
+
+
+def test_independent_tasks_run_concurrently():
+    both_started = threading.Barrier(2, timeout=5)
+    tasks = {
+        'left': (lambda: both_started.wait(), []),
+        'right': (lambda: both_started.wait(), []),
+    }
+
+    _, errors, _ = run_task_graph(tasks)
+
+    assert errors == {}
+
+
+def test_failure_skips_dependants_and_cancels_running_tasks():
+    cancel = threading.Event()
+    scrape_started = threading.Event()
+    scrape_stopped = threading.Event()
+    ran = []
+
+    def failing_roster():
+        scrape_started.wait(5)
+        raise ValueError("sheet unavailable")
+
+    def long_scrape():
+        # Stands in for the week stream, which checks cancel between weeks
+        scrape_started.set()
+        while not cancel.wait(0.01):
+            pass
+        scrape_stopped.set()
+
+    tasks = {
+        'roster': (failing_roster, []),
+        'names': (lambda roster: ran.append('names'), ['roster']),
+        'publish': (lambda names: ran.append('publish'), ['names']),
+        'scrape': (long_scrape, []),
+    }
+
+    started = time.perf_counter()
+    results, errors, _ = run_task_graph(tasks, cancel=cancel)
+
+    assert time.perf_counter() - started < 5
+    assert ran == []
+    assert results == {}
+    assert isinstance(errors['roster'], ValueError)
+    assert all(isinstance(errors[name], TaskCancelled) for name in ('names', 'publish', 'scrape'))
+    assert cancel.is_set()
+    assert scrape_stopped.wait(5)
+
+
+def test_graph_returns_without_waiting_for_abandoned_tasks():
+    release = threading.Event()
+
+    def fail():
+        raise RuntimeError("boom")
+
+    tasks = {
+        'fail': (fail, []),
+        'slow': (lambda: release.wait(5), []),
+    }
+
+    started = time.perf_counter()
+    _, errors, timings = run_task_graph(tasks)
+    elapsed = time.perf_counter() - started
+    release.set()
+
+    assert elapsed < 2
+    assert isinstance(errors['slow'], TaskCancelled)
+    assert 'slow' not in timings
+
+
+def test_unknown_dependency_and_cycle_are_rejected():
+    with pytest.raises(ValueError, match="unknown"):
+        run_task_graph({'a': (lambda b: b, ['b'])})
+
+    with pytest.raises(ValueError, match="cycle"):
+        run_task_graph({'a': (lambda b: b, ['b']), 'b': (lambda a: a, ['a'])})
+
+
+def test_critical_path_follows_the_dependency_that_finished_last():
+    # weekly_pivot is fed by the scrape through a queue; reporting it as a dependency
+    # puts the scrape on the path when it finishes after the roster
+    tasks = {
+        'roster': (None, []),
+        'scrape': (None, []),
+        'weekly_pivot': (None, ['roster', 'scrape']),
+        'reports': (None, ['weekly_pivot']),
+    }
+    timings = {'roster': (0.0, 1.0), 'scrape': (0.0, 5.0), 'weekly_pivot': (1.0, 6.0), 'reports': (6.0, 7.0)}
+
+    assert critical_path(tasks, timings) == ['scrape', 'weekly_pivot', 'reports']